@@ -16,12 +16,12 @@ syn case ignore
 syn match groupsDefaultValue "\(:\|=\)\s*\w\+$"ms=s+1 contained
 syn match groupsColonValue "\(:\|=\).*" contained contains=groupsDefaultValue
 syn match groupsDefaultKey "^default\(:\|=\).*$" contains=groupsColonValue
-syn match groupsGroupsDirKey "^\(groupsdir\|confdir\|autodir\)\(:\|=\).*$" contains=groupsKeys,groupsVars
+syn match groupsGroupsDirKey "^\(groupsdir\|confdir\|autodir\|cachedir\)\(:\|=\).*$" contains=groupsKeys,groupsVars
 
 " Sources
-syn match groupsVars "\(\$GROUP\|\$NODE\|$SOURCE\|$CFGDIR\)" contained
+syn match groupsVars "\(\$GROUPS\|\$GROUP\|\$NODE\|$SOURCE\|$CFGDIR\)" contained
 syn match groupsKeys "^\w\+\(:\|=\)"me=e-1 contained
-syn match groupsKeyValue "^\(map\|all\|list\|reverse\|cache_time\)\+\(:\|=\).*$" contains=groupsKeys,groupsVars
+syn match groupsKeyValue "^\(map\|map_batch\|all\|list\|reverse\|cache_time\|negative_cache_time\|stale_time\|module\)\+\(:\|=\).*$" contains=groupsKeys,groupsVars
 
 syn match  groupsComment    "#.*$"
 syn match  groupsComment    ";.*$"
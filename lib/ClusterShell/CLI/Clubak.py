@@ -35,7 +35,7 @@ from ClusterShell.NodeSet import set_std_group_resolver_config
 
 from ClusterShell.CLI.Display import Display, THREE_CHOICES
 from ClusterShell.CLI.Display import sys_stdin
-from ClusterShell.CLI.Error import GENERIC_ERRORS, handle_generic_error
+from ClusterShell.CLI.Error import generic_errors, handle_generic_error
 from ClusterShell.CLI.OptionParser import OptionParser
 from ClusterShell.CLI.Utils import nodeset_cmpkey
 
@@ -178,7 +178,7 @@ def main():
     """main script function"""
     try:
         clubak()
-    except GENERIC_ERRORS as ex:
+    except generic_errors() as ex:
         sys.exit(handle_generic_error(ex))
     except ValueError as ex:
         print("%s:" % sys.argv[0], ex, file=sys.stderr)
@@ -56,7 +56,7 @@ from ClusterShell.CLI.Config import ClushConfig, ClushConfigError
 from ClusterShell.CLI.Display import Display, sys_stdin
 from ClusterShell.CLI.Display import VERB_QUIET, VERB_STD, VERB_VERB, VERB_DEBUG
 from ClusterShell.CLI.OptionParser import OptionParser
-from ClusterShell.CLI.Error import GENERIC_ERRORS, handle_generic_error
+from ClusterShell.CLI.Error import generic_errors, handle_generic_error
 from ClusterShell.CLI.Utils import bufnodeset_cmpkey, human_bi_bytes_unit
 
 from ClusterShell.Event import EventHandler
@@ -267,13 +267,11 @@ class GatherOutputHandler(OutputHandler):
         # Worker is closing -- it's time to gather results...
         self._runtimer_finalize(worker)
         # Display command output, try to order buffers by rc
-        nodesetify = lambda v: (v[0], NodeSet._fromlist1(v[1]))
         cleaned = False
-        for _rc, nodelist in sorted(worker.iter_retcodes()):
-            ns_remain = NodeSet._fromlist1(nodelist)
+        for _rc, rcnodeset in sorted(worker.iter_retcodes()):
+            ns_remain = rcnodeset.copy()
             # Then order by node/nodeset (see nodeset_cmpkey)
-            for buf, nodeset in sorted(map(nodesetify,
-                                           worker.iter_buffers(nodelist)),
+            for buf, nodeset in sorted(worker.iter_buffers(set(rcnodeset)),
                                        key=bufnodeset_cmpkey):
                 if not cleaned:
                     # clean runtimer line before printing first result
@@ -295,9 +293,9 @@ class GatherOutputHandler(OutputHandler):
         if self._display.maxrc:
             verbexit = VERB_STD
         # Display return code if not ok ( != 0)
-        for rc, nodelist in worker.iter_retcodes():
+        for rc, ns in worker.iter_retcodes():
             if rc != 0:
-                nsdisp = ns = NodeSet._fromlist1(nodelist)
+                nsdisp = ns
                 if self._display.verbosity > VERB_QUIET and len(ns) > 1:
                     nsdisp = "%s (%d)" % (ns, len(ns))
                 msgrc = "%s: %s: exited with exit code %d" % (self._prog, nsdisp, rc)
@@ -843,7 +841,7 @@ def clush_excepthook(extype, exp, traceback):
         else:
             print("Keyboard interrupt.", file=sys.stderr)
         clush_exit(128 + signal.SIGINT)
-    except GENERIC_ERRORS as exc:
+    except generic_errors() as exc:
         clush_exit(handle_generic_error(exc))
 
     # Error not handled
@@ -923,10 +921,9 @@ def main():
     # --hostfile support (#235)
     for opt_hostfile in options.hostfile:
         try:
-            fnodeset = NodeSet()
             with open(opt_hostfile) as hostfile:
-                for line in hostfile.read().splitlines():
-                    fnodeset.updaten(nodes for nodes in line.split())
+                fnodeset = NodeSet.fromiter(nodes for line in hostfile
+                                            for nodes in line.split())
             display.vprint_err(VERB_DEBUG,
                                "Using nodeset %s from hostfile %s"
                                % (fnodeset, opt_hostfile))
@@ -979,10 +976,12 @@ def main():
         parser.error('No node to run on.')
 
     if options.pick and options.pick < len(nodeset_base):
-        # convert to string for sample as nsiter() is slower for big
-        # nodesets; and we assume options.pick will remain small-ish
-        keep = random.sample(list(nodeset_base), options.pick)
-        nodeset_base.intersection_update(','.join(keep))
+        # sample node indexes to avoid expanding the whole nodeset (each
+        # indexing operation is done in logarithmic time)
+        keep = NodeSet.fromiter(nodeset_base[idx] for idx in
+                                random.sample(range(len(nodeset_base)),
+                                              options.pick))
+        nodeset_base.intersection_update(keep)
         if config.verbosity >= VERB_VERB:
             msg = "Picked random nodes: %s" % nodeset_base
             print(Display.COLOR_RESULT_FMT % msg)
@@ -24,7 +24,6 @@ CLI results display class
 
 from __future__ import print_function
 
-import difflib
 import sys
 import os
 
@@ -266,6 +265,8 @@ class Display(object):
                 if len(nodeset) > 1:
                     nsstr += " (%d)" % len(nodeset)
 
+            # difflib is only imported in diff mode, for faster startup
+            import difflib
             alist = [aline.decode('utf-8', 'ignore') for aline in content_ref]
             blist = [bline.decode('utf-8', 'ignore') for bline in content]
             udiff = difflib.unified_diff(alist, blist, fromfile=nsstr_ref,
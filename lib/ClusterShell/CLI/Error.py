@@ -36,7 +36,6 @@ from resource import getrlimit, RLIMIT_NOFILE
 import signal
 import sys
 
-from ClusterShell.Engine.Engine import EngineNotSupportedError
 from ClusterShell.NodeUtils import GroupResolverConfigError
 from ClusterShell.NodeUtils import GroupResolverIllegalCharError
 from ClusterShell.NodeUtils import GroupResolverSourceError
@@ -44,14 +43,8 @@ from ClusterShell.NodeUtils import GroupSourceError
 from ClusterShell.NodeUtils import GroupSourceNoUpcall
 from ClusterShell.NodeSet import NodeSetExternalError, NodeSetParseError
 from ClusterShell.NodeSet import RangeSetParseError
-from ClusterShell.Propagation import RouteResolvingError
-from ClusterShell.Topology import TopologyError
-from ClusterShell.Worker.EngineClient import EngineClientError
-from ClusterShell.Worker.Worker import WorkerError
 
 GENERIC_ERRORS = (configparser.Error,
-                  EngineNotSupportedError,
-                  EngineClientError,
                   NodeSetExternalError,
                   NodeSetParseError,
                   RangeSetParseError,
@@ -60,19 +53,51 @@ GENERIC_ERRORS = (configparser.Error,
                   GroupResolverSourceError,
                   GroupSourceError,
                   GroupSourceNoUpcall,
-                  RouteResolvingError,
-                  TopologyError,
                   TypeError,
                   IOError,
                   OSError,
                   KeyboardInterrupt,
-                  ValueError,
-                  WorkerError)
+                  ValueError)
+
+# Generic errors of task, engine and tree modules (exception name => module),
+# not imported here to keep commands like nodeset fast to start
+TASK_ERRORS = {'EngineNotSupportedError': 'ClusterShell.Engine.Engine',
+               'EngineClientError': 'ClusterShell.Worker.EngineClient',
+               'RouteResolvingError': 'ClusterShell.Propagation',
+               'TopologyError': 'ClusterShell.Topology',
+               'WorkerError': 'ClusterShell.Worker.Worker'}
 
 LOGGER = logging.getLogger(__name__)
 
+class _NotLoadedError(Exception):
+    """Placeholder for task errors whose module is not loaded"""
+
+def _task_error(excname):
+    """
+    Return task error class `excname', or _NotLoadedError when its module
+    is not loaded (in that case, it cannot have been raised).
+    """
+    module = sys.modules.get(TASK_ERRORS[excname])
+    if module is None:
+        return _NotLoadedError
+    return getattr(module, excname)
+
+def generic_errors():
+    """
+    Return the tuple of exceptions handled by handle_generic_error(), that
+    is GENERIC_ERRORS and TASK_ERRORS of loaded modules.
+    """
+    return GENERIC_ERRORS + tuple(_task_error(excname)
+                                  for excname in TASK_ERRORS)
+
 def handle_generic_error(excobj):
     """handle error given `excobj' generic script exception"""
+    EngineNotSupportedError = _task_error('EngineNotSupportedError')
+    EngineClientError = _task_error('EngineClientError')
+    RouteResolvingError = _task_error('RouteResolvingError')
+    TopologyError = _task_error('TopologyError')
+    WorkerError = _task_error('WorkerError')
+
     prog = os.path.basename(sys.argv[0])
     try:
         raise excobj
@@ -33,24 +33,26 @@ import math
 import random
 import sys
 
-from ClusterShell.CLI.Error import GENERIC_ERRORS, handle_generic_error
+from ClusterShell.CLI.Error import generic_errors, handle_generic_error
 from ClusterShell.CLI.OptionParser import OptionParser
 
 from ClusterShell.NodeSet import NodeSet, RangeSet, std_group_resolver
 from ClusterShell.NodeSet import grouplist, set_std_group_resolver_config
-from ClusterShell.NodeUtils import GroupSourceNoUpcall
+from ClusterShell.NodeUtils import GroupSourceNoUpcall, GroupSourceQueryFailed
 
 
-def process_stdin(xsetop, xsetcls, autostep):
-    """Process standard input and operate on xset."""
-    # Build temporary set (stdin accumulator)
-    tmpset = xsetcls(autostep=autostep)
+def stdin_elements():
+    """Iterate over nodesets or rangesets read from standard input."""
     for line in sys.stdin:  # read lines of text stream (not bytes)
         # Support multi-lines and multi-nodesets per line
         line = line[0:line.find('#')].strip()
         for elem in line.split():
-            # Do explicit object creation for RangeSet
-            tmpset.update(xsetcls(elem, autostep=autostep))
+            yield elem
+
+def process_stdin(xsetop, xsetcls, autostep):
+    """Process standard input and operate on xset."""
+    # Build temporary set (stdin accumulator) at once
+    tmpset = xsetcls.fromiter(stdin_elements(), autostep=autostep)
     # Perform operation on xset
     if tmpset:
         xsetop(tmpset)
@@ -116,7 +118,15 @@ def print_source_groups(source, level, xset, opts):
                                        len(gnodes)))
     else:
         # "raw" group list when no argument at all
-        for group in grouplist(source):
+        groups = grouplist(source)
+        if level > 1:
+            # resolve all groups at once when supported by group source,
+            # results are then cached for NodeSet() below
+            try:
+                std_group_resolver().group_nodes_batch(groups, source)
+            except GroupSourceQueryFailed:
+                pass  # error reported below when resolving each group
+        for group in groups:
             if source and not opts.groupbase:
                 nsgroup = "@%s:%s" % (source, group)
             else:
@@ -153,7 +163,7 @@ def command_list(options, xset, group_resolver):
             msgfmt = "Warning: No %s upcall defined for group source %s"
             print(msgfmt % (exc, source), file=sys.stderr)
 
-def nodeset():
+def nodeset(args=None):
     """script subroutine"""
     class_set = NodeSet
     usage = "%prog [COMMAND] [OPTIONS] [ns1 [-ixX] ns2|...]"
@@ -163,7 +173,7 @@ def nodeset():
     parser.install_nodeset_commands()
     parser.install_nodeset_operations()
     parser.install_nodeset_options()
-    (options, args) = parser.parse_args()
+    (options, args) = parser.parse_args(args)
 
     set_std_group_resolver_config(options.groupsconf)
     group_resolver = std_group_resolver()
@@ -171,6 +181,12 @@ def nodeset():
     if options.debug:
         logging.basicConfig(level=logging.DEBUG)
 
+    if options.server:
+        # run commands received on socket with this group configuration
+        from ClusterShell.CLI.NodesetServer import serve
+        serve(options.server)
+        return
+
     # Check for command presence
     cmdcount = int(options.count) + int(options.expand) + \
                int(options.fold) + int(bool(options.list)) + \
@@ -308,11 +324,11 @@ def nodeset():
             xset.fold_axis = [int(options.axis)]
 
     if options.pick and options.pick < len(xset):
-        # convert to string for sample as nsiter() is slower for big
-        # nodesets; and we assume options.pick will remain small-ish
-        keep = random.sample(list(xset), options.pick)
-        # explicit class_set creation and str() conversion for RangeSet
-        keep = class_set(','.join([str(x) for x in keep]))
+        # sample indexes to avoid expanding the whole set (each indexing
+        # operation is done in logarithmic time)
+        keep = class_set.fromiter(xset[idx] for idx in
+                                  random.sample(range(len(xset)),
+                                                options.pick))
         xset.intersection_update(keep)
 
     fmt = options.output_format # default to '%s'
@@ -345,17 +361,17 @@ def nodeset():
         for xsubset in xiterator:
             print(xsubres(xsubset))
 
-def main():
+def main(args=None):
     """main script function"""
     try:
-        nodeset()
+        nodeset(args)
     except (AssertionError, IndexError, ValueError) as ex:
         print("ERROR: %s" % ex, file=sys.stderr)
         sys.exit(1)
     except SyntaxError:
         print("ERROR: invalid separator", file=sys.stderr)
         sys.exit(1)
-    except GENERIC_ERRORS as ex:
+    except generic_errors() as ex:
         sys.exit(handle_generic_error(ex))
 
     sys.exit(0)
@@ -0,0 +1,288 @@
+#
+# Copyright (C) 2026 CEA/DAM
+#
+# This file is part of ClusterShell.
+#
+# ClusterShell is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# ClusterShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with ClusterShell; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+
+"""
+nodeset server and client
+
+A nodeset server (started with nodeset --server=SOCKET) keeps the node
+group configuration and parsing caches in memory and runs nodeset commands
+received on a Unix socket. When $CLUSTERSHELL_NODESET_SOCKET is set, the
+nodeset and cluset commands forward their arguments to the server listening
+on this socket, or run in-process as usual if no server is available.
+
+Commands are run in the working directory of the client. The server only
+runs commands of clients that share its group configuration environment
+(see CONFIG_ENV): other clients run their commands in-process.
+
+This module is the entry point of these commands: it only imports a few
+standard modules so that the client stays fast to start.
+"""
+
+from __future__ import print_function
+
+import errno
+import json
+import os
+import socket
+import sys
+
+try:
+    from StringIO import StringIO  # Python 2: native str output
+except ImportError:
+    from io import StringIO
+
+# Environment variable used to set the nodeset server socket path
+SOCKET_ENV = 'CLUSTERSHELL_NODESET_SOCKET'
+
+# Server-side timeout of client socket operations (seconds)
+CLIENT_TIMEOUT = 5
+
+# Environment variables that select the group configuration: the server
+# only runs commands of clients with the same values
+CONFIG_ENV = ('CLUSTERSHELL_CFGDIR', 'XDG_CONFIG_HOME', 'HOME')
+
+
+class _StdinRequired(BaseException):
+    """Raised when a server command reads stdin not sent by the client
+    (BaseException as it should not be handled by the command itself)"""
+
+
+class _ClientStdin(object):
+    """sys.stdin replacement for commands run by the server."""
+
+    def __init__(self, data):
+        self.data = data
+        self._buf = None
+
+    def _stream(self):
+        """Return a stream of client stdin data."""
+        if self.data is None:
+            raise _StdinRequired()
+        if self._buf is None:
+            self._buf = StringIO(self.data)
+        return self._buf
+
+    def __iter__(self):
+        return iter(self._stream())
+
+    def read(self, size=-1):
+        """Read client stdin data."""
+        return self._stream().read(size)
+
+    def readline(self, size=-1):
+        """Read a line of client stdin data."""
+        return self._stream().readline(size)
+
+    def isatty(self):
+        """Client stdin is never a tty."""
+        return False
+
+
+def _send(sockfile, msg):
+    """Send JSON msg on a single line."""
+    sockfile.write((json.dumps(msg) + '\n').encode('utf-8'))
+    sockfile.flush()
+
+def _recv(sockfile):
+    """Receive JSON msg (None on EOF)."""
+    line = sockfile.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+def _connect(sockpath):
+    """Return a socket connected to sockpath or None if no server."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(sockpath)
+    except socket.error as exc:
+        sock.close()
+        if exc.errno in (errno.ENOENT, errno.ECONNREFUSED, errno.ENOTSOCK):
+            return None
+        raise
+    return sock
+
+def client(sockpath, args, prog='nodeset'):
+    """
+    Run nodeset command args on the server listening on sockpath, write
+    its output and return its exit status, or None if no server is
+    available. prog is the program name used in messages.
+    """
+    request = {'prog': prog, 'args': args, 'cwd': os.getcwd(),
+               'env': _config_env()}
+    reply = _request(sockpath, request)
+    if reply is not None and reply.get('stdin'):
+        # command needs standard input: read it all, then send the request
+        # again with it (the server does not wait for it)
+        request['stdin'] = sys.stdin.read()
+        reply = _request(sockpath, request)
+        if reply is None:
+            # server gone: give stdin back to the in-process command
+            sys.stdin = StringIO(request['stdin'])
+    if reply is None or reply.get('local'):
+        return None  # no server or other configuration: run in-process
+    sys.stdout.write(reply['stdout'])
+    sys.stdout.flush()
+    sys.stderr.write(reply['stderr'])
+    return reply['rc']
+
+def _config_env():
+    """Return the group configuration environment of this process."""
+    return dict((name, os.environ.get(name)) for name in CONFIG_ENV)
+
+def _request(sockpath, request):
+    """Send request to server, return its reply or None if no server."""
+    sock = _connect(sockpath)
+    if sock is None:
+        return None
+    try:
+        sockfile = sock.makefile('rwb')
+        _send(sockfile, request)
+        return _recv(sockfile)
+    finally:
+        sock.close()
+
+def run_command(prog, args, stdin_data, cwd=None):
+    """
+    Run nodeset command args as program prog in this process, with client
+    stdin_data (None if not sent yet) and in working directory cwd (if
+    set), return (rc, stdout, stderr).
+    """
+    from ClusterShell.CLI.Nodeset import main as nodeset_main
+    from ClusterShell.NodeSet import set_std_group_resolver, std_group_resolver
+
+    resolver = std_group_resolver()
+    default_source = resolver.default_source_name
+    out, err = StringIO(), StringIO()
+    saved_argv0 = sys.argv[0]
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    sys.argv[0] = prog  # used by OptionParser as program name
+    sys.stdin, sys.stdout, sys.stderr = _ClientStdin(stdin_data), out, err
+    saved_cwd = os.getcwd()
+    try:
+        if cwd is not None:
+            os.chdir(cwd)  # for relative paths like --groupsconf FILE
+        nodeset_main(args)
+    except SystemExit as exc:
+        if exc.code is None or isinstance(exc.code, int):
+            rc = exc.code or 0
+        else:
+            print(exc.code, file=err)
+            rc = 1
+    except Exception:
+        # unexpected error: report it but keep the server running
+        import traceback
+        traceback.print_exc(file=err)
+        rc = 1
+    finally:
+        os.chdir(saved_cwd)
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        sys.argv[0] = saved_argv0
+        # restore group resolver state changed by options -s/--groupsconf
+        set_std_group_resolver(resolver)
+        if default_source is not None:
+            resolver.default_source_name = default_source
+    return rc, out.getvalue(), err.getvalue()
+
+def _handle(conn):
+    """
+    Handle a client connection. Connections are handled one at a time, so
+    the server never waits for a client more than CLIENT_TIMEOUT seconds
+    per socket operation: a command that needs standard input not sent
+    with the request is answered with a stdin request, and the client
+    connects again with its standard input.
+    """
+    conn.settimeout(CLIENT_TIMEOUT)
+    sockfile = conn.makefile('rwb')
+    request = _recv(sockfile)
+    if request is None:
+        return
+    if request.get('env') != _config_env():
+        # client would not use the group configuration loaded by the server
+        _send(sockfile, {'local': True})
+        return
+    try:
+        rc, out, err = run_command(request['prog'], request['args'],
+                                   request.get('stdin'), request.get('cwd'))
+    except _StdinRequired:
+        _send(sockfile, {'stdin': True})
+        return
+    _send(sockfile, {'rc': rc, 'stdout': out, 'stderr': err})
+
+def _terminate(signum, frame):
+    """SIGTERM handler: stop server (and remove its socket file)."""
+    sys.exit(0)
+
+def serve(sockpath):
+    """
+    Run nodeset server on Unix socket sockpath, until interrupted or
+    terminated.
+    """
+    import signal
+    from ClusterShell.NodeSet import std_group_resolver
+
+    signal.signal(signal.SIGTERM, _terminate)
+
+    # load group configuration once
+    std_group_resolver().default_source_name
+
+    # remove socket file of a previous server, if no longer in use
+    if os.path.exists(sockpath):
+        sock = _connect(sockpath)
+        if sock is not None:
+            sock.close()
+            raise OSError(errno.EADDRINUSE, "nodeset server already running",
+                          sockpath)
+        os.unlink(sockpath)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)  # socket only accessible by current user
+    try:
+        sock.bind(sockpath)
+    finally:
+        os.umask(old_umask)
+    sock.listen(128)
+    try:
+        while True:
+            conn = sock.accept()[0]
+            try:
+                _handle(conn)
+            except (socket.error, ValueError, KeyError) as exc:
+                print("nodeset server: bad request: %s" % exc,
+                      file=sys.stderr)
+            finally:
+                conn.close()
+    finally:
+        sock.close()
+        os.unlink(sockpath)
+
+def main():
+    """nodeset and cluset entry point"""
+    sockpath = os.environ.get(SOCKET_ENV)
+    args = sys.argv[1:]
+    if sockpath and not any(arg.startswith('--server') for arg in args):
+        rc = client(sockpath, args, os.path.basename(sys.argv[0]))
+        if rc is not None:
+            sys.exit(rc)
+    from ClusterShell.CLI.Nodeset import main as nodeset_main
+    nodeset_main()
+
+
+if __name__ == '__main__':
+    main()
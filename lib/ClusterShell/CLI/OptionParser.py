@@ -28,7 +28,6 @@ from copy import copy
 import optparse
 
 from ClusterShell import __version__
-from ClusterShell.Engine.Factory import PreferredEngine
 from ClusterShell.CLI.Display import THREE_CHOICES
 
 
@@ -100,6 +99,8 @@ class OptionParser(optparse.OptionParser):
 
     def install_nodes_options(self):
         """Install nodes selection options"""
+        # imported here as engines are not needed by all commands
+        from ClusterShell.Engine.Factory import PreferredEngine
         optgrp = optparse.OptionGroup(self, "Selecting target nodes")
         optgrp.add_option("-w", action="append", type="safestring",
                           dest="nodes", help="nodes where to run the command")
@@ -344,4 +345,8 @@ class OptionParser(optparse.OptionParser):
         optgrp.add_option("--pick", action="store", dest="pick",
                           metavar="N", type="int",
                           help="pick N node(s) at random in nodeset")
+        optgrp.add_option("--server", action="store", dest="server",
+                          metavar="SOCKET", help="run as a server answering "
+                          "nodeset requests on this Unix socket (see "
+                          "$CLUSTERSHELL_NODESET_SOCKET)")
         self.add_option_group(optgrp)
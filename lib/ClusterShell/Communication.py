@@ -54,7 +54,6 @@ import os
 import xml.sax
 
 from xml.sax.handler import ContentHandler
-from xml.sax.saxutils import XMLGenerator
 from xml.sax import SAXParseException
 
 from collections import deque
@@ -72,6 +71,14 @@ from ClusterShell.Event import EventHandler
 # XML character encoding
 ENCODING = 'utf-8'
 
+
+def _xmlgenerator(out):
+    """Return a XMLGenerator writing to `out'."""
+    # xml.sax.saxutils is slow to import (urllib), import it only when needed
+    from xml.sax.saxutils import XMLGenerator
+    return XMLGenerator(out, encoding=ENCODING)
+
+
 # See Message.data_encode()
 DEFAULT_B64_LINE_LENGTH = 65536
 
@@ -197,17 +204,17 @@ class Channel(EventHandler):
 
     def _init(self):
         """start xml document for communication"""
-        XMLGenerator(self.worker, encoding=ENCODING).startDocument()
+        _xmlgenerator(self.worker).startDocument()
 
     def _open(self):
         """open a new communication channel from src to dst"""
-        xmlgen = XMLGenerator(self.worker, encoding=ENCODING)
+        xmlgen = _xmlgenerator(self.worker)
         xmlgen.startElement('channel', {'version': __version__})
 
     def _close(self, abort=False):
         """close an already opened channel"""
         if self.opened and not abort:
-            XMLGenerator(self.worker, encoding=ENCODING).endElement('channel')
+            _xmlgenerator(self.worker).endElement('channel')
         self.worker.abort()
         self.opened = self.setup = False
 
@@ -346,7 +353,7 @@ class Message(object):
     def xml(self):
         """generate XML version of a configuration message"""
         out = BytesIO()
-        generator = XMLGenerator(out, encoding=ENCODING)
+        generator = _xmlgenerator(out)
 
         # "stringify" entries for XML conversion
         state = {}
@@ -143,7 +143,8 @@ class Defaults(object):
     * stdin (boolean; default is ``True``)
     * stdout_msgtree (boolean; default is ``True``)
     * stderr_msgtree (boolean; default is ``True``)
-    * engine (string; default is ``'auto'``)
+    * engine (string; default is ``'auto'``; also ``'epoll'``, ``'poll'``,
+      ``'select'`` or ``'asyncio'``)
     * local_workername (string; default is ``'exec'``)
     * distant_workername (string; default is ``'ssh'``)
     * debug (boolean; default is ``False``)
@@ -156,6 +157,13 @@ class Defaults(object):
     Engine defaults:
 
     * port_qlimit (integer; default is ``100``)
+    * write_hwm (integer; default is ``1048576``; write queue high-water mark
+      in bytes per stream above which Worker.write() returns ``False``, ``0``
+      to disable; gateways delay write acknowledgements above it)
+    * line_maxlen (integer; default is ``0``; maximum length in bytes of
+      lines read from workers, ``0`` means no limit)
+    * line_truncate (boolean; default is ``False``; whether lines longer
+      than line_maxlen are truncated instead of being split)
 
     Example of use::
 
@@ -241,12 +249,18 @@ class Defaults(object):
     #
     # Default values for Engine objects
     #
-    _ENGINE = {"port_qlimit" : 100}
+    _ENGINE = {"port_qlimit"   : 100,
+               "write_hwm"     : 1048576,
+               "line_maxlen"   : 0,
+               "line_truncate" : False}
 
     #
     # Datatype converters for Engine defaults
     #
-    _ENGINE_CONVERTERS = {"port_qlimit" : ConfigParser.getint}
+    _ENGINE_CONVERTERS = {"port_qlimit"   : ConfigParser.getint,
+                          "write_hwm"     : ConfigParser.getint,
+                          "line_maxlen"   : ConfigParser.getint,
+                          "line_truncate" : ConfigParser.getboolean}
 
     def __init__(self, filenames):
         """Initialize Defaults from config filenames"""
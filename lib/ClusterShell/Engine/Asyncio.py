@@ -0,0 +1,351 @@
+#
+# Copyright (C) 2026 CEA/DAM
+#
+# This file is part of ClusterShell.
+#
+# ClusterShell is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# ClusterShell is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with ClusterShell; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA
+
+"""
+A ClusterShell Engine running on an asyncio event loop.
+
+Client file descriptors are watched with the event loop add_reader() and
+add_writer() methods and engine timers are fired with call_at(). This
+engine is never selected automatically: set engine to "asyncio" in the
+task defaults to use it.
+
+When run with Task.resume(), the engine runs a private event loop until
+completion like any other engine. Task.resume_async() and Task.shell_async()
+instead run the engine in the event loop of the calling thread, so that
+workers can be driven from coroutines without blocking the loop.
+
+The asyncio module is only imported when this engine is instantiated
+(Python 3.5.2+ required).
+"""
+
+from ClusterShell.Engine.Engine import Engine, E_READ, E_WRITE
+from ClusterShell.Engine.Engine import EngineAbortException
+from ClusterShell.Engine.Engine import EngineAlreadyRunningError
+from ClusterShell.Engine.Engine import EngineNotSupportedError
+from ClusterShell.Engine.Engine import EngineTimeoutException
+from ClusterShell.Engine.Engine import _EngineTimerQ
+from ClusterShell.Worker.EngineClient import EngineClientEOF
+
+
+class _AsyncioTimerQ(_EngineTimerQ):
+    """Timer queue that arms the engine event loop wake-up timer."""
+
+    def schedule(self, client):
+        """Insert and arm a client's timer."""
+        _EngineTimerQ.schedule(self, client)
+        self._engine._update_timer()
+
+    def reschedule(self, client):
+        """Re-arm client's timer with its new fire delay."""
+        _EngineTimerQ.reschedule(self, client)
+        self._engine._update_timer()
+
+    def invalidate(self, client):
+        """Invalidate client's timer."""
+        _EngineTimerQ.invalidate(self, client)
+        self._engine._check_later()
+
+
+class EngineAsyncio(Engine):
+    """
+    Asyncio Engine
+
+    ClusterShell engine using an asyncio event loop.
+    """
+
+    identifier = "asyncio"
+
+    def __init__(self, info):
+        """
+        Initialize Engine.
+        """
+        try:
+            import asyncio
+        except ImportError:
+            raise EngineNotSupportedError(EngineAsyncio.identifier)
+        if not hasattr(asyncio.AbstractEventLoop, 'create_future'):
+            raise EngineNotSupportedError(EngineAsyncio.identifier)
+        Engine.__init__(self, info)
+        self.timerq = _AsyncioTimerQ(self)
+        # event loop used by current (or last) run
+        self.loop = None
+        # private event loop used by run(), created on first use
+        self._private_loop = None
+        # current run state: completion future, timer and timeout handles
+        self._done = None
+        self._timer_handle = None
+        self._timer_when = None
+        self._timeout_handle = None
+        self._check_pending = False
+        self._dispatching = False
+        # run_async() completion callback
+        self._done_callback = None
+
+    def release(self):
+        """Release engine-specific resources."""
+        if self._private_loop is not None:
+            self._private_loop.close()
+            self._private_loop = None
+
+    def _register_specific(self, fd, event):
+        """Engine-specific fd registering. Called by Engine register."""
+        if self._done is None:
+            # not attached to the event loop, see _attach()
+            return
+        if event & E_READ:
+            self.loop.add_reader(fd, self._callback, self._handle_event, fd,
+                                 E_READ)
+        else:
+            assert event & E_WRITE
+            self.loop.add_writer(fd, self._callback, self._handle_event, fd,
+                                 E_WRITE)
+
+    def _unregister_specific(self, fd, ev_is_set):
+        """
+        Engine-specific fd unregistering. Called by Engine unregister.
+        """
+        if ev_is_set and self._done is not None:
+            self.loop.remove_reader(fd)
+            self.loop.remove_writer(fd)
+        self._check_later()
+
+    def _modify_specific(self, fd, event, setvalue):
+        """
+        Engine-specific modifications after a interesting event change for
+        a file descriptor. Called automatically by Engine set_events().
+        For the asyncio engine, it adds or removes the fd reader or writer
+        callback of the event loop.
+        """
+        self._debug("MODSPEC fd=%d event=%x setvalue=%d", fd, event, setvalue)
+        if setvalue:
+            self._register_specific(fd, event)
+        elif self._done is not None:
+            if event & E_READ:
+                self.loop.remove_reader(fd)
+            else:
+                self.loop.remove_writer(fd)
+
+    def _attach(self, loop, timeout):
+        """
+        Attach engine to event loop: add registered fds and timers, and
+        return the future done when the run is complete.
+        """
+        self.loop = loop
+        self._done = loop.create_future()
+        for fd, (_, stream) in self.reg_clifds.items():
+            if stream.events & E_READ:
+                self._register_specific(fd, E_READ)
+            if stream.events & E_WRITE:
+                self._register_specific(fd, E_WRITE)
+        if timeout:
+            self._timeout_handle = loop.call_later(timeout, self._callback,
+                                                   self._handle_timeout)
+        self._update_timer()
+        self._check_later()
+        return self._done
+
+    def _detach(self):
+        """Detach engine from its event loop."""
+        for fd in self.reg_clifds:
+            self.loop.remove_reader(fd)
+            self.loop.remove_writer(fd)
+        for handle in (self._timer_handle, self._timeout_handle):
+            if handle is not None:
+                handle.cancel()
+        self._timer_handle = self._timer_when = self._timeout_handle = None
+        self._check_pending = False
+        done, self._done = self._done, None
+        return done
+
+    def _update_timer(self):
+        """Arm event loop timer to fire next engine timer on time."""
+        if self._done is None:
+            return
+        delay = self.timerq.nextfire_delay()
+        if delay < 0:
+            return
+        when = self.loop.time() + delay
+        if self._timer_handle is not None:
+            if self._timer_when <= when:
+                # will fire early enough (maybe for nothing, that's fine)
+                return
+            self._timer_handle.cancel()
+        self._timer_when = when
+        self._timer_handle = self.loop.call_at(when, self._callback,
+                                               self._handle_timer)
+
+    def _check_later(self):
+        """Check for run completion when control returns to the loop."""
+        if self._done is not None and not self._dispatching \
+                and not self._check_pending:
+            self._check_pending = True
+            self.loop.call_soon(self._callback, self._handle_check)
+
+    def _callback(self, func, *args):
+        """Event loop callback: process event, then check run completion."""
+        if self._done is None:
+            return
+        self._dispatching = True
+        try:
+            func(*args)
+        except Exception as exc:
+            self._finish(exc)
+            return
+        finally:
+            self._dispatching = False
+        if self.evlooprefcnt <= 0:
+            self._finish(None)
+        else:
+            self._update_timer()
+
+    def _handle_event(self, fd, event):
+        """Process read or write event on fd."""
+        client, stream = self.reg_clifds.get(fd, (None, None))
+        if client is None:
+            return
+        sname = stream.name
+
+        # set as current processed stream
+        self._current_stream = stream
+        try:
+            self.modify(client, sname, 0, event)
+            if event & E_READ:
+                try:
+                    client._handle_read(sname)
+                except EngineClientEOF:
+                    self._debug("EngineClientEOF %s %s", client, sname)
+                    self._current_stream = None
+                    self.remove_stream(client, stream)
+                    return
+            else:
+                client._handle_write(sname)
+        finally:
+            self._current_stream = None
+
+        # apply any changes occurred during processing
+        if client.registered:
+            self.set_events(client, stream)
+
+    def _handle_timer(self):
+        """Event loop timer callback: fire expired engine timers."""
+        self._timer_handle = self._timer_when = None
+        self.fire_timers()
+
+    def _handle_timeout(self):
+        """Run timeout callback."""
+        self._timeout_handle = None
+        raise EngineTimeoutException()
+
+    def _handle_check(self):
+        """Run completion check callback."""
+        self._check_pending = False
+
+    def _raise_abort(self, kill):
+        """Abort callback."""
+        Engine.abort(self, kill)
+
+    def _finish(self, exc):
+        """
+        Complete current run, successfully if exc is None: the engine is
+        detached from the event loop and the run future is done.
+        """
+        async_run = self.loop is not self._private_loop
+        done = self._detach()
+        if async_run:
+            # same cleanup as Engine.run()
+            try:
+                try:
+                    if isinstance(exc, EngineTimeoutException):
+                        self.clear(did_timeout=True)
+                    elif exc is not None:
+                        self.clear()
+                finally:
+                    self.timerq.clear()
+                    self.running = False
+                    self._prev_fanout = 0
+            except Exception as clear_exc:
+                exc = clear_exc
+        if exc is None:
+            done.set_result(None)
+        else:
+            done.set_exception(exc)
+        callback, self._done_callback = self._done_callback, None
+        if callback is not None:
+            callback(done)
+
+    def run(self, timeout):
+        """Run engine in calling thread, using a private event loop."""
+        if self._private_loop is None:
+            import asyncio
+            self._private_loop = asyncio.new_event_loop()
+        self.loop = self._private_loop
+        Engine.run(self, timeout)
+
+    def runloop(self, timeout):
+        """
+        Run private event loop until run completion.
+        """
+        done = self._attach(self.loop, timeout)
+        try:
+            self.loop.run_until_complete(done)
+        finally:
+            if self._done is not None:
+                # interrupted (eg. KeyboardInterrupt)
+                self._detach()
+        done.result()
+
+    def run_async(self, timeout, callback=None):
+        """
+        Run engine in the event loop of the calling thread. Return a future
+        done when all clients and timers are removed, that is when Engine
+        run() would have returned (or raised). If set, callback is called
+        with this future as soon as it is done, before control returns to
+        the event loop (unlike future done callbacks).
+        """
+        import asyncio
+        if self.running:
+            raise EngineAlreadyRunningError()
+
+        self.loop = asyncio.get_event_loop()
+        self.running = True
+        try:
+            # start ports, peek in ports and start clients like run(), as
+            # registered fds are not attached to the event loop yet
+            self.start_ports()
+            self.snoop_ports()
+            self.start_clients()
+        except:
+            try:
+                self.clear()
+            finally:
+                self.timerq.clear()
+                self.running = False
+                self._prev_fanout = 0
+            raise
+        self._done_callback = callback
+        return self._attach(self.loop, timeout)
+
+    def abort(self, kill):
+        """Abort runloop."""
+        if self._done is not None and not self._dispatching:
+            # running in event loop but not called from an engine event: abort
+            # asynchronously when control returns to the loop
+            self.loop.call_soon(self._callback, self._raise_abort, kill)
+            return
+        Engine.abort(self, kill)
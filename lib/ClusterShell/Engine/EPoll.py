@@ -34,6 +34,11 @@ from ClusterShell.Engine.Engine import EngineTimeoutException
 from ClusterShell.Worker.EngineClient import EngineClientEOF
 
 
+# Maximum number of events returned by a single epoll wait
+EPOLL_MAXEVENTS = 8192
+
+_NO_CLIENT = (None, None)
+
 class EngineEPoll(Engine):
     """
     EPoll Engine
@@ -72,7 +77,7 @@ class EngineEPoll(Engine):
         """
         Engine-specific fd unregistering. Called by Engine unregister.
         """
-        self._debug("UNREGSPEC fd=%d ev_is_set=%x"% (fd, ev_is_set))
+        self._debug("UNREGSPEC fd=%d ev_is_set=%x", fd, ev_is_set)
         if ev_is_set:
             self.epolling.unregister(fd)
 
@@ -83,8 +88,7 @@ class EngineEPoll(Engine):
         For the epoll engine, it modifies the event mask associated to a file
         descriptor.
         """
-        self._debug("MODSPEC fd=%d event=%x setvalue=%d" % (fd, event,
-                                                            setvalue))
+        self._debug("MODSPEC fd=%d event=%x setvalue=%d", fd, event, setvalue)
         if setvalue:
             self._register_specific(fd, event)
         else:
@@ -99,11 +103,15 @@ class EngineEPoll(Engine):
 
         start_time = time.time()
 
+        # local names for attributes used for each event
+        reg_clifds = self.reg_clifds
+        epoll_poll = self.epolling.poll
+
         # run main event loop...
         while self.evlooprefcnt > 0:
-            self._debug("LOOP evlooprefcnt=%d (reg_clifds=%s) (timers=%d)" % \
-                    (self.evlooprefcnt, self.reg_clifds.keys(),
-                     len(self.timerq)))
+            self._debug("LOOP evlooprefcnt=%d (reg_clifds=%s) (timers=%d)",
+                        self.evlooprefcnt, reg_clifds.keys(),
+                        len(self.timerq))
             try:
                 timeo = self.timerq.nextfire_delay()
                 if timeout > 0 and timeo >= timeout:
@@ -119,18 +127,23 @@ class EngineEPoll(Engine):
                     poll_timeo = -1
                 else:
                     poll_timeo = timeo
-                evlist = self.epolling.poll(poll_timeo)
+                # get all ready fds at once (default maxevents is only
+                # FD_SETSIZE - 1)
+                maxevents = min(max(len(reg_clifds), 1), EPOLL_MAXEVENTS)
+                evlist = epoll_poll(poll_timeo, maxevents)
 
             except IOError as ex:
                 # might get interrupted by a signal
                 if ex.errno == errno.EINTR:
                     continue
 
+            loopcnt = self._current_loopcnt
+
             for fd, event in evlist:
 
-                # get client instance
-                client, stream = self._fd2client(fd)
-                if client is None:
+                # get client instance (inlined _fd2client())
+                client, stream = reg_clifds.get(fd, _NO_CLIENT)
+                if client is None or client._reg_epoch >= loopcnt:
                     continue
 
                 fdev = stream.evmask
@@ -141,8 +154,8 @@ class EngineEPoll(Engine):
 
                 # check for poll error condition of some sort
                 if event & select.EPOLLERR:
-                    self._debug("EPOLLERR fd=%d sname=%s fdev=0x%x (%s)" % \
-                                (fd, sname, fdev, client))
+                    self._debug("EPOLLERR fd=%d sname=%s fdev=0x%x (%s)", fd,
+                                sname, fdev, client)
                     assert fdev & E_WRITE
                     self.remove_stream(client, stream)
                     self._current_stream = None
@@ -152,11 +165,15 @@ class EngineEPoll(Engine):
                 if event & select.EPOLLIN:
                     assert fdev & E_READ
                     assert stream.events & fdev, (stream.events, fdev)
-                    self.modify(client, sname, 0, fdev)
+                    # clear interest event: same as modify(client, sname, 0,
+                    # fdev) for the current stream, that is only applied by
+                    # set_events() below, so no epoll_ctl() is performed if
+                    # the client is reading again (usual case)
+                    stream.new_events &= ~fdev
                     try:
                         client._handle_read(sname)
                     except EngineClientEOF:
-                        self._debug("EngineClientEOF %s %s" % (client, sname))
+                        self._debug("EngineClientEOF %s %s", client, sname)
                         self.remove_stream(client, stream)
                         self._current_stream = None
                         continue
@@ -165,25 +182,26 @@ class EngineEPoll(Engine):
                 # time because handle_read() may perform a partial read)
                 elif event & select.EPOLLHUP:
                     assert fdev & E_READ, "fdev 0x%x & E_READ" % fdev
-                    self._debug("EPOLLHUP fd=%d sname=%s %s (%s)" % \
-                                (fd, sname, client, client.streams))
+                    self._debug("EPOLLHUP fd=%d sname=%s %s (%s)", fd, sname,
+                                client, client.streams)
                     self.remove_stream(client, stream)
                     self._current_stream = None
                     continue
 
                 # check for writing
                 if event & select.EPOLLOUT:
-                    self._debug("EPOLLOUT fd=%d sname=%s %s (%s)" % \
-                                (fd, sname, client, client.streams))
+                    self._debug("EPOLLOUT fd=%d sname=%s %s (%s)", fd, sname,
+                                client, client.streams)
                     assert fdev & E_WRITE
                     assert stream.events & fdev, (stream.events, fdev)
-                    self.modify(client, sname, 0, fdev)
+                    # clear interest event (see above)
+                    stream.new_events &= ~fdev
                     client._handle_write(sname)
 
                 self._current_stream = None
 
                 # apply any changes occurred during processing
-                if client.registered:
+                if client.registered and stream.new_events != stream.events:
                     self.set_events(client, stream)
 
             # check for task runloop timeout
@@ -193,6 +211,5 @@ class EngineEPoll(Engine):
             # process clients timeout
             self.fire_timers()
 
-        self._debug("LOOP EXIT evlooprefcnt=%d (reg_clifds=%s) (timers=%d)" % \
-                (self.evlooprefcnt, self.reg_clifds, len(self.timerq)))
-
+        self._debug("LOOP EXIT evlooprefcnt=%d (reg_clifds=%s) (timers=%d)",
+                    self.evlooprefcnt, reg_clifds, len(self.timerq))
@@ -26,7 +26,6 @@ in response to incoming events (from workers, timers, etc.).
 """
 
 import errno
-import heapq
 import logging
 import sys
 import time
@@ -42,6 +41,10 @@ E_WRITE = 0x2
 # Define epsilon value for time float arithmetic operations
 EPSILON = 1.0e-3
 
+# Timer queue position of disarmed and expired (being fired) timers
+_TIMER_DISARMED = -1
+_TIMER_EXPIRED = -2
+
 # Special fanout value for unlimited
 FANOUT_UNLIMITED = -1
 # Special fanout value to use default Engine fanout
@@ -109,7 +112,9 @@ class EngineBaseTimer(object):
         self.interval = interval
         self.autoclose = autoclose
         self._engine = None
-        self._timercase = None
+        # timer queue state (see _EngineTimerQ)
+        self._timer_index = _TIMER_DISARMED
+        self._fire_date = 0.0
 
     def _set_engine(self, engine):
         """
@@ -189,57 +194,11 @@ class EngineTimer(EngineBaseTimer):
         self.eh.ev_timer(self)
 
 class _EngineTimerQ(object):
-
-    class _EngineTimerCase(object):
-        """
-        Helper class that allows comparisons of fire times, to be easily used
-        in an heapq.
-        """
-        def __init__(self, client):
-            self.client = client
-            self.client._timercase = self
-            # arm timer (first time)
-            assert self.client.fire_delay > -EPSILON
-            self.fire_date = self.client.fire_delay + time.time()
-
-        def __lt__(self, other):
-            # NOTE: add @total_ordering decorator in Python 2.7+
-            return self.fire_date < other.fire_date
-
-        def __cmp__(self, other):
-            # DEPRECATED: no longer used in Python 3
-            return cmp(self.fire_date, other.fire_date)
-
-        def arm(self, client):
-            assert client is not None
-            self.client = client
-            self.client._timercase = self
-            # setup next firing date
-            time_current = time.time()
-            if self.client.fire_delay > -EPSILON:
-                self.fire_date = self.client.fire_delay + time_current
-            else:
-                interval = float(self.client.interval)
-                assert interval > 0
-                # Keep it simple: increase fire_date by interval even if
-                # fire_date stays in the past, as in that case it's going to
-                # fire again at next runloop anyway.
-                self.fire_date += interval
-                # Just print a debug message that could help detect issues
-                # coming from a long-running timer handler.
-                if self.fire_date < time_current:
-                    LOGGER.debug("Warning: passed interval time for %r "
-                                 "(long running event handler?)", self.client)
-
-        def disarm(self):
-            client = self.client
-            client._timercase = None
-            self.client = None
-            return client
-
-        def armed(self):
-            return self.client is not None
-
+    """
+    Engine timer queue: binary min-heap of armed timers ordered by fire date.
+    Each timer keeps its position in the heap (_timer_index), so that it can
+    be rescheduled or invalidated in place in O(log n).
+    """
 
     def __init__(self, engine):
         """
@@ -247,6 +206,8 @@ class _EngineTimerQ(object):
         """
         self._engine = engine
         self.timers = []
+        # expired timers being fired (see fire_expired)
+        self._expired = []
         self.armed_count = 0
 
     def __len__(self):
@@ -255,32 +216,120 @@ class _EngineTimerQ(object):
         """
         return self.armed_count
 
+    def _sift_up(self, pos):
+        """Move timer at pos up to its place in the heap."""
+        timers = self.timers
+        timer = timers[pos]
+        fire_date = timer._fire_date
+        while pos > 0:
+            parentpos = (pos - 1) >> 1
+            parent = timers[parentpos]
+            if fire_date >= parent._fire_date:
+                break
+            timers[pos] = parent
+            parent._timer_index = pos
+            pos = parentpos
+        timers[pos] = timer
+        timer._timer_index = pos
+
+    def _sift_down(self, pos):
+        """Move timer at pos down to its place in the heap."""
+        timers = self.timers
+        endpos = len(timers)
+        timer = timers[pos]
+        fire_date = timer._fire_date
+        childpos = 2 * pos + 1
+        while childpos < endpos:
+            rightpos = childpos + 1
+            if rightpos < endpos and \
+                    timers[rightpos]._fire_date < timers[childpos]._fire_date:
+                childpos = rightpos
+            child = timers[childpos]
+            if fire_date <= child._fire_date:
+                break
+            timers[pos] = child
+            child._timer_index = pos
+            pos = childpos
+            childpos = 2 * pos + 1
+        timers[pos] = timer
+        timer._timer_index = pos
+
+    def _push(self, client):
+        """Insert client's timer in the heap."""
+        self.timers.append(client)
+        self._sift_up(len(self.timers) - 1)
+
+    def _remove(self, client):
+        """Remove client's timer from the heap."""
+        timers = self.timers
+        pos = client._timer_index
+        last = timers.pop()
+        if last is not client:
+            timers[pos] = last
+            self._sift_up(pos)
+            self._sift_down(last._timer_index)
+        client._timer_index = _TIMER_DISARMED
+
+    def _pop(self):
+        """Remove and return the first timer to fire from the heap."""
+        timers = self.timers
+        first = timers[0]
+        last = timers.pop()
+        if timers:
+            timers[0] = last
+            self._sift_down(0)
+        return first
+
+    def _disarmed(self, client):
+        """Update counters after client's timer has been disarmed."""
+        self.armed_count -= 1
+        if not client.autoclose:
+            self._engine.evlooprefcnt -= 1
+
     def schedule(self, client):
         """
         Insert and arm a client's timer.
         """
         # arm only if fire is set
         if client.fire_delay > -EPSILON:
-            heapq.heappush(self.timers, _EngineTimerQ._EngineTimerCase(client))
+            client._fire_date = client.fire_delay + time.time()
+            self._push(client)
             self.armed_count += 1
             if not client.autoclose:
                 self._engine.evlooprefcnt += 1
 
     def reschedule(self, client):
         """
-        Re-insert client's timer.
+        Re-arm client's timer with its new fire delay.
         """
-        if client._timercase:
-            self.invalidate(client)
-            self._dequeue_disarmed()
-            self.schedule(client)
+        pos = client._timer_index
+        if pos == _TIMER_DISARMED:
+            # not armed or being fired (rearmed by fire_expired if needed)
+            return
+
+        if client.fire_delay <= -EPSILON:
+            # no more fire set
+            if pos >= 0:
+                self._remove(client)
+            client._timer_index = _TIMER_DISARMED
+            self._disarmed(client)
+            return
+
+        client._fire_date = client.fire_delay + time.time()
+        if pos >= 0:
+            # in-place update
+            self._sift_up(pos)
+            self._sift_down(client._timer_index)
+        else:
+            # expired but not fired yet: it will be skipped by fire_expired
+            self._push(client)
 
     def invalidate(self, client):
         """
-        Invalidate client's timer. Current implementation doesn't really remove
-        the timer, but simply flags it as disarmed.
+        Invalidate client's timer.
         """
-        if not client._timercase:
+        pos = client._timer_index
+        if pos == _TIMER_DISARMED:
             # if timer is being fire, invalidate its values
             client.fire_delay = -1.0
             client.interval = -1.0
@@ -289,61 +338,67 @@ class _EngineTimerQ(object):
         if self.armed_count <= 0:
             raise ValueError("Engine client timer not found in timer queue")
 
-        client._timercase.disarm()
-        self.armed_count -= 1
-        if not client.autoclose:
-            self._engine.evlooprefcnt -= 1
-
-    def _dequeue_disarmed(self):
-        """
-        Dequeue disarmed timers (sort of garbage collection).
-        """
-        while len(self.timers) > 0 and not self.timers[0].armed():
-            heapq.heappop(self.timers)
+        if pos >= 0:
+            self._remove(client)
+        client._timer_index = _TIMER_DISARMED
+        self._disarmed(client)
 
     def fire_expired(self):
         """
         Remove expired timers from the queue and fire associated clients.
         """
-        self._dequeue_disarmed()
-
-        # Build a queue of expired timercases. Any expired (and still armed)
+        # Build a queue of expired timers. Any expired (and still armed)
         # timer is fired, but only once per call.
-        expired_timercases = []
+        timers = self.timers
+        expired = self._expired = []
         now = time.time()
-        while self.timers and self.timers[0].fire_date <= now:
-            expired_timercases.append(heapq.heappop(self.timers))
-            self._dequeue_disarmed()
-
-        for timercase in expired_timercases:
-            # Be careful to recheck and skip any disarmed timers (eg. timer
-            # could be invalidated from another timer's event handler)
-            if not timercase.armed():
+        while timers and timers[0]._fire_date <= now:
+            client = self._pop()
+            client._timer_index = _TIMER_EXPIRED
+            expired.append(client)
+
+        for client in expired:
+            # Be careful to skip any timer invalidated or rescheduled (eg.
+            # from another timer's event handler)
+            if client._timer_index != _TIMER_EXPIRED:
                 continue
 
             # Disarm timer
-            client = timercase.disarm()
+            client._timer_index = _TIMER_DISARMED
 
             # Fire timer
             client.fire_delay = -1.0
             client._fire()
 
             # Rearm it if needed - Note: fire=0 is valid, interval=0 is not
-            if client.fire_delay >= -EPSILON or client.interval > EPSILON:
-                timercase.arm(client)
-                heapq.heappush(self.timers, timercase)
+            if client._timer_index != _TIMER_DISARMED:
+                # already rearmed from its event handler
+                continue
+            if client.fire_delay >= -EPSILON:
+                client._fire_date = client.fire_delay + time.time()
+                self._push(client)
+            elif client.interval > EPSILON:
+                # Keep it simple: increase fire_date by interval even if
+                # fire_date stays in the past, as in that case it's going to
+                # fire again at next runloop anyway.
+                client._fire_date += float(client.interval)
+                # Just print a debug message that could help detect issues
+                # coming from a long-running timer handler.
+                if client._fire_date < time.time():
+                    LOGGER.debug("Warning: passed interval time for %r "
+                                 "(long running event handler?)", client)
+                self._push(client)
             else:
-                self.armed_count -= 1
-                if not client.autoclose:
-                    self._engine.evlooprefcnt -= 1
+                self._disarmed(client)
+
+        self._expired = []
 
     def nextfire_delay(self):
         """
         Return next timer fire delay (relative time).
         """
-        self._dequeue_disarmed()
-        if len(self.timers) > 0:
-            return max(0., self.timers[0].fire_date - time.time())
+        if self.timers:
+            return max(0., self.timers[0]._fire_date - time.time())
 
         return -1
 
@@ -351,11 +406,12 @@ class _EngineTimerQ(object):
         """
         Stop and clear all timers.
         """
-        for timer in self.timers:
-            if timer.armed():
-                timer.client.invalidate()
+        for client in self.timers + self._expired:
+            if client._timer_index != _TIMER_DISARMED:
+                client.invalidate()
 
         self.timers = []
+        self._expired = []
         self.armed_count = 0
 
 
@@ -487,7 +543,7 @@ class Engine(object):
         Remove a client from engine. Does NOT aim to flush individual stream
         read buffers.
         """
-        self._debug("REMOVE %s" % client)
+        self._debug("REMOVE %s", client)
         if client.delayable:
             self._clients.remove(client)
         else:
@@ -541,9 +597,8 @@ class Engine(object):
         assert client in self._clients or client in self._ports
         assert not client.registered
 
-        self._debug("REG %s (%s)(autoclose=%s)" % \
-                (client.__class__.__name__, client.streams,
-                 client.autoclose))
+        self._debug("REG %s (%s)(autoclose=%s)", client.__class__.__name__,
+                    client.streams, client.autoclose)
 
         client.registered = True
         client._reg_epoch = self._current_loopcnt
@@ -566,14 +621,14 @@ class Engine(object):
 
     def unregister_stream(self, client, stream):
         """Unregister a stream from a client."""
-        self._debug("UNREG_STREAM stream=%s" % stream)
+        self._debug("UNREG_STREAM stream=%s", stream)
         assert stream is not None and stream.fd is not None
         assert stream.fd in self.reg_clifds, \
             "stream fd %d not registered" % stream.fd
         assert client.registered
         self._unregister_specific(stream.fd, stream.events & stream.evmask)
-        self._debug("UNREG_STREAM unregistering stream fd %d (%d)" % \
-                    (stream.fd, len(client.streams)))
+        self._debug("UNREG_STREAM unregistering stream fd %d (%d)", stream.fd,
+                    len(client.streams))
         stream.events &= ~stream.evmask
         del self.reg_clifds[stream.fd]
         if not client.autoclose:
@@ -583,8 +638,7 @@ class Engine(object):
         """Unregister a client"""
         # sanity check
         assert client.registered
-        self._debug("UNREG %s (%s)" % (client.__class__.__name__, \
-                client.streams))
+        self._debug("UNREG %s (%s)", client.__class__.__name__, client.streams)
 
         # remove timeout timer
         self.timerq.invalidate(client)
@@ -606,8 +660,8 @@ class Engine(object):
 
     def modify(self, client, sname, setmask, clearmask):
         """Modify the next loop interest events bitset for a client stream."""
-        self._debug("MODEV set:0x%x clear:0x%x %s (%s)" % (setmask, clearmask,
-                                                           client, sname))
+        self._debug("MODEV set:0x%x clear:0x%x %s (%s)", setmask, clearmask,
+                    client, sname)
         stream = client.streams[sname]
         stream.new_events &= ~clearmask
         stream.new_events |= setmask
@@ -630,8 +684,8 @@ class Engine(object):
 
     def set_events(self, client, stream):
         """Set the active interest events bitset for a client stream."""
-        self._debug("SETEV new_events:0x%x events:0x%x for %s[%s]" % \
-            (stream.new_events, stream.events, client, stream.name))
+        self._debug("SETEV new_events:0x%x events:0x%x for %s[%s]",
+                    stream.new_events, stream.events, client, stream.name)
 
         if not client.registered:
             LOGGER.debug("set_events: client %s not registered", self)
@@ -685,7 +739,7 @@ class Engine(object):
         # Ports are special, non-delayable engine clients
         for port in self._ports:
             if not port.registered:
-                self._debug("START PORT %s" % port)
+                self._debug("START PORT %s", port)
                 self.register(port._start())
 
     def start_clients(self):
@@ -698,7 +752,7 @@ class Engine(object):
 
         for client in self._clients:
             if not client.registered and self._can_register(client):
-                self._debug("START CLIENT %s" % client.__class__.__name__)
+                self._debug("START CLIENT %s", client.__class__.__name__)
                 self.register(client._start())
                 # if first time or engine fanout has changed, we do a full scan
                 if fanout_diff == 0:
@@ -780,7 +834,8 @@ class Engine(object):
         """Returns True if the engine has exited the runloop once."""
         return not self.running and self._exited
 
-    def _debug(self, s):
-        """library engine verbose debugging hook"""
-        #LOGGER.debug(s)
+    def _debug(self, fmt, *args):
+        """library engine verbose debugging hook (lazy formatting, as it is
+        called for each event)"""
+        #LOGGER.debug(fmt, *args)
         pass
@@ -28,6 +28,7 @@ import logging
 from ClusterShell.Engine.Engine import EngineNotSupportedError
 
 # Available event engines
+from ClusterShell.Engine.Asyncio import EngineAsyncio
 from ClusterShell.Engine.EPoll import EngineEPoll
 from ClusterShell.Engine.Poll import EnginePoll
 from ClusterShell.Engine.Select import EngineSelect
@@ -38,7 +39,8 @@ class PreferredEngine(object):
     Preferred Engine selection metaclass (DP Abstract Factory).
     """
 
-    engines = {EngineEPoll.identifier: EngineEPoll,
+    engines = {EngineAsyncio.identifier: EngineAsyncio,
+               EngineEPoll.identifier: EngineEPoll,
                EnginePoll.identifier: EnginePoll,
                EngineSelect.identifier: EngineSelect}
 
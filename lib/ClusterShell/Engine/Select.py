@@ -80,8 +80,7 @@ class EngineSelect(Engine):
         register/unregister and set_events(). For the select() engine,
         it appends/remove the fd to/from the concerned fd_sets.
         """
-        self._debug("MODSPEC fd=%d event=%x setvalue=%d" % (fd, event,
-                                                            setvalue))
+        self._debug("MODSPEC fd=%d event=%x setvalue=%d", fd, event, setvalue)
         if setvalue:
             self._register_specific(fd, event)
         else:
@@ -98,8 +97,9 @@ class EngineSelect(Engine):
 
         # run main event loop...
         while self.evlooprefcnt > 0:
-            self._debug("LOOP evlooprefcnt=%d (reg_clifds=%s) (timers=%d)" % 
-                (self.evlooprefcnt, self.reg_clifds.keys(), len(self.timerq)))
+            self._debug("LOOP evlooprefcnt=%d (reg_clifds=%s) (timers=%d)",
+                        self.evlooprefcnt, self.reg_clifds.keys(),
+                        len(self.timerq))
             try:
                 timeo = self.timerq.nextfire_delay()
                 if timeout > 0 and timeo >= timeout:
@@ -142,21 +142,21 @@ class EngineSelect(Engine):
 
                 # check for possible unblocking read on this fd
                 if fd in r_ready:
-                    self._debug("R_READY fd=%d %s (%s)" % (fd,
-                        client.__class__.__name__, client.streams))
+                    self._debug("R_READY fd=%d %s (%s)", fd,
+                                client.__class__.__name__, client.streams)
                     assert fdev & E_READ
                     assert stream.events & fdev
                     self.modify(client, sname, 0, fdev)
                     try:
                         client._handle_read(sname)
                     except EngineClientEOF:
-                        self._debug("EngineClientEOF %s" % client)
+                        self._debug("EngineClientEOF %s", client)
                         self.remove_stream(client, stream)
 
                 # check for writing
                 if fd in w_ready:
-                    self._debug("W_READY fd=%d %s (%s)" % (fd,
-                        client.__class__.__name__, client.streams))
+                    self._debug("W_READY fd=%d %s (%s)", fd,
+                                client.__class__.__name__, client.streams)
                     assert fdev == E_WRITE
                     assert stream.events & fdev
                     self.modify(client, sname, 0, fdev)
@@ -176,5 +176,5 @@ class EngineSelect(Engine):
             # process clients timeout
             self.fire_timers()
 
-        self._debug("LOOP EXIT evlooprefcnt=%d (reg_clifds=%s) (timers=%d)" %
-                    (self.evlooprefcnt, self.reg_clifds, len(self.timerq)))
+        self._debug("LOOP EXIT evlooprefcnt=%d (reg_clifds=%s) (timers=%d)",
+                    self.evlooprefcnt, self.reg_clifds, len(self.timerq))
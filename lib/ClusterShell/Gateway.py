@@ -25,13 +25,15 @@ on stdin via the SSH connection, interprets them, takes decisions, and prints
 out replies on stdout.
 """
 
+from collections import deque
 import logging
 import os
 import sys
 import traceback
 
+from ClusterShell.Defaults import DEFAULTS
 from ClusterShell.Event import EventHandler
-from ClusterShell.NodeSet import NodeSet
+from ClusterShell.NodeSet import NodeSet, FrozenNodeSet
 from ClusterShell.Task import task_self, _getshorthostname
 from ClusterShell.Engine.Engine import EngineAbortException
 from ClusterShell.Worker.fastsubprocess import set_nonblock_flag
@@ -64,7 +66,7 @@ class TreeWorkerResponder(EventHandler):
         self.gwchan = gwchan    # gateway channel
         self.srcwkr = srcwkr    # id of distant parent TreeWorker
         self.worker = None      # local TreeWorker instance
-        self.retcodes = {}      # self-managed retcodes
+        self.retcodes = {}      # self-managed retcodes (rc => node list)
         self.logger = logging.getLogger(__name__)
 
         # Grooming initialization
@@ -107,7 +109,8 @@ class TreeWorkerResponder(EventHandler):
         # specifically manage retcodes to periodically return latest
         # retcodes to parent node, instead of doing it at ev_hup (no msg
         # aggregation) or at ev_close (no parent node live updates)
-        for rc, nodes in self.retcodes.items():
+        for rc, nodelist in self.retcodes.items():
+            nodes = FrozenNodeSet._fromlist1(nodelist)
             self.logger.debug("iter(rc): %s: rc=%d", nodes, rc)
             self.gwchan.send(RetcodeMessage(nodes, rc, self.srcwkr))
         self.retcodes.clear()
@@ -123,16 +126,17 @@ class TreeWorkerResponder(EventHandler):
         if self.timer is None:
             self.gwchan.send(msg_class(node, msg, self.srcwkr))
 
+    def ev_written(self, worker, node, sname, size):
+        """data written to one node: acknowledge delayed writes if possible"""
+        self.gwchan._ack_writes()
+
     def ev_hup(self, worker, node, rc):
         """Received end of command from one node"""
         if self.timer is None:
             self.gwchan.send(RetcodeMessage(node, rc, self.srcwkr))
         else:
             # retcode grooming
-            if rc in self.retcodes:
-                self.retcodes[rc].add(node)
-            else:
-                self.retcodes[rc] = NodeSet(node)
+            self.retcodes.setdefault(rc, []).append(node)
 
     def ev_close(self, worker, timedout):
         """End of CTL responder"""
@@ -165,6 +169,7 @@ class GatewayChannel(Channel):
         self.nodename = None
         self.topology = None
         self.propagation = None
+        self._write_acks = deque()  # write messages not acknowledged yet
         self.logger = logging.getLogger(__name__)
 
     def start(self):
@@ -294,8 +299,13 @@ class GatewayChannel(Channel):
                 data = msg.data_decode()
                 self.logger.debug('GatewayChannel write: %d bytes',
                                   len(data['buf']))
-                self.propagation.write(data['buf'])
-                self._ack(msg)
+                self._write_acks.append(msg)
+                if self.propagation.write(data['buf']):
+                    self._ack_writes()
+                else:
+                    # acknowledged when enough data has been written, so
+                    # that the parent node stops writing in the meantime
+                    self.logger.debug('GatewayChannel write: delaying ack')
             elif msg.action == 'eof':
                 self.logger.debug('GatewayChannel eof')
                 self.propagation.set_write_eof()
@@ -309,6 +319,15 @@ class GatewayChannel(Channel):
         """acknowledge a received message"""
         self.send(ACKMessage(msg.msgid))
 
+    def _ack_writes(self):
+        """acknowledge received write messages, in order, if the data
+        waiting to be written is below the write high-water mark"""
+        write_hwm = DEFAULTS.write_hwm
+        if self._write_acks and (write_hwm <= 0 or
+                                 self.propagation.write_pending() < write_hwm):
+            while self._write_acks:
+                self._ack(self._write_acks.popleft())
+
     def ev_close(self, worker, timedout):
         """Gateway (parent) channel is closing.
 
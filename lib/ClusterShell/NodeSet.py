@@ -49,17 +49,21 @@ Usage example
   cluster32
 """
 
+from collections import OrderedDict
 import fnmatch
 import re
 import string
 import sys
+import threading
 
 from ClusterShell.Defaults import config_paths, DEFAULTS
 import ClusterShell.NodeUtils as NodeUtils
 
 # Import all RangeSet module public objects
-from ClusterShell.RangeSet import RangeSet, RangeSetND, AUTOSTEP_DISABLED
+from ClusterShell.RangeSet import RangeSet, FrozenRangeSet, RangeSetND
+from ClusterShell.RangeSet import AUTOSTEP_DISABLED
 from ClusterShell.RangeSet import RangeSetParseError
+from ClusterShell.RangeSet import _KeyCollector, _tokey
 
 
 # Python 3 compatibility
@@ -421,34 +425,23 @@ class NodeSetBase(object):
         if isinstance(index, slice):
             inst = NodeSetBase()
             sl_start, sl_stop, sl_step = self._extractslice(index)
-            sl_next = sl_start
-            if sl_stop <= sl_next:
-                return inst
-            length = 0
+            length = 0  # position of first node of current pattern
             for pat, rangeset in sorted(self._patterns.items()):
-                if rangeset:
-                    cnt = len(rangeset)
-                    offset = sl_next - length
-                    if offset < cnt:
-                        num = min(sl_stop - sl_next, cnt - offset)
-                        inst._add(pat, rangeset[offset:offset + num:sl_step])
-                    else:
-                        #skip until sl_next is reached
-                        length += cnt
-                        continue
-                else:
-                    cnt = num = 1
-                    if sl_next > length:
-                        length += cnt
-                        continue
-                    inst._add(pat, None)
-                # adjust sl_next...
-                sl_next += num
-                if (sl_next - sl_start) % sl_step:
-                    sl_next = sl_start + \
-                        ((sl_next - sl_start)/sl_step + 1) * sl_step
-                if sl_next >= sl_stop:
+                if length >= sl_stop:
                     break
+                cnt = len(rangeset) if rangeset else 1
+                # first selected position within this pattern, if any
+                if length <= sl_start:
+                    first = sl_start
+                else:
+                    first = sl_start + -(-(length - sl_start) // sl_step) \
+                                       * sl_step
+                if first < min(length + cnt, sl_stop):
+                    if rangeset:
+                        stop = min(cnt, sl_stop - length)
+                        inst._add(pat, rangeset[first - length:stop:sl_step])
+                    else:
+                        inst._add(pat, None)
                 length += cnt
             return inst
         elif isinstance(index, int):
@@ -463,13 +456,8 @@ class NodeSetBase(object):
                 if rangeset:
                     cnt = len(rangeset)
                     if index < length + cnt:
-                        # return a subrangeset of size 1 to manage padding
-                        if rangeset.dim() == 1:
-                            return pat % rangeset[index-length:index-length+1]
-                        else:
-                            sub = rangeset[index-length:index-length+1]
-                            for rgvec in sub.vectors():
-                                return pat % (tuple(rgvec))
+                        # indexes are returned as strings with padding
+                        return pat % rangeset[index - length]
                 else:
                     cnt = 1
                     if index == length:
@@ -592,14 +580,25 @@ class NodeSetBase(object):
 
         tmp_ns = NodeSetBase()
 
-        for pat, irangeset in other._patterns.items():
-            rangeset = self._patterns.get(pat)
+        # only look up patterns of the nodeset with fewer patterns
+        swapped = len(other._patterns) <= len(self._patterns)
+        if swapped:
+            patterns, lookup = other._patterns, self._patterns
+        else:
+            patterns, lookup = self._patterns, other._patterns
+
+        for pat, irangeset in patterns.items():
+            rangeset = lookup.get(pat)
             if rangeset:
-                irset = rangeset.intersection(irangeset)
+                # always intersect self's rangeset to keep its autostep
+                if swapped:
+                    irset = rangeset.intersection(irangeset)
+                else:
+                    irset = irangeset.intersection(rangeset)
                 # ignore pattern if empty rangeset
-                if len(irset) > 0:
+                if irset:
                     tmp_ns._add(pat, irset, copy_rangeset=False)
-            elif not irangeset and pat in self._patterns:
+            elif not irangeset and pat in lookup:
                 # intersect two nodes with no rangeset
                 tmp_ns._add(pat, None)
 
@@ -644,7 +643,14 @@ class NodeSetBase(object):
         purge_patterns = []
 
         # iterate first over exclude nodeset rangesets which is usually smaller
-        for pat, erangeset in other._patterns.items():
+        if strict or len(other._patterns) <= len(self._patterns):
+            patterns = other._patterns.items()
+        else:
+            # fewer patterns here: only consider common patterns
+            patterns = ((pat, other._patterns[pat]) for pat in self._patterns
+                        if pat in other._patterns)
+
+        for pat, erangeset in patterns:
             # if pattern is found, deal with it
             rangeset = self._patterns.get(pat)
             if rangeset:
@@ -652,7 +658,7 @@ class NodeSetBase(object):
                 rangeset.difference_update(erangeset, strict)
 
                 # check if no range left and add pattern to purge list
-                if len(rangeset) == 0:
+                if not rangeset:
                     purge_patterns.append(pat)
             else:
                 # unnumbered node exclusion
@@ -744,6 +750,12 @@ class NodeSetBase(object):
         return self
 
 
+# Characters of node set strings that need parsing (ranges, operators, node
+# groups, wildcards or escaping): names without any are single node names
+_NODE_SPECIAL_CHARS_RE = re.compile(r'[][,!&^@*?%\s]')
+_NODE_INDEX_RE = re.compile(r'(\d+)')
+_NODE_1D_RE = re.compile(r'([^][,!&^@*?%\s\d]*)(\d+)([^][,!&^@*?%\s\d]*)\Z')
+
 def _strip_escape(nsstr):
     """
     Helper to prepare a nodeset string for parsing: trim boundary
@@ -773,10 +785,18 @@ class ParsingEngine(object):
                 '^': 'symmetric_difference_update'}
 
     OP_CODES_PAT = '[%s]' % re.escape(''.join(OP_CODES.keys()))
+    OP_CODES_RE = re.compile(OP_CODES_PAT)
 
     BRACKET_OPEN = '['
     BRACKET_CLOSE = ']'
 
+    # Max number of string scanning results kept in the LRU cache shared by
+    # all parsing engines (scanning doesn't depend on group resolution)
+    SCAN_CACHE_SIZE = 1024
+
+    _scan_cache = OrderedDict()
+    _scan_cache_lock = threading.Lock()
+
     def __init__(self, group_resolver, node_wildcard_enable=True):
         """
         Initialize Parsing Engine.
@@ -814,67 +834,117 @@ class ParsingEngine(object):
 
         Return a NodeSetBase object.
         """
-        alln_cache = None  # used to compute 'all nodes' only once
+        cache = {}  # used to compute 'all nodes' only once
         nodeset = NodeSetBase()
         nsstr = _strip_escape(nsstr)
+        terms = self._scan_string_cached(nsstr, autostep)
+        if self.group_resolver:
+            self._prefetch_groups(terms, namespace)
 
-        for opc, pat, rgnd in self._scan_string(nsstr, autostep):
+        for opc, pat, rgnd in terms:
             # Parser main debugging:
             #print "OPC %s PAT %s RANGESETS %s" % (opc, pat, rgnd)
-            if self.group_resolver and pat[0] == '@':
-                ns_group = NodeSetBase()
-                for nodegroup in NodeSetBase(pat, rgnd):
-                    # parse/expand nodes group: get group string and namespace
-                    ns_str_ext, ns_nsp_ext = self.parse_group_string(nodegroup,
-                                                                     namespace)
-                    if ns_str_ext: # may still contain groups
-                        # recursively parse and aggregate result
-                        ns_group.update(self.parse_string(ns_str_ext,
-                                                          autostep,
-                                                          ns_nsp_ext))
-                # perform operation
-                getattr(nodeset, opc)(ns_group)
-
-            elif self.group_resolver and self.node_wc and ('*' in pat or
-                                                           '?' in pat):
-                # We support ranges with wildcard mask by testing all nodes
-                # against each expanded mask (wcmasks).
-                wcmasks = (str(wcn) for wcn in NodeSetBase(pat, rgnd, False))
-
-                # Our reference set is 'all nodes', we need to build it from
-                # NodeSetBase to iterate over each individual node.
-                if alln_cache is None:
-                    self.node_wc = False  # avoid infinite recursion
-                    try:
-                        nsb = NodeSetBase()
-                        for res in self.all_nodes(namespace):
-                            nsb.update(self.parse_string(res, autostep,
-                                                         namespace))
-                        alln_cache = set(str(node) for node in nsb)
-                    finally:
-                        self.node_wc = True
-
-                alln = alln_cache.copy()
-
-                # A wildcarded nodeset can be seen as a single nodeset, so we
-                # compute the union of nodes matching the wildcard mask(s) and
-                # use the resulting NodeSetBase object as argument of the next
-                # operation (opc).
-                wcns = NodeSetBase()
-                for wcmask in wcmasks:
-                    # Expand nodes matching any of the wildcard mask
-                    for node in fnmatch.filter(alln, wcmask):
-                        alln.remove(node)  # remove matching node for next iter
-                        wcp, wcr = self._scan_string_single(node, autostep)
-                        wcrgnd = _rsets4nsb(wcr, autostep)
-                        wcns.update(NodeSetBase(wcp, wcrgnd, False))
-                getattr(nodeset, opc)(wcns)
-
-            else:
-                getattr(nodeset, opc)(NodeSetBase(pat, rgnd, False))
-
+            getattr(nodeset, opc)(self.parse_term(pat, rgnd, autostep,
+                                                  namespace, cache))
         return nodeset
 
+    def _prefetch_groups(self, terms, namespace=None):
+        """Resolve at once node groups found in scanned terms, when there
+        are several groups in a same namespace. Group resolution errors are
+        ignored here, as they are reported when each group is parsed."""
+        groups = {}  # namespace => list of group names
+        for _, pat, rgnd in terms:
+            if pat[0] != '@':
+                continue
+            for nodegroup in NodeSetBase(pat, rgnd):
+                grpstr = group = str(nodegroup)[1:]
+                grpns = namespace
+                if grpstr.startswith('@'):
+                    continue  # @@source group name list
+                if grpstr.find(':') >= 0:
+                    grpns, group = grpstr.split(':', 1)
+                if group != '*':
+                    groups.setdefault(grpns, []).append(group)
+        for grpns, grplist in groups.items():
+            if len(grplist) > 1:
+                try:
+                    self.group_resolver.group_nodes_batch(grplist, grpns)
+                except (NodeUtils.GroupSourceError,
+                        NodeUtils.GroupResolverError):
+                    pass
+
+    def scan_terms(self, nsstr, autostep):
+        """Scan provided string without resolving any node group.
+
+        Return a tuple of terms (opcode, pattern, rangeset) that should be
+        evaluated with :meth:`parse_term` and combined from left to right
+        by calling their opcode method on an empty NodeSetBase object.
+        Returned rangesets are shared and should not be modified.
+        """
+        return self._scan_string_cached(_strip_escape(nsstr), autostep)
+
+    def parse_term(self, pat, rgnd, autostep, namespace=None, cache=None):
+        """Parse a scanned term (see :meth:`scan_terms`) in optional
+        namespace, resolving node groups and wildcards.
+
+        The optional `cache` dict may be shared by terms of a same string
+        to compute 'all nodes' only once.
+
+        Return a NodeSetBase object, that may reference `rgnd`.
+        """
+        if cache is None:
+            cache = {}
+
+        if self.group_resolver and pat[0] == '@':
+            ns_group = NodeSetBase()
+            for nodegroup in NodeSetBase(pat, rgnd):
+                # parse/expand nodes group: get group string and namespace
+                ns_str_ext, ns_nsp_ext = self.parse_group_string(nodegroup,
+                                                                 namespace)
+                if ns_str_ext: # may still contain groups
+                    # recursively parse and aggregate result
+                    ns_group.update(self.parse_string(ns_str_ext,
+                                                      autostep,
+                                                      ns_nsp_ext))
+            return ns_group
+
+        if self.group_resolver and self.node_wc and ('*' in pat or
+                                                     '?' in pat):
+            # We support ranges with wildcard mask by testing all nodes
+            # against each expanded mask (wcmasks).
+            wcmasks = (str(wcn) for wcn in NodeSetBase(pat, rgnd, False))
+
+            # Our reference set is 'all nodes', we need to build it from
+            # NodeSetBase to iterate over each individual node.
+            if 'alln' not in cache:
+                self.node_wc = False  # avoid infinite recursion
+                try:
+                    nsb = NodeSetBase()
+                    for res in self.all_nodes(namespace):
+                        nsb.update(self.parse_string(res, autostep,
+                                                     namespace))
+                    cache['alln'] = set(str(node) for node in nsb)
+                finally:
+                    self.node_wc = True
+
+            alln = cache['alln'].copy()
+
+            # A wildcarded nodeset can be seen as a single nodeset, so we
+            # compute the union of nodes matching the wildcard mask(s) and
+            # use the resulting NodeSetBase object as argument of the next
+            # operation.
+            wcns = NodeSetBase()
+            for wcmask in wcmasks:
+                # Expand nodes matching any of the wildcard mask
+                for node in fnmatch.filter(alln, wcmask):
+                    alln.remove(node)  # remove matching node for next iter
+                    wcp, wcr = self._scan_string_single(node, autostep)
+                    wcrgnd = _rsets4nsb(wcr, autostep)
+                    wcns.update(NodeSetBase(wcp, wcrgnd, False))
+            return wcns
+
+        return NodeSetBase(pat, rgnd, False)
+
     def parse_string_single(self, nsstr, autostep):
         """Parse provided string and return a NodeSetBase object."""
         pat, rangesets = self._scan_string_single(_strip_escape(nsstr),
@@ -923,7 +993,7 @@ class ParsingEngine(object):
         for grpstr in self.group_resolver.grouplist(namespace):
             # We scan each group string to expand any range seen...
             grpstr = _strip_escape(grpstr)
-            for opc, pat, rgnd in self._scan_string(grpstr, None):
+            for opc, pat, rgnd in self._scan_string_cached(grpstr, None):
                 getattr(grpset, opc)(NodeSetBase(pat, rgnd, False))
         return list(grpset)
 
@@ -939,8 +1009,11 @@ class ParsingEngine(object):
             try:
                 # As the resolver is not able to provide all nodes directly,
                 # failback to list + map(s) method:
-                for grp in self.grouplist(namespace):
-                    alln += self.group_resolver.group_nodes(grp, namespace)
+                grplist = self.grouplist(namespace)
+                grpnodes = self.group_resolver.group_nodes_batch(grplist,
+                                                                 namespace)
+                for grp in grplist:
+                    alln += grpnodes[grp]
             except NodeUtils.GroupSourceNoUpcall:
                 # We are not able to find "all" nodes, definitely.
                 msg = "Not enough working methods (all or map + list) to " \
@@ -952,7 +1025,7 @@ class ParsingEngine(object):
 
     def _next_op(self, pat):
         """Opcode parsing subroutine."""
-        mobj = re.search(ParsingEngine.OP_CODES_PAT, pat)
+        mobj = self.OP_CODES_RE.search(pat)
         if mobj:
             return mobj.span()[0], mobj.group()
         else:
@@ -992,6 +1065,34 @@ class ParsingEngine(object):
                 pat += pfx
         return pat, rangesets
 
+    def _scan_string_cached(self, nsstr, autostep):
+        """Get the results of _scan_string() as a tuple of (op, pat, rgnd)
+        tuples, using a LRU cache keyed by (nsstr, autostep).
+
+        Rangeset objects found in the results are shared: they must be used
+        as read-only operands (eg. wrapped in a non-copied NodeSetBase object
+        that is used as the argument of a set operation).
+        """
+        key = (nsstr, autostep)
+        cache = self._scan_cache
+        with self._scan_cache_lock:
+            results = cache.pop(key, None)
+            if results is not None:
+                cache[key] = results  # now most recently used
+                return results
+
+        results = tuple(self._scan_string(nsstr, autostep))
+        for _, _, rgnd in results:
+            if isinstance(rgnd, RangeSetND):
+                # fold now as reading an unfolded RangeSetND modifies it
+                rgnd.fold()
+
+        with self._scan_cache_lock:
+            cache[key] = results
+            while len(cache) > self.SCAN_CACHE_SIZE:
+                cache.popitem(last=False)  # least recently used
+        return results
+
     def _scan_string(self, nsstr, autostep):
         """Parsing engine's string scanner method (iterator)."""
         next_op_code = ','  # if no operator, default one is to update nodeset
@@ -1158,6 +1259,42 @@ class ParsingEngine(object):
         return outerstrip, inner
 
 
+class _GroupIndex(object):
+    """
+    Reverse index of the node groups of a group source. [private]
+
+    Groups are indexed by node pattern, so that the groups of a whole
+    nodeset are found by intersecting rangesets of common patterns only,
+    instead of testing each node against each group.
+    """
+
+    def __init__(self):
+        """Initialize an empty group index."""
+        self.groups = {}     # group name => NodeSetBase
+        self._patterns = {}  # pattern => list of (group name, rangeset)
+
+    def add(self, group, nodeset):
+        """Index nodes of group (a NodeSetBase object)."""
+        self.groups[group] = nodeset
+        for pat, rangeset in nodeset._patterns.items():
+            self._patterns.setdefault(pat, []).append((group, rangeset))
+
+    def intersection_counts(self, nodeset):
+        """Return a dict of group names (having nodes in common with the
+        provided NodeSetBase object) => number of nodes in common."""
+        counts = {}
+        for pat, rangeset in nodeset._patterns.items():
+            for group, grp_rangeset in self._patterns.get(pat, ()):
+                if rangeset is None:
+                    cnt = 1
+                else:
+                    cnt = len(rangeset.intersection(grp_rangeset))
+                    if not cnt:
+                        continue
+                counts[group] = counts.get(group, 0) + cnt
+        return counts
+
+
 class NodeSet(NodeSetBase):
     """
     Iterable class of nodes with node ranges support.
@@ -1268,6 +1405,65 @@ class NodeSet(NodeSetBase):
         inst.updaten(nodelist)
         return inst
 
+    @classmethod
+    def fromiter(cls, iterable, autostep=None, resolver=None):
+        """Class method that returns a new NodeSet with nodes from an iterable
+        of strings, like lines of a large host file.
+
+        Single node names are grouped by pattern and their indexes are
+        collected as integers, then sorted and folded at once for each
+        pattern, so that this is much faster and uses less memory than
+        adding nodes one by one. Other strings (node sets, node groups or
+        extended patterns) are parsed and added as with :meth:`fromlist`.
+        """
+        inst = NodeSet(autostep=autostep, resolver=resolver)
+        # pattern => _KeyCollector (1D) or dict of leading indexes => last
+        # dimension _KeyCollector (nD)
+        buckets = {}
+        for node in iterable:
+            node = node.strip()
+            mobj = _NODE_1D_RE.match(node)
+            if mobj and len(node) <= 100:
+                # fast path: single node name with one index
+                pfx, idx, sfx = mobj.groups()
+                pat = pfx + '%s' + sfx
+                collector = buckets.get(pat)
+                if collector is None:
+                    collector = buckets[pat] = _KeyCollector()
+                collector.add(_tokey(int(idx), len(idx)))
+                continue
+            if not node:
+                continue
+            if _NODE_SPECIAL_CHARS_RE.search(node):
+                inst.update(node)
+                continue
+            pieces = _NODE_INDEX_RE.split(node)
+            indexes = pieces[1::2]
+            if not indexes:
+                inst._add(node, None)  # non-indexed node name
+                continue
+            if max(len(idx) for idx in indexes) > 100:
+                inst.update(node)  # let the parser report invalid index
+                continue
+            pat = '%s'.join(pieces[::2])
+            last = indexes.pop()
+            collectors = buckets.setdefault(pat, {})
+            collector = collectors.get(tuple(indexes))
+            if collector is None:
+                collector = collectors[tuple(indexes)] = _KeyCollector()
+            collector.add(_tokey(int(last), len(last)))
+
+        for pat, collector in buckets.items():
+            if isinstance(collector, _KeyCollector):
+                rgnd = collector.rangeset(autostep)
+            else:
+                rgnd = RangeSetND([[RangeSet(idx, autostep) for idx in lead]
+                                   + [coll.rangeset(autostep)]
+                                   for lead, coll in collector.items()],
+                                  None, autostep, copy_rangeset=False)
+            inst._add(pat, rgnd, False)
+        return inst
+
     @classmethod
     def fromall(cls, groupsource=None, autostep=None, resolver=None):
         """Class method that returns a new NodeSet with all nodes from optional
@@ -1333,65 +1529,77 @@ class NodeSet(NodeSetBase):
 
     __copy__ = copy # For the copy module
 
-    def _find_groups(self, node, namespace, allgroups):
-        """Find groups of node by namespace."""
-        if allgroups:
-            # find node groups using in-memory allgroups
-            for grp, nodeset in allgroups.items():
-                if node in nodeset:
-                    yield grp
-        else:
-            # find node groups using resolver
+    def _find_groups(self, node, namespace):
+        """Find groups of node by namespace using resolver."""
+        try:
+            for group in self._resolver.node_groups(node, namespace):
+                yield group
+        except NodeUtils.GroupSourceQueryFailed as exc:
+            msg = "Group source query failed: %s" % exc
+            raise NodeSetExternalError(msg)
+
+    def _group_index(self, groupsource, allgrplist):
+        """Get reverse group index of groupsource, using cached index if
+        available or building it from all groups in allgrplist."""
+        index = self._resolver.group_index(groupsource)
+        if index is None:
+            index = _GroupIndex()
             try:
-                for group in self._resolver.node_groups(node, namespace):
-                    yield group
+                allgrpnodes = self._resolver.group_nodes_batch(allgrplist,
+                                                               groupsource)
+                for grp in allgrplist:
+                    index.add(grp, NodeSet(",".join(allgrpnodes[grp]),
+                                           resolver=self._resolver))
             except NodeUtils.GroupSourceQueryFailed as exc:
-                msg = "Group source query failed: %s" % exc
-                raise NodeSetExternalError(msg)
+                # External result inconsistency
+                raise NodeSetExternalError("Unable to map a group " \
+                        "previously listed\n\tFailed command: %s" % exc)
+            self._resolver.set_group_index(index, groupsource)
+        return index
 
     def _groups2(self, groupsource=None, autostep=None):
         """Find node groups this nodeset belongs to. [private]"""
         if not self._resolver:
             raise NodeSetExternalError("No node group resolver")
-        try:
-            # Get all groups in specified group source.
-            allgrplist = self._parser.grouplist(groupsource)
-        except NodeUtils.GroupSourceError:
-            # If list query failed, we still might be able to regroup
-            # using reverse.
-            allgrplist = None
         groups_info = {}
-        allgroups = {}
-        # Check for external reverse presence, and also use the
-        # following heuristic: external reverse is used only when number
-        # of groups is greater than the NodeSet size.
-        if self._resolver.has_node_groups(groupsource) and \
-            (not allgrplist or len(allgrplist) >= len(self)):
-            # use external reverse
-            pass
-        else:
+        try:
+            index = self._resolver.group_index(groupsource)
+        except NodeUtils.GroupResolverSourceError:
+            index = None
+        if index is None:
+            try:
+                # Get all groups in specified group source.
+                allgrplist = self._parser.grouplist(groupsource)
+            except NodeUtils.GroupSourceError:
+                # If list query failed, we still might be able to regroup
+                # using reverse.
+                allgrplist = None
+            # Check for external reverse presence, and also use the
+            # following heuristic: external reverse is used only when number
+            # of groups is greater than the NodeSet size.
+            if self._resolver.has_node_groups(groupsource) and \
+                (not allgrplist or len(allgrplist) >= len(self)):
+                # use external reverse
+                for node in self._iterbase():
+                    for grp in self._find_groups(node, groupsource):
+                        if grp not in groups_info:
+                            nodes = self._parser.parse_group(grp, groupsource,
+                                                             autostep)
+                            groups_info[grp] = (1, nodes)
+                        else:
+                            i, nodes = groups_info[grp]
+                            groups_info[grp] = (i + 1, nodes)
+                return groups_info
             if not allgrplist: # list query failed and no way to reverse!
                 return groups_info # empty
-            try:
-                # use internal reverse: populate allgroups
-                for grp in allgrplist:
-                    nodelist = self._resolver.group_nodes(grp, groupsource)
-                    allgroups[grp] = NodeSet(",".join(nodelist),
-                                             resolver=self._resolver)
-            except NodeUtils.GroupSourceQueryFailed as exc:
-                # External result inconsistency
-                raise NodeSetExternalError("Unable to map a group " \
-                        "previously listed\n\tFailed command: %s" % exc)
-
-        # For each NodeSetBase in self, find its groups.
-        for node in self._iterbase():
-            for grp in self._find_groups(node, groupsource, allgroups):
-                if grp not in groups_info:
-                    nodes = self._parser.parse_group(grp, groupsource, autostep)
-                    groups_info[grp] = (1, nodes)
-                else:
-                    i, nodes = groups_info[grp]
-                    groups_info[grp] = (i + 1, nodes)
+            # use internal reverse: get or build group index
+            index = self._group_index(groupsource, allgrplist)
+
+        # Count nodes in common with each group using reverse index.
+        for grp, cnt in index.intersection_counts(self).items():
+            nodes = NodeSetBase(autostep=autostep)
+            nodes.update(index.groups[grp])
+            groups_info[grp] = (cnt, nodes)
         return groups_info
 
     def groups(self, groupsource=None, noprefix=False):
@@ -1434,21 +1642,25 @@ class NodeSet(NodeSetBase):
                 fulls.append((i, k))
 
         rest = NodeSet(self, resolver=RESOLVER_NOGROUP)
-        regrouped = NodeSet(resolver=RESOLVER_NOGROUP)
+        regrouped = []
 
         # Build regrouped NodeSet by selecting largest groups first.
         for _, grp in sorted(fulls, key=lambda x: (-x[0], x[1])):
             if not overlap and groups[grp][1] not in rest:
                 continue
             if groupsource and not noprefix:
-                regrouped.update("@%s:%s" % (groupsource, grp))
+                regrouped.append("@%s:%s" % (groupsource, grp))
             else:
-                regrouped.update("@" + grp)
+                regrouped.append("@" + grp)
             rest.difference_update(groups[grp][1])
             if not rest:
-                return str(regrouped)
+                break
 
         if regrouped:
+            # parse all group names at once
+            regrouped = NodeSet(",".join(regrouped), resolver=RESOLVER_NOGROUP)
+            if not rest:
+                return str(regrouped)
             return "%s,%s" % (regrouped, rest)
 
         return str(rest)
@@ -1537,6 +1749,327 @@ class NodeSet(NodeSetBase):
         NodeSetBase.symmetric_difference_update(self, nodeset)
 
 
+class FrozenNodeSet(NodeSet):
+    """
+    Immutable and hashable version of :class:`NodeSet`.
+
+    FrozenNodeSet objects can be used as dictionary keys or set members, and
+    anywhere a NodeSet is accepted as argument. As they cannot be modified,
+    their folded string, node count and hash value are only computed once.
+    Set operations return new FrozenNodeSet objects, including in-place
+    operators that rebind the left operand like they do for the builtin
+    frozenset type.
+
+        >>> nodeset = FrozenNodeSet("node[1-5]")
+        >>> {nodeset: 0}[FrozenNodeSet("node1,node[2-5]")]
+        0
+
+    Use :meth:`FrozenNodeSet.copy` to get a mutable :class:`NodeSet`.
+    """
+
+    def __init__(self, nodes=None, autostep=None, resolver=None,
+                 fold_axis=None):
+        """Initialize a FrozenNodeSet object (see :class:`NodeSet`)."""
+        NodeSet.__init__(self, autostep=autostep, resolver=RESOLVER_NOINIT,
+                         fold_axis=fold_axis)
+        self._take(NodeSet(nodes, autostep, resolver, fold_axis))
+
+    def _take(self, nodeset):
+        """Take over the content of a NodeSet object (should be seen as an
+        ownership transfer)."""
+        self._patterns = nodeset._patterns
+        self.fold_axis = nodeset.fold_axis
+        self._autostep = nodeset._autostep
+        self._resolver = nodeset._resolver
+        self._parser = nodeset._parser
+        self._hash = None
+        self._folded = None
+        self._count = None
+
+    @classmethod
+    def _fromnodeset(cls, nodeset):
+        """Class method that returns a new FrozenNodeSet made of the content
+        of a NodeSet object, which is not copied."""
+        inst = cls(resolver=RESOLVER_NOINIT)
+        inst._take(nodeset)
+        return inst
+
+    @classmethod
+    def _fromlist1(cls, nodelist, autostep=None, resolver=None):
+        """Class method that returns a new FrozenNodeSet with single nodes
+        from provided list (optimized constructor)."""
+        return cls._fromnodeset(NodeSet._fromlist1(nodelist, autostep,
+                                                   resolver))
+
+    @classmethod
+    def fromlist(cls, nodelist, autostep=None, resolver=None):
+        """Class method that returns a new FrozenNodeSet with nodes from
+        provided list."""
+        return cls._fromnodeset(NodeSet.fromlist(nodelist, autostep,
+                                                 resolver))
+
+    @classmethod
+    def fromiter(cls, iterable, autostep=None, resolver=None):
+        """Class method that returns a new FrozenNodeSet with nodes from an
+        iterable of strings (see :meth:`NodeSet.fromiter`)."""
+        return cls._fromnodeset(NodeSet.fromiter(iterable, autostep,
+                                                 resolver))
+
+    @classmethod
+    def fromall(cls, groupsource=None, autostep=None, resolver=None):
+        """Class method that returns a new FrozenNodeSet with all nodes from
+        optional groupsource."""
+        return cls._fromnodeset(NodeSet.fromall(groupsource, autostep,
+                                                resolver))
+
+    def __getstate__(self):
+        """Called when pickling: also remove cached values (the hash of
+        strings is not the same from one process to another)."""
+        odict = NodeSet.__getstate__(self)
+        for attr in ('_hash', '_folded', '_count'):
+            odict.pop(attr, None)
+        return odict
+
+    def __setstate__(self, dic):
+        """Called when unpickling: reset cached values."""
+        NodeSet.__setstate__(self, dic)
+        self._hash = None
+        self._folded = None
+        self._count = None
+
+    def __hash__(self):
+        if self._hash is None:
+            items = []
+            for pat, rset in self._patterns.items():
+                if rset is None:
+                    items.append((pat, None))
+                elif isinstance(rset, RangeSet):
+                    items.append((pat, tuple(rset._bounds)))
+                else:
+                    # nD folding is not canonical: only use the node count
+                    items.append((pat, len(rset)))
+            self._hash = hash(frozenset(items))
+        return self._hash
+
+    def __eq__(self, other):
+        """FrozenNodeSet equality comparison."""
+        # different hash values: no need to compare the nodes
+        if isinstance(other, FrozenNodeSet) and hash(self) != hash(other):
+            return False
+        return NodeSet.__eq__(self, other)
+
+    def __len__(self):
+        """Get the number of nodes in FrozenNodeSet."""
+        if self._count is None:
+            self._count = NodeSet.__len__(self)
+        return self._count
+
+    def __str__(self):
+        """Get ranges-based pattern of node list."""
+        key = (self._autostep, self.fold_axis)
+        if self._folded is None or self._folded[0] != key:
+            self._folded = (key, NodeSet.__str__(self))
+        return self._folded[1]
+
+    def copy(self):
+        """Return a mutable copy of this set, as a :class:`NodeSet`."""
+        cpy = NodeSet(resolver=RESOLVER_NOINIT)
+        dic = {}
+        for pat, rangeset in self._patterns.items():
+            if rangeset is None:
+                dic[pat] = None
+            else:
+                dic[pat] = rangeset.copy()
+        cpy._patterns = dic
+        cpy.fold_axis = self.fold_axis
+        cpy._autostep = self._autostep
+        cpy._resolver = self._resolver
+        cpy._parser = self._parser
+        return cpy
+
+    __copy__ = copy
+
+    def _immutable(self, *args, **kwargs):
+        """Refuse to modify a FrozenNodeSet."""
+        raise TypeError("'%s' object is immutable" % self.__class__.__name__)
+
+    add = update = updaten = clear = remove = _immutable
+    intersection_update = difference_update = _immutable
+    symmetric_difference_update = _immutable
+
+    def union(self, other):
+        """
+        s.union(t) returns a new FrozenNodeSet with elements from both s
+        and t.
+        """
+        return self._fromnodeset(NodeSet.union(self, other))
+
+    def intersection(self, other):
+        """
+        s.intersection(t) returns a new FrozenNodeSet with elements common
+        to s and t.
+        """
+        return self._fromnodeset(NodeSet.intersection(self, other))
+
+    def difference(self, other):
+        """
+        s.difference(t) returns a new FrozenNodeSet with elements in s but
+        not in t.
+        """
+        return self._fromnodeset(NodeSet.difference(self, other))
+
+    def symmetric_difference(self, other):
+        """
+        s.symmetric_difference(t) returns a new FrozenNodeSet with nodes
+        that are in exactly one of the nodesets.
+        """
+        return self._fromnodeset(NodeSet.symmetric_difference(self, other))
+
+    def __ior__(self, other):
+        self._binary_sanity_check(other)
+        return self.union(other)
+
+    def __iand__(self, other):
+        self._binary_sanity_check(other)
+        return self.intersection(other)
+
+    def __isub__(self, other):
+        self._binary_sanity_check(other)
+        return self.difference(other)
+
+    def __ixor__(self, other):
+        self._binary_sanity_check(other)
+        return self.symmetric_difference(other)
+
+
+class LazyNodeSet(NodeSet):
+    """
+    :class:`NodeSet` for lazy membership tests.
+
+    When built from a string, a LazyNodeSet only scans it and keeps the
+    resulting expression (node patterns and node groups combined by ``,``,
+    ``!``, ``&`` and ``^`` operators) unevaluated: node groups are not
+    resolved at construction. Testing if a single node is contained in the
+    LazyNodeSet only resolves the terms of the expression that are needed
+    to answer, and each term is resolved at most once.
+
+        >>> nodeset = LazyNodeSet("@compute!@down")   # no group resolution
+        >>> "node5" in nodeset                        # resolves @compute
+        False
+
+    Membership of a single node is the only lazy operation: any other
+    operation, including ``len()``, iteration, :meth:`split` or string
+    conversion, evaluates the whole expression once, then behaves like a
+    regular :class:`NodeSet`. Use it to test a few nodes against a large
+    expression of node groups. Counting or indexing nodes needs every group
+    of the expression to be resolved anyway, so these operations are not
+    lazy (``clush --pick`` and ``nodeset --pick`` sample node indexes of a
+    regular NodeSet, without expanding it).
+
+    Group resolution errors are reported when the expression is evaluated
+    (as :class:`NodeSetParseError`), syntax errors at construction.
+    """
+
+    _nsstr = None
+    _terms = None   # pending list of [opcode, pattern, rangeset, nodeset]
+
+    def __init__(self, nodes=None, autostep=None, resolver=None,
+                 fold_axis=None):
+        """Initialize a LazyNodeSet object (see :class:`NodeSet`)."""
+        NodeSet.__init__(self, autostep=autostep, resolver=resolver,
+                         fold_axis=fold_axis)
+        if isinstance(nodes, basestring) and self._parser is not None:
+            self._nsstr = str(nodes)
+            self._terms = [[opc, pat, rgnd, None] for opc, pat, rgnd in
+                           self._parser.scan_terms(self._nsstr, autostep)]
+        elif nodes is not None:
+            self.update(nodes)
+
+    def _get_patterns(self):
+        """Get patterns dict, evaluating pending expression if needed."""
+        if self._terms is not None:
+            self._evaluate()
+        return self._lazy_patterns
+
+    def _set_patterns(self, patterns):
+        """Set patterns dict."""
+        self._lazy_patterns = patterns
+
+    _patterns = property(_get_patterns, _set_patterns)
+
+    def _evaluate_term(self, term):
+        """Get the NodeSetBase object of a term of pending expression."""
+        if term[3] is None:
+            try:
+                term[3] = self._parser.parse_term(term[1], term[2],
+                                                  self._autostep)
+            except (NodeUtils.GroupSourceQueryFailed, RuntimeError) as exc:
+                raise NodeSetParseError(self._nsstr, str(exc))
+        return term[3]
+
+    def _evaluate(self):
+        """Evaluate pending expression."""
+        nodeset = NodeSetBase()
+        for term in self._terms:
+            getattr(nodeset, term[0])(self._evaluate_term(term))
+        self._terms = None
+        self._lazy_patterns = {}
+        self.update(nodeset)
+
+    def is_evaluated(self):
+        """Return whether the expression of this LazyNodeSet has been
+        evaluated."""
+        return self._terms is None
+
+    def __contains__(self, other):
+        """Is node contained in LazyNodeSet ?"""
+        if self._terms is None:
+            return NodeSet.__contains__(self, other)
+        nodeset = self._parser.parse(other, self._autostep)
+        if len(nodeset) != 1:
+            return NodeSet.__contains__(self, other)
+        # single node: only evaluate terms that may change the result
+        result = False
+        for term in self._terms:
+            opc = term[0]
+            if opc == 'update':
+                result = result or \
+                    NodeSetBase.issuperset(self._evaluate_term(term), nodeset)
+            elif opc == 'symmetric_difference_update':
+                result ^= \
+                    NodeSetBase.issuperset(self._evaluate_term(term), nodeset)
+            elif opc == 'intersection_update':
+                result = result and \
+                    NodeSetBase.issuperset(self._evaluate_term(term), nodeset)
+            else:
+                result = result and not \
+                    NodeSetBase.issuperset(self._evaluate_term(term), nodeset)
+        return result
+
+    def copy(self):
+        """Return a shallow copy of a LazyNodeSet, that is not evaluated
+        if this one is not."""
+        if self._terms is None:
+            return NodeSet.copy(self)
+        cpy = self.__class__(resolver=RESOLVER_NOINIT)
+        cpy.fold_axis = self.fold_axis
+        cpy._autostep = self._autostep
+        cpy._resolver = self._resolver
+        cpy._parser = self._parser
+        cpy._nsstr = self._nsstr
+        # evaluated terms are shared as they are only used as operands
+        cpy._terms = [list(term) for term in self._terms]
+        return cpy
+
+    __copy__ = copy # For the copy module
+
+    def __getstate__(self):
+        """Called when pickling: evaluate pending expression."""
+        if self._terms is not None:
+            self._evaluate()
+        return NodeSet.__getstate__(self)
+
+
 def expand(pat):
     """
     Commodity function that expands a nodeset pattern into a list of nodes.
@@ -35,22 +35,25 @@ except ImportError:
     # Python 2 compat
     from ConfigParser import ConfigParser, NoOptionError, NoSectionError
 
+import atexit
+from collections import deque
 import errno
-from functools import wraps
+import fcntl
+from functools import partial, wraps
 import glob
+import hashlib
+import json
 import logging
 import os
+import marshal
+import re
 import shlex
+import stat
+import sys
+import threading
 import time
 
 from string import Template
-from subprocess import Popen, PIPE
-
-# compat with python 2.7, import directly above for 3.x
-try:
-    from subprocess import DEVNULL
-except ImportError:
-    DEVNULL = open(os.devnull, 'r')
 
 # compat with python 2.7, use str directly in 3.x
 try:
@@ -88,6 +91,53 @@ class GroupResolverConfigError(GroupResolverError):
 
 
 _DEFAULT_CACHE_TIME = 3600
+_DEFAULT_NEGATIVE_CACHE_TIME = 60
+_DEFAULT_UPCALL_FANOUT = 16
+
+_DEVNULL = None
+
+# Top-level key of a block-style YAML mapping (plain or quoted)
+_YAML_TOPKEY_RE = re.compile(r'(?:"([^"]*)"|\'([^\']*)\'|'
+                             r'([^\s#\'"{}\[\],&*!|>%@`?-][^:#]*?))'
+                             r'\s*:(?:\s|$)')
+
+
+def _devnull():
+    """Return DEVNULL to use as stdin of upcall commands."""
+    global _DEVNULL
+    if _DEVNULL is None:
+        try:
+            from subprocess import DEVNULL
+            _DEVNULL = DEVNULL
+        except ImportError:
+            # compat with python 2.7
+            _DEVNULL = open(os.devnull, 'r')
+    return _DEVNULL
+
+
+def _mkstemp(dirpath):
+    """Create a temporary file in dirpath, return (fd, path)."""
+    # tempfile is only imported when needed, for faster startup
+    import tempfile
+    return tempfile.mkstemp(dir=dirpath)
+
+def _is_private(fstat):
+    """
+    Return whether a file or directory (given its stat result) is owned by
+    the current user and not writable by group or others.
+    """
+    return fstat.st_uid == os.getuid() and \
+        not fstat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def _valid_cache_entry(entry, expiry):
+    """
+    Return whether an entry read from a persistent upcall cache file is a
+    well-formed [result, timestamp] pair not older than expiry.
+    """
+    return isinstance(entry, list) and len(entry) == 2 and \
+        isinstance(entry[0], basestring) and \
+        isinstance(entry[1], (int, float)) and \
+        not isinstance(entry[1], bool) and entry[1] >= expiry
 
 
 class GroupSource(object):
@@ -110,10 +160,25 @@ class GroupSource(object):
         self.allgroups = allgroups
         self.has_reverse = False
 
+    def get_index(self):
+        """
+        Return the reverse group index previously stored with set_index()
+        if still valid, or None. Groups dict of this base class may be
+        modified at any time, so its index is never cached.
+        """
+        return None
+
+    def set_index(self, index):
+        """Store a reverse group index built from this group source."""
+
     def resolv_map(self, group):
         """Get nodes from group `group`"""
         return self.groups.get(group, '')
 
+    def resolv_map_batch(self, groups):
+        """Get nodes from each group in `groups` (as a dict)"""
+        return dict((group, self.resolv_map(group)) for group in groups)
+
     def resolv_list(self):
         """Return a list of all group names for this group source"""
         return list(self.groups)
@@ -145,6 +210,22 @@ class FileGroupSource(GroupSource):
         self.name = name
         self.loader = loader
         self.has_reverse = False
+        self._index = None
+
+    def get_index(self):
+        """
+        Return the reverse group index previously stored with set_index(),
+        unless the groups of this source have changed since.
+        """
+        if self._index is not None:
+            index, version = self._index
+            if version == self.loader.version(self.name):
+                return index
+        return None
+
+    def set_index(self, index):
+        """Store a reverse group index built from current groups dict."""
+        self._index = (index, self.loader.version(self.name))
 
     @property
     def groups(self):
@@ -164,11 +245,31 @@ class UpcallGroupSource(GroupSource):
 
     Upcall results are cached for a customizable amount of time. This is
     controlled by `cache_time` attribute. Default is 3600 seconds.
+
+    When several groups are resolved at once (see resolv_map_batch()),
+    up to `upcall_fanout` upcall commands are run at the same time.
+
+    If `cache_dir` is set, upcall results are also kept in a persistent
+    cache file in this directory, so that they can be shared between
+    processes for the same amount of time. The cache file name depends
+    on the source name and upcall definitions, so changing them does
+    invalidate previously cached results.
+
+    Failed map, reverse, list and all upcalls are also cached, for
+    `negative_cache_time` seconds (default is 60 seconds, 0 to disable),
+    so that GroupSourceQueryFailed is raised again without running the
+    upcall command. Failures are not kept in the persistent cache file.
+
+    If `stale_time` is set (default is 0), an expired upcall result is
+    still returned for up to `stale_time` seconds after its expiration,
+    while it is refreshed in the background. At most `upcall_fanout`
+    refresh commands are run at the same time.
     """
 
     def __init__(self, name, map_upcall, all_upcall=None,
                  list_upcall=None, reverse_upcall=None, cfgdir=None,
-                 cache_time=None):
+                 cache_time=None, cache_dir=None, map_batch_upcall=None,
+                 negative_cache_time=None, stale_time=None):
         GroupSource.__init__(self, name)
         self.verbosity = 0 # deprecated
         self.cfgdir = cfgdir
@@ -184,15 +285,34 @@ class UpcallGroupSource(GroupSource):
         if reverse_upcall:
             self.upcalls['reverse'] = reverse_upcall
             self.has_reverse = True
+        if map_batch_upcall:
+            self.upcalls['map_batch'] = map_batch_upcall
+
+        # Max number of upcall commands run at the same time
+        self.upcall_fanout = _DEFAULT_UPCALL_FANOUT
 
         # Cache upcall data
         if cache_time is None:
             self.cache_time = _DEFAULT_CACHE_TIME
         else:
             self.cache_time = cache_time
+        if negative_cache_time is None:
+            self.negative_cache_time = _DEFAULT_NEGATIVE_CACHE_TIME
+        else:
+            self.negative_cache_time = negative_cache_time
+        self.stale_time = stale_time or 0
+        self._refreshing = set()    # (upcall, key) being refreshed
+        self._refresh_lock = threading.Lock()
         self._cache = {}
+        self.cache_dir = None   # do not remove cache file below
         self.clear_cache()
 
+        # Persistent cache file
+        self.cache_dir = cache_dir
+        self._cache_loaded = False
+        self._cache_dirty = False
+        self._cache_atexit = False
+
     def clear_cache(self):
         """
         Remove all previously cached upcall results whatever their lifetime is.
@@ -201,15 +321,118 @@ class UpcallGroupSource(GroupSource):
             'map': {},
             'reverse': {}
         }
+        if self.cache_dir:
+            try:
+                os.unlink(self.cache_path())
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    self.logger.debug("cannot remove cache file: %s", exc)
+            self._cache_dirty = False
+
+    def cache_path(self):
+        """Return the path of the persistent cache file of this source."""
+        defs = [self.name, self.cfgdir, self.cache_time]
+        defs += sorted(self.upcalls.items())
+        digest = hashlib.sha1(repr(defs).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, "%s-%s.json" %
+                            (self.name.replace(os.sep, '_'), digest[:16]))
+
+    def _read_cache_file(self, now):
+        """Return unexpired upcall results read from the persistent cache
+        file as a dict similar to the memory cache."""
+        cache = {'map': {}, 'reverse': {}}
+        try:
+            if not _is_private(os.stat(self.cache_dir)):
+                self.logger.debug("ignoring cache file: %s is not private",
+                                  self.cache_dir)
+                return cache
+            with open(self.cache_path()) as cachefile:
+                if not _is_private(os.fstat(cachefile.fileno())):
+                    self.logger.debug("ignoring cache file: not private")
+                    return cache
+                content = json.load(cachefile)
+        except (IOError, OSError, ValueError) as exc:
+            if getattr(exc, 'errno', None) != errno.ENOENT:
+                self.logger.debug("cannot read cache file: %s", exc)
+            return cache
+        if not isinstance(content, dict):
+            self.logger.debug("ignoring invalid cache file")
+            return cache
+
+        # keep expired results that may still be returned (see stale_time)
+        now -= self.stale_time
+        for key in ('map', 'reverse'):
+            entries = content.get(key)
+            if isinstance(entries, dict):
+                cache[key] = dict((item, tuple(entry))
+                                  for item, entry in entries.items()
+                                  if _valid_cache_entry(entry, now))
+        for key in ('list', 'all'):
+            if _valid_cache_entry(content.get(key), now):
+                cache[key] = tuple(content[key])
+        return cache
+
+    def _load_cache(self):
+        """Load unexpired results from the persistent cache file, without
+        overriding results already cached in memory."""
+        self._cache_loaded = True
+        cache = self._read_cache_file(time.time())
+        for key in ('map', 'reverse'):
+            for item, entry in cache[key].items():
+                self._cache[key].setdefault(item, entry)
+        for key in ('list', 'all'):
+            if key in cache and key not in self._cache:
+                self._cache[key] = cache[key]
+
+    def flush_cache(self):
+        """
+        Write upcall results cached in memory to the persistent cache file.
+
+        This is automatically done at exit when new results are available.
+        Results from concurrent processes are merged, keeping the most
+        recent ones.
+        """
+        if not self.cache_dir or not self._cache_dirty:
+            return
+        self._cache_dirty = False
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, 0o700)
+            path = self.cache_path()
+            with open(path + '.lock', 'w') as lockfile:
+                fcntl.flock(lockfile, fcntl.LOCK_EX)
+                cache = self._read_cache_file(time.time())
+                for key in ('map', 'reverse', 'list', 'all'):
+                    if key not in self._cache:
+                        continue
+                    if key in ('list', 'all'):
+                        entry = self._cache[key]
+                        if isinstance(entry[0], basestring) and \
+                                cache.get(key, (None, 0))[1] < entry[1]:
+                            cache[key] = entry
+                        continue
+                    for item, entry in list(self._cache[key].items()):
+                        if isinstance(entry[0], basestring) and \
+                                cache[key].get(item, (None, 0))[1] < entry[1]:
+                            cache[key][item] = entry
+                # write a new file and rename it for readers without lock
+                fd, tmppath = _mkstemp(self.cache_dir)
+                with os.fdopen(fd, 'w') as tmpfile:
+                    json.dump(cache, tmpfile)
+                os.rename(tmppath, path)
+        except (IOError, OSError) as exc:
+            self.logger.debug("cannot write cache file: %s", exc)
 
     def _upcall_read(self, cmdtpl, args=dict()):
         """
         Invoke the specified upcall command, raise an Exception if
         something goes wrong and return the command output otherwise.
         """
+        # subprocess is only imported when needed, for faster startup
+        from subprocess import Popen, PIPE
         cmdline = Template(self.upcalls[cmdtpl]).safe_substitute(args)
         self.logger.debug("EXEC '%s'", cmdline)
-        proc = Popen(cmdline, stdin=DEVNULL, stdout=PIPE, shell=True,
+        proc = Popen(cmdline, stdin=_devnull(), stdout=PIPE, shell=True,
                      cwd=self.cfgdir, universal_newlines=True)
         output = proc.communicate()[0].strip()
         self.logger.debug("READ '%s'", output)
@@ -219,6 +442,126 @@ class UpcallGroupSource(GroupSource):
             raise GroupSourceQueryFailed(cmdline, self)
         return output
 
+    def _upcall_read_all(self, cmdtpl, argslist):
+        """
+        Invoke the specified upcall command for each args dict of argslist,
+        running up to `upcall_fanout` commands at the same time. Return the
+        list of command outputs, in the same order, where failed commands
+        are replaced by a GroupSourceQueryFailed exception object.
+        """
+        results = [None] * len(argslist)
+        pending = deque(enumerate(argslist))
+
+        def upcall_worker():
+            """Run pending upcall commands until none are left."""
+            while True:
+                try:
+                    idx, args = pending.popleft()
+                except IndexError:
+                    return
+                try:
+                    results[idx] = self._upcall_read(cmdtpl, args)
+                except GroupSourceQueryFailed as exc:
+                    results[idx] = exc
+
+        nworkers = min(self.upcall_fanout, len(argslist))
+        if nworkers <= 1:
+            upcall_worker()
+        else:
+            workers = [threading.Thread(target=upcall_worker)
+                       for _ in range(nworkers)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        return results
+
+    def _upcall_args(self, args):
+        """Return upcall args dict with $CFGDIR and $SOURCE set."""
+        args = dict(args)
+        # $CFGDIR and $SOURCE always replaced
+        args['CFGDIR'] = self.cfgdir
+        args['SOURCE'] = self.name
+        return args
+
+    def _cache_lookup(self, upcall, cache, key, args):
+        """
+        Return the entry of `key' found in provided `cache' if not expired,
+        or if it may still be returned while being refreshed with `upcall'
+        and `args' (see stale_time), purging it otherwise (None).
+        """
+        # Get results from persistent cache file on first lookup
+        if self.cache_dir and not self._cache_loaded:
+            self._load_cache()
+
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        now = time.time()
+        if entry[1] >= now:
+            return entry
+
+        # Serve stale result while refreshing it
+        if entry[1] + self.stale_time >= now and \
+                isinstance(entry[0], basestring):
+            self._refresh(upcall, cache, key, args)
+            return entry
+
+        # Purge expired data from cache
+        self.logger.debug("PURGE EXPIRED (%d)'%s'", entry[1], key)
+        cache.pop(key, None)
+        return None
+
+    def _refresh(self, upcall, cache, key, args):
+        """Refresh cache entry in the background, if not already being
+        refreshed and if the number of running refreshes allows it."""
+        refresh_key = (upcall, key)
+        with self._refresh_lock:
+            if refresh_key in self._refreshing or \
+                    len(self._refreshing) >= self.upcall_fanout:
+                return
+            self._refreshing.add(refresh_key)
+
+        def refresh_worker():
+            """Run upcall command and update cache entry."""
+            try:
+                cache_expiry = time.time() + self.cache_time
+                cache[key] = (self._upcall_read(upcall,
+                                                self._upcall_args(args)),
+                              cache_expiry)
+                self._cache_updated()
+            except GroupSourceQueryFailed:
+                pass  # keep stale result until stale_time has expired
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(refresh_key)
+
+        self.logger.debug("REFRESH '%s'", key)
+        thread = threading.Thread(target=refresh_worker)
+        thread.daemon = True
+        thread.start()
+
+    def _cache_failure(self, cache, key, exc):
+        """Cache upcall failure `exc' (if enabled)."""
+        if self.negative_cache_time > 0:
+            cache[key] = (exc, time.time() + self.negative_cache_time)
+
+    @staticmethod
+    def _cache_value(entry):
+        """Return result of cache `entry', raising cached failure."""
+        value = entry[0]
+        if isinstance(value, GroupSourceQueryFailed):
+            raise GroupSourceQueryFailed(str(value), value.group_source)
+        return value
+
+    def _cache_updated(self):
+        """Called when new upcall results are added to the cache."""
+        if self.cache_dir:
+            if not self._cache_atexit:
+                atexit.register(self.flush_cache)
+                self._cache_atexit = True
+            self._cache_dirty = True
+
     def _upcall_cache(self, upcall, cache, key, **args):
         """
         Look for `key' in provided `cache'. If not found, call the
@@ -230,20 +573,19 @@ class UpcallGroupSource(GroupSource):
         if not self.upcalls.get(upcall):
             raise GroupSourceNoUpcall(upcall, self)
 
-        # Purge expired data from cache
-        if key in cache and cache[key][1] < time.time():
-            self.logger.debug("PURGE EXPIRED (%d)'%s'", cache[key][1], key)
-            del cache[key]
-
         # Fetch the data if unknown of just purged
-        if key not in cache:
+        entry = self._cache_lookup(upcall, cache, key, args)
+        if entry is None:
             cache_expiry = time.time() + self.cache_time
-            # $CFGDIR and $SOURCE always replaced
-            args['CFGDIR'] = self.cfgdir
-            args['SOURCE'] = self.name
-            cache[key] = (self._upcall_read(upcall, args), cache_expiry)
+            try:
+                output = self._upcall_read(upcall, self._upcall_args(args))
+            except GroupSourceQueryFailed as exc:
+                self._cache_failure(cache, key, exc)
+                raise
+            entry = cache[key] = (output, cache_expiry)
+            self._cache_updated()
 
-        return cache[key][0]
+        return self._cache_value(entry)
 
     def resolv_map(self, group):
         """
@@ -252,6 +594,79 @@ class UpcallGroupSource(GroupSource):
         """
         return self._upcall_cache('map', self._cache['map'], group, GROUP=group)
 
+    def resolv_map_batch(self, groups):
+        """
+        Get nodes from several groups at once as a dict, using the cached
+        values if available. The optional map_batch upcall is called once
+        for all missing groups (space separated in $GROUPS), it should
+        return lines of the form "group: nodes". Without map_batch upcall,
+        map is called for each missing group, running up to `upcall_fanout`
+        commands at the same time.
+        """
+        if not self.upcalls.get('map'):
+            raise GroupSourceNoUpcall('map', self)
+
+        cache = self._cache['map']
+        entries = {}
+        missing = []
+        for group in groups:
+            if group not in entries:
+                entries[group] = self._cache_lookup('map', cache, group,
+                                                    {'GROUP': group})
+                if entries[group] is None:
+                    missing.append(group)
+
+        if missing and self.upcalls.get('map_batch'):
+            cache_expiry = time.time() + self.cache_time
+            args = self._upcall_args({'GROUPS': ' '.join(missing)})
+            results = dict((group, []) for group in missing)
+            for line in self._upcall_read('map_batch', args).splitlines():
+                group, _, nodes = line.partition(':')
+                group = group.strip()
+                if group in results:
+                    results[group].append(nodes.strip())
+            for group, lines in results.items():
+                entries[group] = cache[group] = ('\n'.join(lines),
+                                                 cache_expiry)
+            self._cache_updated()
+        elif missing:
+            cache_expiry = time.time() + self.cache_time
+            argslist = [self._upcall_args({'GROUP': group})
+                        for group in missing]
+            error = None
+            for group, output in zip(missing,
+                                     self._upcall_read_all('map', argslist)):
+                if isinstance(output, GroupSourceQueryFailed):
+                    self._cache_failure(cache, group, output)
+                    error = error or output
+                else:
+                    entries[group] = cache[group] = (output, cache_expiry)
+            self._cache_updated()
+            if error is not None:
+                raise error
+
+        return dict((group, self._cache_value(entry))
+                    for group, entry in entries.items())
+
+    def get_index(self):
+        """
+        Return the reverse group index previously stored with set_index()
+        if it has not expired yet (see `cache_time`), or None.
+        """
+        if 'index' in self._cache:
+            index, cache_expiry = self._cache['index']
+            if cache_expiry >= time.time():
+                return index
+            del self._cache['index']
+        return None
+
+    def set_index(self, index):
+        """
+        Store a reverse group index built from upcall results, cached like
+        them for `cache_time` seconds.
+        """
+        self._cache['index'] = (index, time.time() + self.cache_time)
+
     def resolv_list(self):
         """
         Return a list of all group names for this group source, using
@@ -277,6 +692,61 @@ class UpcallGroupSource(GroupSource):
                                   NODE=node_str)
 
 
+class PluginGroupSource(GroupSource):
+    """
+    Base class for in-process group sources implemented in Python.
+
+    A plugin group source is declared in a groups.conf source section
+    with the `module` option, set to "package.module:ClassName" (or just
+    "package.module", in that case the class is found as GROUP_SOURCE_CLASS
+    attribute of the module). The class is instantiated with the source
+    name, a dict of other options of the section and the configuration
+    directory.
+
+    Subclasses override resolv_map() and optionally resolv_map_batch(),
+    resolv_list(), resolv_all() and resolv_reverse(). Results may be
+    strings (like upcall outputs), lists of strings or NodeSet objects.
+    GroupSourceQueryFailed should be raised when a query fails. No result
+    is cached by this class.
+    """
+
+    def __init__(self, name, options=None, cfgdir=None):
+        """
+        Initialize PluginGroupSource object.
+
+        :param name: group source name
+        :param options: dict of other options of the source section
+        :param cfgdir: configuration directory of the source section
+        """
+        GroupSource.__init__(self, name)
+        self.options = options or {}
+        self.cfgdir = cfgdir
+        # reverse is supported if resolv_reverse() is overridden
+        reverse_func = getattr(type(self).resolv_reverse, '__func__',
+                               type(self).resolv_reverse)
+        self.has_reverse = reverse_func is not _GROUPSOURCE_REVERSE_FUNC
+
+
+_GROUPSOURCE_REVERSE_FUNC = getattr(GroupSource.resolv_reverse, '__func__',
+                                    GroupSource.resolv_reverse)
+
+
+def _load_plugin_class(spec):
+    """
+    Return the group source class matching `spec` ("module:ClassName" or
+    "module" with a GROUP_SOURCE_CLASS attribute), loading the module if
+    needed.
+    """
+    modname, _, clsname = spec.partition(':')
+    try:
+        __import__(modname.strip())
+        module = sys.modules[modname.strip()]
+        return getattr(module, clsname.strip() or 'GROUP_SOURCE_CLASS')
+    except (ImportError, AttributeError) as exc:
+        raise GroupResolverConfigError("Cannot load group source module "
+                                       "\"%s\": %s" % (spec, exc))
+
+
 class YAMLGroupLoader(object):
     """
     YAML group file loader/reloader.
@@ -285,29 +755,139 @@ class YAMLGroupLoader(object):
 
     - create GroupSource objects
     - gather groups dict content on load
-    - reload the file once cache_time has expired
+    - check the file for modification (inode, size and mtime) when groups
+      are accessed, at most once every cache_time seconds (default is to
+      check on each access), and reload it when modified
+    - keep track of sources whose groups did change on reload (see
+      version())
+
+    If `cache_dir` is set, a compiled snapshot of the file content, with
+    pre-folded node sets, is also stored in this directory and used instead
+    of the YAML file as long as the file content (SHA-1 digest) is
+    unchanged. As snapshots are loaded with marshal, they are only used if
+    both the snapshot file and `cache_dir` are owned by the current user and
+    not writable by group or others.
     """
 
-    def __init__(self, filename, cache_time=None):
+    # Snapshot format version, to change when snapshot content changes
+    SNAPSHOT_VERSION = 2
+
+    def __init__(self, filename, cache_time=None, cache_dir=None):
         """
         Initialize YAMLGroupLoader and load file.
 
         :param filename: YAML file path
-        :param cache_time: cache time (seconds)
+        :param cache_time: min delay between file checks (seconds)
+        :param cache_dir: optional directory for compiled snapshot
         """
-        if cache_time is None:
-            self.cache_time = _DEFAULT_CACHE_TIME
-        else:
-            self.cache_time = cache_time
-        self.cache_expiry = 0
+        self.cache_time = cache_time or 0
+        self.cache_expiry = 0   # next file check time
+        self.cache_dir = cache_dir
         self.filename = filename
         self.sources = {}
         self._groups = {}
+        self._versions = {}     # source name => groups version
+        self._fstat_key = None  # (inode, size, mtime) of loaded file
         # must be loaded after initialization so self.sources is set
         self._load()
 
-    def _load(self):
-        """Load or reload YAML group file to create GroupSource objects."""
+    @staticmethod
+    def scan_sources(filename):
+        """
+        Quickly scan YAML file for group source names (top-level keys),
+        without loading it. Return a list of source names, or None if the
+        file layout is not supported by this scan (eg. flow style).
+        """
+        srcnames = []
+        with open(filename) as yamlfile:
+            for line in yamlfile:
+                if not line.strip() or line[0] in ' \t#':
+                    continue  # indented content, blank line or comment
+                if line.rstrip() in ('---', '...'):
+                    if srcnames:
+                        return None  # multiple documents
+                    continue
+                match = _YAML_TOPKEY_RE.match(line)
+                if match is None:
+                    return None
+                srcnames.append([grp for grp in match.groups()
+                                 if grp is not None][0])
+        return srcnames or None
+
+    def snapshot_path(self):
+        """Return the path of the compiled snapshot of the YAML file."""
+        digest = hashlib.sha1(os.path.abspath(self.filename).encode('utf-8'))
+        return os.path.join(self.cache_dir, "%s-%s.snapshot" %
+                            (os.path.basename(self.filename),
+                             digest.hexdigest()[:16]))
+
+    def _snapshot_key(self, fstat):
+        """Return the key identifying a snapshot of current YAML file."""
+        # file content digest: stat info alone cannot detect a same-size
+        # rewrite within mtime granularity or a restored mtime
+        digest = hashlib.sha1()
+        with open(self.filename, 'rb') as yamlfile:
+            digest.update(yamlfile.read())
+        return (self.SNAPSHOT_VERSION, marshal.version, sys.version_info[:2],
+                fstat.st_size, digest.hexdigest())
+
+    def _load_snapshot(self, snapkey):
+        """Return sources dict from valid snapshot if available."""
+        try:
+            if not _is_private(os.stat(self.cache_dir)):
+                LOGGER.debug("ignoring snapshot of %s: %s is not private",
+                             self.filename, self.cache_dir)
+                return None
+            with open(self.snapshot_path(), 'rb') as snapfile:
+                if not _is_private(os.fstat(snapfile.fileno())):
+                    LOGGER.debug("ignoring snapshot of %s: not private",
+                                 self.filename)
+                    return None
+                key, sources = marshal.loads(snapfile.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError) as exc:
+            if getattr(exc, 'errno', None) != errno.ENOENT:
+                LOGGER.debug("cannot load snapshot of %s: %s", self.filename,
+                             exc)
+            return None
+        if tuple(key) != snapkey:
+            LOGGER.debug("stale snapshot of %s", self.filename)
+            return None
+        return sources
+
+    def _save_snapshot(self, snapkey, sources):
+        """Save a compiled snapshot of sources dict, pre-folding node sets."""
+        # import here to avoid circular import
+        from ClusterShell.NodeSet import NodeSet, NodeSetParseError
+        from ClusterShell.NodeSet import RESOLVER_NOGROUP
+
+        snapshot = {}
+        for srcname, groups in sources.items():
+            snapshot[srcname] = snapgroups = {}
+            for grp, grpnodes in groups.items():
+                if isinstance(grpnodes, list) and \
+                        all(isinstance(x, basestring) for x in grpnodes):
+                    grpnodes = ','.join(grpnodes)
+                if isinstance(grpnodes, basestring) and '@' not in grpnodes:
+                    try:
+                        grpnodes = str(NodeSet(','.join(grpnodes.split()),
+                                               resolver=RESOLVER_NOGROUP))
+                    except NodeSetParseError:
+                        pass  # will fail later as usual
+                snapgroups[grp] = grpnodes
+        try:
+            data = marshal.dumps((snapkey, snapshot))
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, 0o700)
+            fd, tmppath = _mkstemp(self.cache_dir)
+            with os.fdopen(fd, 'wb') as tmpfile:
+                tmpfile.write(data)
+            os.rename(tmppath, self.snapshot_path())
+        except (IOError, OSError, ValueError) as exc:
+            LOGGER.debug("cannot save snapshot of %s: %s", self.filename, exc)
+        return snapshot
+
+    def _load_yaml(self):
+        """Load and check YAML group file, return sources dict."""
         with open(self.filename) as yamlfile:
             try:
                 import yaml
@@ -323,8 +903,6 @@ class YAMLGroupLoader(object):
             fmt = "%s: invalid content (base is not a dict)"
             raise GroupResolverConfigError(fmt % self.filename)
 
-        first = not self.sources
-
         for srcname, groups in sources.items():
 
             # check for valid types returned by PyYAML Loader
@@ -345,17 +923,55 @@ class YAMLGroupLoader(object):
                 if grpnodes is None:
                     groups[grp] = ''
 
+        return sources
+
+    def _load(self, fstat=None):
+        """Load or reload YAML group file to create GroupSource objects."""
+        if fstat is None:
+            fstat = os.stat(self.filename)
+        if self.cache_dir:
+            snapkey = self._snapshot_key(fstat)
+            sources = self._load_snapshot(snapkey)
+            if sources is None:
+                sources = self._save_snapshot(snapkey, self._load_yaml())
+        else:
+            sources = self._load_yaml()
+
+        first = not self.sources
+
+        for srcname, groups in sources.items():
             if first:
                 self._groups[srcname] = groups
+                self._versions[srcname] = 0
                 self.sources[srcname] = FileGroupSource(srcname, self)
             elif srcname in self.sources:
-                # update groups of existing source
-                self._groups[srcname] = groups
+                # update groups of existing source, if changed
+                if groups != self._groups[srcname]:
+                    LOGGER.debug("%s: groups of source %s changed",
+                                 self.filename, srcname)
+                    self._groups[srcname] = groups
+                    self._versions[srcname] += 1
             # else: cannot add new source on reload - just ignore it
 
-        # groups are loaded, set cache expiry
+        # groups are loaded, set next check time
+        self._fstat_key = (fstat.st_ino, fstat.st_size, fstat.st_mtime)
         self.cache_expiry = time.time() + self.cache_time
 
+    def _check(self):
+        """Reload file if modified, when check delay has expired."""
+        if self.cache_expiry > time.time():
+            return
+        try:
+            fstat = os.stat(self.filename)
+        except OSError as exc:
+            # keep current groups if file is temporarily unavailable
+            LOGGER.debug("cannot check %s: %s", self.filename, exc)
+            return
+        if (fstat.st_ino, fstat.st_size, fstat.st_mtime) != self._fstat_key:
+            self._load(fstat)
+        else:
+            self.cache_expiry = time.time() + self.cache_time
+
     def __iter__(self):
         """Iterate over GroupSource objects."""
         # safe as long as self.sources is set at init (once)
@@ -366,14 +982,19 @@ class YAMLGroupLoader(object):
         Groups dict accessor for sourcename.
 
         This method is called by associated FileGroupSource objects and simply
-        returns dict content, after reloading file if cache_time has expired.
+        returns dict content, after reloading file if it has been modified.
         """
-        if self.cache_expiry < time.time():
-            # reload whole file if cache time expired
-            self._load()
-
+        self._check()
         return self._groups[sourcename]
 
+    def version(self, sourcename):
+        """
+        Return the version of the groups of sourcename, which is increased
+        each time they change on file reload.
+        """
+        self._check()
+        return self._versions[sourcename]
+
 
 class GroupResolver(object):
     """
@@ -452,9 +1073,20 @@ class GroupResolver(object):
     def _list_nodes(self, source, what, *args):
         """Helper method that returns a list of results (nodes) when
         the source is defined."""
-        result = []
         assert source
-        raw = getattr(source, 'resolv_%s' % what)(*args)
+        return self._split_nodes(getattr(source, 'resolv_%s' % what)(*args))
+
+    @staticmethod
+    def _split_nodes(raw):
+        """Helper method that returns a list of nodes from a raw result."""
+        result = []
+        if not isinstance(raw, (basestring, list)):
+            # NodeSet object returned by a plugin group source, keep it
+            # folded (lazy import to avoid circular import)
+            from ClusterShell.NodeSet import NodeSetBase
+            if isinstance(raw, NodeSetBase):
+                return [str(raw)] if raw else []
+            raw = list(raw)
         if isinstance(raw, list):
             raw = ','.join(raw)
         for line in raw.splitlines():
@@ -499,6 +1131,17 @@ class GroupResolver(object):
         source = self._source(namespace)
         return self._list_nodes(source, 'map', group)
 
+    def group_nodes_batch(self, groups, namespace=None):
+        """
+        Find nodes for several group names and optional namespace, at once
+        if supported by the group source. Return a dict of group name to
+        list of nodes.
+        """
+        source = self._source(namespace)
+        result = source.resolv_map_batch(groups)
+        return dict((group, self._split_nodes(raw))
+                    for group, raw in result.items())
+
     def all_nodes(self, namespace=None):
         """
         Find all nodes. You may specify an optional namespace.
@@ -529,7 +1172,22 @@ class GroupResolver(object):
         Find group list for specified node and optional namespace.
         """
         source = self._source(namespace)
-        return self._list_groups(source, 'reverse', node)
+        return self._list_groups(source, 'reverse', str(node))
+
+    def group_index(self, namespace=None):
+        """
+        Get cached reverse group index of optional namespace, or None if
+        not available (see set_group_index()).
+        """
+        return self._source(namespace).get_index()
+
+    def set_group_index(self, index, namespace=None):
+        """
+        Cache a reverse group index (node to groups) built for optional
+        namespace. The index is kept as long as the group source results
+        it was built from are cached.
+        """
+        self._source(namespace).set_index(index)
 
 
 class GroupResolverConfig(GroupResolver):
@@ -537,6 +1195,10 @@ class GroupResolverConfig(GroupResolver):
     GroupResolver class that is able to automatically setup its
     GroupSource's from a configuration file. This is the default
     resolver for NodeSet.
+
+    Group sources defined in YAML files (autodir) and plugin group
+    sources are only loaded when first used (or when all sources are
+    listed), so that unused group files are not parsed.
     """
     SECTION_MAIN = 'Main'
 
@@ -548,6 +1210,9 @@ class GroupResolverConfig(GroupResolver):
 
         self.filenames = filenames
         self.config = None
+        self.cachedir = None
+        self._lazy_sources = {}     # source name => loader
+        self._loading = None        # loader being called
 
     def _late_init(self):
         """
@@ -566,8 +1231,75 @@ class GroupResolverConfig(GroupResolver):
             # for proper $CFGDIR selection, take last parsed configfile only
             self._parse_config(os.path.dirname(parsed[-1]))
 
+    def _add_lazy_sources(self, srcnames, loader):
+        """Declare sources srcnames, that are added by calling loader."""
+        for srcname in srcnames:
+            if srcname in self._sources or srcname in self._lazy_sources:
+                raise GroupResolverConfigError("GroupSource '%s': name "
+                                               "collision" % srcname)
+            self._lazy_sources[srcname] = loader
+
+    def add_source(self, group_source):
+        """Add a GroupSource to this resolver."""
+        if not self._initialized:
+            self._late_init()
+        # sources not loaded yet are only replaced by their own loader
+        loader = self._lazy_sources.get(group_source.name)
+        if loader is not None and loader is not self._loading:
+            raise ValueError("GroupSource '%s': name collision" % \
+                             group_source.name)
+        GroupResolver.add_source(self, group_source)
+
+    def _load_lazy_source(self, srcname):
+        """Load source srcname (and other sources of the same loader) if
+        not loaded yet."""
+        loader = self._lazy_sources.get(srcname)
+        if loader is None:
+            return
+        self._loading = loader
+        try:
+            loader()
+        except ValueError as exc:
+            raise GroupResolverConfigError(str(exc))
+        finally:
+            self._loading = None
+        for name, name_loader in list(self._lazy_sources.items()):
+            if name_loader is loader:
+                del self._lazy_sources[name]
+
+    def _load_lazy_sources(self):
+        """Load all sources not loaded yet."""
+        while self._lazy_sources:
+            self._load_lazy_source(next(iter(self._lazy_sources)))
+
+    def _source(self, namespace):
+        """Helper method that returns the source by namespace name, loading
+        it first if needed."""
+        if not self._initialized:
+            self._late_init()
+        if namespace:
+            self._load_lazy_source(namespace)
+        return GroupResolver._source(self, namespace)
+
+    def sources(self):
+        """Get the list of all resolver source names."""
+        if not self._initialized:
+            self._late_init()
+        self._load_lazy_sources()
+        return GroupResolver.sources(self)
+
     def _parse_config(self, cfg_dirname):
         """parse config using relative dir cfg_dirname"""
+        # parse Main.cachedir (used by upcall sources)
+        try:
+            cachedir = self.config.get(self.SECTION_MAIN, 'cachedir')
+            if cachedir:
+                cachedir = Template(cachedir).safe_substitute(
+                    CFGDIR=cfg_dirname)
+                self.cachedir = os.path.expanduser(cachedir)
+        except (NoSectionError, NoOptionError):
+            pass
+
         # parse Main.confdir
         try:
             if self.config.has_option(self.SECTION_MAIN, 'groupsdir'):
@@ -619,10 +1351,16 @@ class GroupResolverConfig(GroupResolver):
                         continue
                     raise GroupResolverConfigError("Defined autodir %s is not"
                                                    " a directory" % autodir)
-                # add auto sources declared in groups.d YAML files
+                # add auto sources declared in groups.d YAML files, loaded
+                # on first use when their source names can be scanned
                 for autosfn in sorted(glob.glob('%s/*.yaml' % autodir)):
                     try:
-                        self._sources_from_yaml(autosfn)
+                        srcnames = YAMLGroupLoader.scan_sources(autosfn)
+                        if srcnames is None:
+                            self._sources_from_yaml(autosfn)
+                        else:
+                            loader = partial(self._sources_from_yaml, autosfn)
+                            self._add_lazy_sources(srcnames, loader)
                     except IOError as exc:  # same as OSError in Python 3
                         # in Python 3 only, we could just catch PermissionError
                         if exc.errno in (errno.EACCES, errno.EPERM):
@@ -638,6 +1376,7 @@ class GroupResolverConfig(GroupResolver):
         # parse Main.default
         try:
             def_sourcename = self.config.get('Main', 'default')
+            self._load_lazy_source(def_sourcename)
             # warning: default_source_name is a property
             self.default_source_name = def_sourcename
         except (NoSectionError, NoOptionError):
@@ -648,22 +1387,34 @@ class GroupResolverConfig(GroupResolver):
                 raise GroupResolverConfigError(fmt % self.config.get('Main',
                                                                      'default'))
         # pick random default source if not provided by config
-        if not self.default_source_name and self._sources:
+        if not self.default_source_name and \
+                (self._sources or self._lazy_sources):
+            self._load_lazy_sources()
             self.default_source_name = list(self._sources)[0]
 
     def _sources_from_cfg(self, cfg, cfgdir):
         """
-        Instantiate as many UpcallGroupSources needed from cfg object,
-        cfgdir (CWD for callbacks) and cfg filename.
+        Instantiate as many UpcallGroupSources (or PluginGroupSources)
+        needed from cfg object, cfgdir (CWD for callbacks) and cfg filename.
         """
         try:
             for section in cfg.sections():
                 # Support grouped sections: section1,section2,section3
                 for srcname in section.split(','):
-                    if srcname != self.SECTION_MAIN:
+                    if srcname == self.SECTION_MAIN:
+                        continue
+                    if cfg.has_option(section, 'module'):
+                        # in-process plugin group source, loaded when used
+                        options = dict(cfg.items(section, raw=True))
+                        loader = partial(self._source_from_plugin, srcname,
+                                         options.pop('module'), options,
+                                         cfgdir)
+                        self._add_lazy_sources([srcname], loader)
+                    else:
                         # only map is a mandatory upcall
                         map_upcall = cfg.get(section, 'map', raw=True)
                         all_upcall = list_upcall = reverse_upcall = ctime = None
+                        map_batch_upcall = neg_ctime = stale_time = None
                         if cfg.has_option(section, 'all'):
                             all_upcall = cfg.get(section, 'all', raw=True)
                         if cfg.has_option(section, 'list'):
@@ -671,19 +1422,38 @@ class GroupResolverConfig(GroupResolver):
                         if cfg.has_option(section, 'reverse'):
                             reverse_upcall = cfg.get(section, 'reverse',
                                                      raw=True)
+                        if cfg.has_option(section, 'map_batch'):
+                            map_batch_upcall = cfg.get(section, 'map_batch',
+                                                       raw=True)
                         if cfg.has_option(section, 'cache_time'):
                             ctime = float(cfg.get(section, 'cache_time',
                                                   raw=True))
+                        if cfg.has_option(section, 'negative_cache_time'):
+                            neg_ctime = float(cfg.get(section,
+                                                      'negative_cache_time',
+                                                      raw=True))
+                        if cfg.has_option(section, 'stale_time'):
+                            stale_time = float(cfg.get(section, 'stale_time',
+                                                       raw=True))
                         # add new group source
                         self.add_source(UpcallGroupSource(srcname, map_upcall,
                                                           all_upcall,
                                                           list_upcall,
                                                           reverse_upcall,
-                                                          cfgdir, ctime))
+                                                          cfgdir, ctime,
+                                                          self.cachedir,
+                                                          map_batch_upcall,
+                                                          neg_ctime,
+                                                          stale_time))
         except (NoSectionError, NoOptionError, ValueError) as exc:
             raise GroupResolverConfigError(str(exc))
 
+    def _source_from_plugin(self, srcname, spec, options, cfgdir):
+        """Load plugin source from module:class spec."""
+        plugin_cls = _load_plugin_class(spec)
+        self.add_source(plugin_cls(srcname, options, cfgdir))
+
     def _sources_from_yaml(self, filepath):
         """Load source(s) from YAML file."""
-        for source in YAMLGroupLoader(filepath):
+        for source in YAMLGroupLoader(filepath, cache_dir=self.cachedir):
             self.add_source(source)
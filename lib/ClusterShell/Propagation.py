@@ -318,6 +318,12 @@ class PropagationChannel(Channel):
         self._cfg_write_hist.appendleft((ctl.msgid, nodes, len(buf), worker))
         self.send_queued(ctl)
 
+    def write_pending(self, worker):
+        """return the number of bytes written through channel by worker
+        and not acknowledged yet by the gateway"""
+        return sum(bytes_count for _, _, bytes_count, hist_worker
+                   in self._cfg_write_hist if hist_worker is worker)
+
     def set_write_eof(self, nodes, worker):
         """send EOF through channel to specified nodes"""
         self.logger.debug("set_write_eof")
@@ -26,6 +26,7 @@ Instances of RangeSet provide similar operations than the builtin set type,
 extended to support cluster ranges-like format and stepping support ("0-8/2").
 """
 
+from bisect import bisect_left, bisect_right
 from functools import reduce
 from itertools import product
 from operator import mul
@@ -34,6 +35,7 @@ __all__ = ['RangeSetException',
            'RangeSetParseError',
            'RangeSetPaddingError',
            'RangeSet',
+           'FrozenRangeSet',
            'RangeSetND',
            'AUTOSTEP_DISABLED']
 
@@ -42,6 +44,17 @@ __all__ = ['RangeSetException',
 # pickled, so we use less. Later, we could consider sys.maxint here.
 AUTOSTEP_DISABLED = 1E100
 
+# Multivariate folding engine of RangeSetND: 'intervals' works directly on
+# range boundaries of internal keys (see _tokey), 'rangesets' is the former
+# engine based on temporary RangeSet objects. Both give the same results:
+# folded vectors are defined by a greedy merge of all unique items, so both
+# engines expand items and merge them pairwise, only the vector
+# representation differs.
+ND_FOLD_ENGINE = 'intervals'
+
+# Allow the 'intervals' engine to use NumPy (if available) to expand vectors
+ND_FOLD_NUMPY = True
+
 
 class RangeSetException(Exception):
     """Base RangeSet exception class."""
@@ -61,7 +74,210 @@ class RangeSetPaddingError(RangeSetParseError):
         RangeSetParseError.__init__(self, part, "padding mismatch (%s)" % msg)
 
 
-class RangeSet(set):
+def _negbase(digits):
+    """Number of internal keys used by negative indexes of less than
+    `digits` digits (see :func:`_tokey`)."""
+    return (10 ** digits - 10) // 9 - digits + 1
+
+def _tokey(value, width):
+    """Map an index and its string length to an internal integer key.
+
+    Keys are ordered like RangeSet members: negative indexes first (longer
+    strings first), then non-negative indexes by string length and value,
+    which means that for example "9", "00", "01", ..., "10" are consecutive
+    keys. Each string length (or "bucket") uses a contiguous range of keys.
+    """
+    if value >= 0:
+        return value + (10 ** width - 10) // 9
+    return value - _negbase(width - 1)
+
+def _keybucket(key):
+    """Get (width, shift, end) of the bucket of internal key `key`: `width`
+    is the string length of its members, `key - shift` is the index value
+    and `end` is the first key beyond this bucket."""
+    if key >= 0:
+        width = len(str(9 * key + 10)) - 1
+        return width, (10 ** width - 10) // 9, (10 ** (width + 1) - 10) // 9
+    digits = 1
+    while -key > _negbase(digits + 1):
+        digits += 1
+    return digits + 1, -_negbase(digits), -_negbase(digits)
+
+def _clipped(bounds, lo, hi):
+    """Get the boundaries of keys from `bounds` within the [lo, hi) range."""
+    i = bisect_right(bounds, lo)
+    j = bisect_left(bounds, hi)
+    # odd positions are within a range, so these ranges need to be cut
+    return [lo] * (i % 2) + bounds[i:j] + [hi] * (j % 2)
+
+def _slice_positions(index, length):
+    """Get (start, count, step) of the positions selected by slice `index`
+    over a sequence of `length` items, in ascending order (step > 0)."""
+    start, stop, step = index.indices(length)
+    if step > 0:
+        count = max(0, (stop - start + step - 1) // step)
+    else:
+        count = max(0, (start - stop - step - 1) // -step)
+        start += (count - 1) * step
+        step = -step
+    return start, count, step
+
+# Below this ratio of numbers of ranges, operations between RangeSets use
+# binary search for each range of the smaller one instead of a linear merge
+_SMALL_RATIO = 16
+
+# Truth tables of set operations, indexed by 2 * (in first) + (in second)
+_OP_UNION = (False, True, True, True)
+_OP_INTERSECTION = (False, False, False, True)
+_OP_DIFFERENCE = (False, False, True, False)
+_OP_SYMMETRIC_DIFFERENCE = (False, True, True, False)
+
+def _merged(bounds1, bounds2, optable):
+    """Linear merge of two sorted lists of range boundaries.
+
+    Return the boundaries of the ranges of keys for which the truth table
+    `optable` is verified (see _OP_* constants). Contiguous ranges are
+    always merged, so the result is canonical.
+    """
+    result = []
+    len1, len2 = len(bounds1), len(bounds2)
+    i = j = 0
+    inside = False
+    while i < len1 and j < len2:
+        key1, key2 = bounds1[i], bounds2[j]
+        if key1 <= key2:
+            key = key1
+            i += 1
+            if key2 == key1:
+                j += 1
+        else:
+            key = key2
+            j += 1
+        # odd indexes: key is the start of a range (now inside)
+        state = optable[2 * (i % 2) + j % 2]
+        if state is not inside:
+            result.append(key)
+            inside = state
+    # one list is exhausted: the rest of the other one is kept or dropped
+    if i < len1:
+        if optable[2]:
+            result += bounds1[i:]
+    elif j < len2:
+        if optable[1]:
+            result += bounds2[j:]
+    return result
+
+def _boundkeys(bounds):
+    """Get the list of all keys within a list of range boundaries."""
+    return [key for i in range(0, len(bounds), 2)
+            for key in range(bounds[i], bounds[i + 1])]
+
+def _keybounds(keys):
+    """Get the boundaries of contiguous ranges of a sorted iterable of keys
+    (duplicate keys are allowed)."""
+    bounds = []
+    for key in keys:
+        if not bounds or key > bounds[-1]:
+            bounds += (key, key + 1)
+        elif key == bounds[-1]:
+            bounds[-1] = key + 1
+    return bounds
+
+
+class _KeyCollector(object):
+    """Streaming collector of internal keys (see :meth:`RangeSet.fromiter`).
+
+    Keys are appended to a buffer which is sorted and merged into range
+    boundaries when full, so that memory usage depends on the number of
+    ranges rather than on the number of keys. The buffer is at least as
+    large as the boundaries list, so that merging is amortized linear.
+    """
+    BUFFER_SIZE = 65536
+
+    def __init__(self):
+        self.bounds = []
+        self.keys = []
+        self.limit = self.BUFFER_SIZE
+
+    def add(self, key):
+        """Add an internal key."""
+        keys = self.keys
+        keys.append(key)
+        if len(keys) >= self.limit:
+            self.flush()
+            self.limit = max(self.BUFFER_SIZE, len(self.bounds))
+
+    def flush(self):
+        """Merge buffered keys and return range boundaries."""
+        if self.keys:
+            self.keys.sort()
+            self.bounds = _merged(self.bounds, _keybounds(self.keys),
+                                  _OP_UNION)
+            self.keys = []
+        return self.bounds
+
+    def rangeset(self, autostep=None):
+        """Return a new RangeSet of all collected keys."""
+        inst = RangeSet(autostep=autostep)
+        inst._bounds = self.flush()
+        self.bounds = []
+        return inst
+
+
+def _merged_vector(vec1, vec2):
+    """Merge two vectors of range boundaries (see RangeSetND folding).
+
+    Vectors are merged if they differ by at most one dimension in which
+    ranges are either disjoint or included in one another. Return the new
+    vector or None if vectors cannot be merged.
+    """
+    diffpos = -1
+    for pos in range(len(vec1)):
+        if vec1[pos] != vec2[pos]:
+            if diffpos >= 0:
+                return None
+            diffpos = pos
+    if diffpos < 0:
+        return vec1
+    bounds1, bounds2 = vec1[diffpos], vec2[diffpos]
+    if len(bounds1) == 2 and len(bounds2) == 2:
+        # fast path for single ranges
+        if bounds1[1] < bounds2[0] or bounds2[1] < bounds1[0]:
+            bounds = bounds1 + bounds2 if bounds1[0] < bounds2[0] \
+                                       else bounds2 + bounds1
+        elif bounds1[1] == bounds2[0] or bounds2[1] == bounds1[0]:
+            bounds = (min(bounds1[0], bounds2[0]), max(bounds1[1], bounds2[1]))
+        elif bounds1[0] <= bounds2[0] and bounds2[1] <= bounds1[1]:
+            return vec1
+        elif bounds2[0] <= bounds1[0] and bounds1[1] <= bounds2[1]:
+            return vec2
+        else:
+            return None
+    elif not _merged(bounds1, bounds2, _OP_INTERSECTION):
+        bounds = tuple(_merged(bounds1, bounds2, _OP_UNION))
+    elif not _merged(bounds2, bounds1, _OP_DIFFERENCE):
+        return vec1
+    elif not _merged(bounds1, bounds2, _OP_DIFFERENCE):
+        return vec2
+    else:
+        return None
+    return vec1[:diffpos] + (bounds,) + vec1[diffpos + 1:]
+
+_numpy = None  # NumPy module, imported on first use
+
+def _import_numpy():
+    """Import NumPy on first use, return None if not available."""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+class RangeSet(object):
     """
     Mutable set of cluster node indexes featuring a fast range-based API.
 
@@ -88,10 +304,10 @@ class RangeSet(set):
     get the max padding length in the set, or force a fixed length zero-padding
     on the set.
 
-    RangeSet is itself a set and as such, provides an iterator over its items
-    as strings (strings are used since v1.9). It is recommended to use the
-    explicit iterators :meth:`RangeSet.intiter` and :meth:`RangeSet.striter`
-    when iterating over a RangeSet.
+    RangeSet provides an iterator over its items as strings (strings are used
+    since v1.9). It is recommended to use the explicit iterators
+    :meth:`RangeSet.intiter` and :meth:`RangeSet.striter` when iterating over
+    a RangeSet.
 
     RangeSet provides methods like :meth:`RangeSet.union`,
     :meth:`RangeSet.intersection`, :meth:`RangeSet.difference`,
@@ -100,6 +316,11 @@ class RangeSet(set):
     :meth:`RangeSet.difference_update`,
     :meth:`RangeSet.symmetric_difference_update` which conform to the Python
     Set API.
+
+    Internally, indexes are not stored one by one but as a sorted list of
+    boundaries of contiguous ranges of integer keys (see :func:`_tokey`), so
+    that memory usage and most operations depend on the number of ranges,
+    not on the number of indexes.
     """
     _VERSION = 4    # serial version number
 
@@ -109,15 +330,20 @@ class RangeSet(set):
         :param pattern: optional string pattern
         :param autostep: optional autostep threshold
         """
-        set.__init__(self)
+        # sorted list of [start, stop) key boundaries of contiguous ranges
+        self._bounds = []
+        # cached (autostep, folded string), length and positions of ranges,
+        # reset on change
+        self._folded = None
+        self._length = None
+        self._offsets = None
 
-        if pattern is not None and not isinstance(pattern, str):
+        if isinstance(pattern, RangeSet):
+            self._bounds = list(pattern._bounds)
+        elif pattern is not None and not isinstance(pattern, str):
             pattern = ",".join("%s" % i for i in pattern)
 
-        if isinstance(pattern, RangeSet):
-            self._autostep = pattern._autostep
-        else:
-            self._autostep = None
+        self._autostep = None
         self.autostep = autostep #: autostep threshold public instance attribute
 
         if isinstance(pattern, str):
@@ -213,6 +439,35 @@ class RangeSet(set):
         inst.updaten(rnglist)
         return inst
 
+    @classmethod
+    def fromiter(cls, iterable, autostep=None):
+        """
+        Class method that returns a new RangeSet from an iterable of
+        indexes (strings or integers), like lines of a large file.
+
+        Indexes are collected as integers, then sorted and merged at once,
+        so that this is much faster than adding them one by one. Other
+        items (eg. ranges like "1-5" or RangeSet objects) are added as with
+        :meth:`RangeSet.updaten`.
+        """
+        inst = RangeSet(autostep=autostep)
+        collector = _KeyCollector()
+        for index in iterable:
+            if isinstance(index, int) and not isinstance(index, bool):
+                collector.add(_tokey(index, len("%d" % index)))
+                continue
+            if isinstance(index, str) and index.isdigit() \
+                    and len(index) <= 100:
+                try:
+                    # isdigit() also accepts non-decimal digits (eg. u'\xb2')
+                    collector.add(_tokey(int(index), len(index)))
+                    continue
+                except ValueError:
+                    pass
+            inst.updaten((index,))
+        inst.update(collector.rangeset())
+        return inst
+
     @classmethod
     def fromone(cls, index, pad=0, autostep=None):
         """
@@ -227,7 +482,7 @@ class RangeSet(set):
         try:
             inst.add(index, pad)
         except TypeError:
-            if not index.stop:
+            if index.stop is None:
                 raise ValueError("Invalid range upper limit (%s)" % index.stop)
             inst.add_range(index.start or 0, index.stop, index.step or 1, pad)
         return inst
@@ -236,13 +491,12 @@ class RangeSet(set):
     def padding(self):
         """Get largest padding value of whole set"""
         result = None
-        for si in self:
-            idx, digitlen = int(si), len(si)
+        for width, start, _ in self._segments():
             # explicitly padded?
-            if digitlen > 1 and si[0] == '0':
+            if width > 1 and 0 <= start < 10 ** (width - 1):
                 # result always grows bigger as we iterate over a sorted set
                 # with largest padded values at the end
-                result = digitlen
+                result = width
         return result
 
     @padding.setter
@@ -250,10 +504,10 @@ class RangeSet(set):
         """Force padding length on the whole set"""
         if value is None:
             value = 1
-        cpyset = set(self)
+        segments = list(self._segments())
         self.clear()
-        for i in cpyset:
-            self.add(int(i), pad=value)
+        for _, start, stop in segments:
+            self.add_range(start, stop, 1, value)
 
     def get_autostep(self):
         """Get autostep value (property)"""
@@ -279,32 +533,76 @@ class RangeSet(set):
         """Get the number of dimensions of this RangeSet object. Common
         method with RangeSetND.  Here, it will always return 1 unless
         the object is empty, in that case it will return 0."""
-        return int(len(self) > 0)
+        return int(len(self._bounds) > 0)
+
+    def _segments(self):
+        """Iterate over sorted (width, start, stop) tuples, each one being
+        a contiguous range of indexes sharing the same string length."""
+        bounds = self._bounds
+        for i in range(0, len(bounds), 2):
+            lo, hi = bounds[i], bounds[i + 1]
+            while lo < hi:
+                width, shift, end = _keybucket(lo)
+                end = min(hi, end)
+                yield width, lo - shift, end - shift
+                lo = end
+
+    def _invalidate(self):
+        """Drop cached folded string, length and positions after a change."""
+        self._folded = None
+        self._length = None
+        self._offsets = None
+
+    def _rangeoffsets(self):
+        """Get the list of positions of the first index of each range,
+        followed by the length of the set (cumulative range lengths)."""
+        if self._offsets is None:
+            bounds = self._bounds
+            offsets = [0]
+            for i in range(0, len(bounds), 2):
+                offsets.append(offsets[-1] + bounds[i + 1] - bounds[i])
+            self._offsets = offsets
+        return self._offsets
+
+    def _key_at(self, pos):
+        """Get the internal key at position pos (0 <= pos < len(self)), in
+        O(log(number of ranges))."""
+        offsets = self._rangeoffsets()
+        i = bisect_right(offsets, pos) - 1
+        return self._bounds[2 * i] + pos - offsets[i]
+
+    def __len__(self):
+        """Get the number of indexes in RangeSet."""
+        if self._length is None:
+            bounds = self._bounds
+            self._length = sum(bounds[1::2]) - sum(bounds[::2])
+        return self._length
+
+    def __bool__(self):
+        return bool(self._bounds)
 
-    def _sorted(self):
-        """Get sorted list from inner set."""
-        # For mixed padding support, sort by both string length and index
-        return sorted(set.__iter__(self),
-                      key=lambda x: (-len(x), int(x)) if x.startswith('-') \
-                                    else (len(x), x))
+    __nonzero__ = __bool__  # Python 2 compat
 
     def __iter__(self):
         """Iterate over each element in RangeSet, currently as integers, with
         no padding information.
         To guarantee future compatibility, please use the methods intiter()
         or striter() instead."""
-        return iter(self._sorted())
+        return self.striter()
 
     def striter(self):
         """Iterate over each element in RangeSet as strings with optional
         zero-padding."""
-        return iter(self._sorted())
+        for width, start, stop in self._segments():
+            for i in range(start, stop):
+                yield "%0*d" % (width, i)
 
     def intiter(self):
         """Iterate over each element in RangeSet as integer.
         Zero padding info is ignored."""
-        for e in self._sorted():
-            yield int(e)
+        for _, start, stop in self._segments():
+            for i in range(start, stop):
+                yield i
 
     def contiguous(self):
         """Object-based iterator over contiguous range sets."""
@@ -320,6 +618,9 @@ class RangeSet(set):
 
     def __setstate__(self, dic):
         """called upon unpickling"""
+        if '_bounds' not in self.__dict__:
+            # object created by unpickler without calling __init__
+            self._bounds = []
         self.__dict__.update(dic)
         if getattr(self, '_version', 0) < RangeSet._VERSION:
             # unpickle from old version?
@@ -343,12 +644,10 @@ class RangeSet(set):
                 delattr(self, '_length')
 
             if getattr(self, '_version', 0) == 3:  # 1.6 - 1.8
-                padding = getattr(self, 'padding', 0)
-                # convert integer set to string set
-                cpyset = set(self)
-                self.clear()
-                for i in cpyset:
-                    self.add(i, pad=padding)  # automatic conversion
+                # v3 padding was global: apply it to the whole set
+                self.padding = self.padding
+
+        self._invalidate()
 
     def _strslices(self):
         """Stringify slices list (x-y/step format)"""
@@ -365,7 +664,12 @@ class RangeSet(set):
 
     def __str__(self):
         """Get comma-separated range-based string (x-y/step format)."""
-        return ','.join(self._strslices())
+        # folding only depends on indexes and autostep: reuse last result
+        folded = self._folded
+        if folded is None or folded[0] != self._autostep:
+            folded = self._folded = (self._autostep,
+                                     ','.join(self._strslices()))
+        return folded[1]
 
     # __repr__ is the same as __str__ as it is a valid expression that
     # could be used to recreate a RangeSet with the same value
@@ -377,6 +681,26 @@ class RangeSet(set):
         Iterator over RangeSet slices, either a:b:1 slices if autostep
         is disabled (default), or a:b:step slices if autostep is specified.
         """
+        if autostep >= AUTOSTEP_DISABLED:
+            # Without autostep, ranges can be built directly from segments:
+            # only unpadded contiguous segments of different lengths need to
+            # be merged (eg. "8-9" and "10-12").
+            cur_start = cur_stop = cur_pad = None
+            for width, start, stop in self._segments():
+                if width > 1 and 0 <= start < 10 ** (width - 1):
+                    pad = width
+                else:
+                    pad = 0
+                if cur_start is not None:
+                    if pad == 0 and cur_pad == 0 and cur_stop == start:
+                        cur_stop = stop
+                        continue
+                    yield slice(cur_start, cur_stop, 1), cur_pad
+                cur_start, cur_stop, cur_pad = start, stop, pad
+            if cur_start is not None:
+                yield slice(cur_start, cur_stop, 1), cur_pad
+            return
+
         #
         # Now support mixed lengths zero-padding (v1.9)
         cur_pad = 0
@@ -385,13 +709,7 @@ class RangeSet(set):
         cur_step = None
         last_idx = None
 
-        for si in self._sorted():
-
-            # numerical index and length of digits
-            idx, digitlen = int(si), len(si)
-
-            # is current digit zero-padded?
-            padded = (digitlen > 1 and si[0] == '0')
+        for digitlen, idx, padded in self._iterpadded():
 
             if cur_start is not None:
                 padding_mismatch = False
@@ -478,6 +796,15 @@ class RangeSet(set):
                 for j in range(cur_start, last_idx + 1, cur_step):
                     yield slice(j, j + 1, 1), cur_pad if cur_padded else 0
 
+    def _iterpadded(self):
+        """Iterate over sorted (length of digits, index, is_padded) tuples,
+        as needed by autostep folding."""
+        for width, start, stop in self._segments():
+            # indexes below this value are zero-padded
+            padmax = 10 ** (width - 1) if width > 1 else 0
+            for idx in range(start, stop):
+                yield width, idx, 0 <= idx < padmax
+
     def _contiguous_slices(self):
         """Internal iterator over contiguous slices in RangeSet."""
         return self._slices_padding()
@@ -501,10 +828,27 @@ class RangeSet(set):
         if isinstance(index, slice):
             inst = RangeSet()
             inst._autostep = self._autostep
-            inst.update(self._sorted()[index])
+            start, count, step = _slice_positions(index, len(self))
+            if step == 1:
+                # contiguous positions: copy ranges of keys
+                if count:
+                    first = self._key_at(start)
+                    last = self._key_at(start + count - 1)
+                    inst._bounds = _clipped(self._bounds, first, last + 1)
+            else:
+                inst._bounds = _keybounds(self._key_at(start + i * step)
+                                          for i in range(count))
             return inst
         elif isinstance(index, int):
-            return self._sorted()[index]
+            length = len(self)
+            if index < 0:
+                index += length
+            if not 0 <= index < length:
+                raise IndexError("%s index out of range" %
+                                 self.__class__.__name__)
+            key = self._key_at(index)
+            width, shift, _ = _keybucket(key)
+            return "%0*d" % (width, key - shift)
         else:
             raise TypeError("%s indices must be integers" %
                             self.__class__.__name__)
@@ -516,7 +860,7 @@ class RangeSet(set):
         less 1. Current rangeset remains unmodified. Returns an
         iterator.
 
-        >>> RangeSet("1-5").split(3) 
+        >>> RangeSet("1-5").split(3)
         RangeSet("1-2")
         RangeSet("3-4")
         RangeSet("foo5")
@@ -533,6 +877,29 @@ class RangeSet(set):
             yield self[begin:begin + length]
             begin += length
 
+    def _add_keys(self, lo, hi):
+        """Add the [lo, hi) range of internal keys."""
+        bounds = self._bounds
+        i = bisect_left(bounds, lo)
+        j = bisect_right(bounds, hi)
+        # odd positions are within (or adjacent to) an existing range
+        bounds[i:j] = [lo] * (1 - i % 2) + [hi] * (1 - j % 2)
+        self._invalidate()
+
+    def _remove_keys(self, lo, hi):
+        """Remove the [lo, hi) range of internal keys."""
+        bounds = self._bounds
+        i = bisect_left(bounds, lo)
+        j = bisect_right(bounds, hi)
+        bounds[i:j] = [lo] * (i % 2) + [hi] * (j % 2)
+        self._invalidate()
+
+    def _contains_keys(self, lo, hi):
+        """Check whether the [lo, hi) range of internal keys is included."""
+        bounds = self._bounds
+        i = bisect_right(bounds, lo)
+        return i % 2 == 1 and bounds[i] >= hi
+
     def add_range(self, start, stop, step=1, pad=0):
         """
         Add a range (start, stop, step and padding length) to RangeSet.
@@ -542,18 +909,37 @@ class RangeSet(set):
         assert start < stop, "please provide ordered node index ranges"
         assert step > 0
         assert pad >= 0
-        assert stop - start < 1e9, "range too large"
 
-        if pad == 0:
-            set.update(self, ("%d" % i for i in range(start, stop, step)))
-        else:
-            set.update(self, ("%0*d" % (pad, i) for i in range(start, stop, step)))
+        if step > 1:
+            assert stop - start < 1e9, "range too large"
+            for i in range(start, stop, step):
+                self.add(i, pad)
+            return
+
+        # split range into subranges of indexes of same string length
+        while start < stop:
+            width = len(str(start))
+            if width <= pad:
+                # zero-padded (or exactly pad long) indexes
+                width = pad
+                limit = 0 if start < 0 else 10 ** pad
+            elif start < 0:
+                limit = 1 - 10 ** (width - 2)
+            else:
+                limit = 10 ** width
+            end = min(stop, limit)
+            key = _tokey(start, width)
+            self._add_keys(key, key + end - start)
+            start = end
 
     def copy(self):
         """Return a shallow copy of a RangeSet."""
         cpy = self.__class__()
         cpy._autostep = self._autostep
-        cpy.update(self)
+        cpy._bounds = list(self._bounds)
+        cpy._folded = self._folded
+        cpy._length = self._length
+        cpy._offsets = self._offsets
         return cpy
 
     __copy__ = copy # For the copy module
@@ -569,7 +955,7 @@ class RangeSet(set):
         # comparison).
         if not isinstance(other, RangeSet):
             return NotImplemented
-        return len(self) == len(other) and self.issubset(other)
+        return self._bounds == other._bounds
 
     # Standard set operations: union, intersection, both differences.
     # Each has an operator version (e.g. __or__, invoked with |) and a
@@ -585,25 +971,48 @@ class RangeSet(set):
 
         (I.e. all elements that are in either set.)
         """
-        if not isinstance(other, set):
+        if not isinstance(other, RangeSet):
             return NotImplemented
         return self.union(other)
 
+    def _binary_op(self, other, optable):
+        """Return result of a set operation as a new RangeSet."""
+        if not isinstance(other, RangeSet):
+            other = RangeSet(other)
+        inst = self.__class__()
+        inst._autostep = self._autostep
+        if optable is _OP_INTERSECTION:
+            inst._bounds = self._intersected(other)
+        else:
+            inst._bounds = _merged(self._bounds, other._bounds, optable)
+        return inst
+
+    def _intersected(self, other):
+        """Get key boundaries of the intersection with another RangeSet."""
+        bounds, obounds = self._bounds, other._bounds
+        if len(bounds) < len(obounds):
+            bounds, obounds = obounds, bounds
+        if _SMALL_RATIO * len(obounds) < len(bounds):
+            # clip large list of boundaries using each range of smaller one
+            result = []
+            for i in range(0, len(obounds), 2):
+                result += _clipped(bounds, obounds[i], obounds[i + 1])
+            return result
+        return _merged(bounds, obounds, _OP_INTERSECTION)
+
     def union(self, other):
         """Return the union of two RangeSets as a new RangeSet.
 
         (I.e. all elements that are in either set.)
         """
-        self_copy = self.copy()
-        self_copy.update(other)
-        return self_copy
+        return self._binary_op(other, _OP_UNION)
 
     def __and__(self, other):
         """Return the intersection of two RangeSets as a new RangeSet.
 
         (I.e. all elements that are in both sets.)
         """
-        if not isinstance(other, set):
+        if not isinstance(other, RangeSet):
             return NotImplemented
         return self.intersection(other)
 
@@ -612,16 +1021,14 @@ class RangeSet(set):
 
         (I.e. all elements that are in both sets.)
         """
-        self_copy = self.copy()
-        self_copy.intersection_update(other)
-        return self_copy
+        return self._binary_op(other, _OP_INTERSECTION)
 
     def __xor__(self, other):
         """Return the symmetric difference of two RangeSets as a new RangeSet.
 
         (I.e. all elements that are in exactly one of the sets.)
         """
-        if not isinstance(other, set):
+        if not isinstance(other, RangeSet):
             return NotImplemented
         return self.symmetric_difference(other)
 
@@ -630,16 +1037,14 @@ class RangeSet(set):
 
         (ie. all elements that are in exactly one of the sets.)
         """
-        self_copy = self.copy()
-        self_copy.symmetric_difference_update(other)
-        return self_copy
+        return self._binary_op(other, _OP_SYMMETRIC_DIFFERENCE)
 
     def __sub__(self, other):
         """Return the difference of two RangeSets as a new RangeSet.
 
         (I.e. all elements that are in this set and not in the other.)
         """
-        if not isinstance(other, set):
+        if not isinstance(other, RangeSet):
             return NotImplemented
         return self.difference(other)
 
@@ -648,9 +1053,7 @@ class RangeSet(set):
 
         (I.e. all elements that are in this set and not in the other.)
         """
-        self_copy = self.copy()
-        self_copy.difference_update(other)
-        return self_copy
+        return self._binary_op(other, _OP_DIFFERENCE)
 
     # Membership test
 
@@ -661,22 +1064,37 @@ class RangeSet(set):
 
         Called in response to the expression ``element in self``.
         """
-        if isinstance(element, set):
+        if isinstance(element, RangeSet):
             return element.issubset(self)
 
-        return set.__contains__(self, str(element))
+        try:
+            if isinstance(element, str):
+                value = int(element)
+                if "%0*d" % (len(element), value) != element:
+                    return False
+                key = _tokey(value, len(element))
+            else:
+                value = int(element)
+                key = _tokey(value, len(str(value)))
+        except (TypeError, ValueError):
+            return False
+        return self._contains_keys(key, key + 1)
 
     # Subset and superset test
 
     def issubset(self, other):
         """Report whether another set contains this RangeSet."""
         self._binary_sanity_check(other)
-        return set.issubset(self, other)
+        bounds = self._bounds
+        for i in range(0, len(bounds), 2):
+            if not other._contains_keys(bounds[i], bounds[i + 1]):
+                return False
+        return True
 
     def issuperset(self, other):
         """Report whether this RangeSet contains another set."""
         self._binary_sanity_check(other)
-        return set.issuperset(self, other)
+        return other.issubset(self)
 
     # Inequality comparisons using the is-subset relation.
     __le__ = issubset
@@ -693,10 +1111,11 @@ class RangeSet(set):
     # Assorted helpers
 
     def _binary_sanity_check(self, other):
-        """Check that the other argument to a binary operation is also  a set,
-        raising a TypeError otherwise."""
-        if not isinstance(other, set):
-            raise TypeError("Binary operation only permitted between sets")
+        """Check that the other argument to a binary operation is also a
+        RangeSet, raising a TypeError otherwise."""
+        if not isinstance(other, RangeSet):
+            raise TypeError("Binary operation only permitted between "
+                            "RangeSets")
 
     # In-place union, intersection, differences.
     # Subtle:  The xyz_update() functions deliberately return None,
@@ -706,7 +1125,7 @@ class RangeSet(set):
     def __ior__(self, other):
         """Update a RangeSet with the union of itself and another."""
         self._binary_sanity_check(other)
-        set.__ior__(self, other)
+        self.update(other)
         return self
 
     def union_update(self, other):
@@ -716,29 +1135,36 @@ class RangeSet(set):
     def __iand__(self, other):
         """Update a RangeSet with the intersection of itself and another."""
         self._binary_sanity_check(other)
-        set.__iand__(self, other)
+        self.intersection_update(other)
         return self
 
     def intersection_update(self, other):
         """Update a RangeSet with the intersection of itself and another."""
-        set.intersection_update(self, other)
+        if not isinstance(other, RangeSet):
+            other = RangeSet(other)
+        self._bounds = self._intersected(other)
+        self._invalidate()
 
     def __ixor__(self, other):
         """Update a RangeSet with the symmetric difference of itself and
         another."""
         self._binary_sanity_check(other)
-        set.symmetric_difference_update(self, other)
+        self.symmetric_difference_update(other)
         return self
 
     def symmetric_difference_update(self, other):
         """Update a RangeSet with the symmetric difference of itself and
         another."""
-        set.symmetric_difference_update(self, other)
+        if not isinstance(other, RangeSet):
+            other = RangeSet(other)
+        self._bounds = _merged(self._bounds, other._bounds,
+                               _OP_SYMMETRIC_DIFFERENCE)
+        self._invalidate()
 
     def __isub__(self, other):
         """Remove all elements of another set from this RangeSet."""
         self._binary_sanity_check(other)
-        set.difference_update(self, other)
+        self.difference_update(other)
         return self
 
     def difference_update(self, other, strict=False):
@@ -746,33 +1172,62 @@ class RangeSet(set):
 
         If strict is True, raise KeyError if an element cannot be removed.
         (strict is a RangeSet addition)"""
+        if not isinstance(other, RangeSet):
+            other = RangeSet(other)
         if strict and other not in self:
-            raise KeyError(set.difference(other, self).pop())
-        set.difference_update(self, other)
+            raise KeyError(other.difference(self)[0])
+        obounds = other._bounds
+        if _SMALL_RATIO * len(obounds) < len(self._bounds):
+            for i in range(0, len(obounds), 2):
+                self._remove_keys(obounds[i], obounds[i + 1])
+        else:
+            self._bounds = _merged(self._bounds, obounds, _OP_DIFFERENCE)
+            self._invalidate()
 
     # Python dict-like mass mutations: update, clear
 
     def update(self, iterable):
         """Add all indexes (as strings) from an iterable (such as a list)."""
         assert not isinstance(iterable, str)
-        set.update(self, iterable)
+        if isinstance(iterable, RangeSet):
+            obounds = iterable._bounds
+            if _SMALL_RATIO * len(obounds) < len(self._bounds):
+                for i in range(0, len(obounds), 2):
+                    self._add_keys(obounds[i], obounds[i + 1])
+            else:
+                self._bounds = _merged(self._bounds, obounds, _OP_UNION)
+                self._invalidate()
+        else:
+            for element in iterable:
+                self.add(element)
 
     def updaten(self, rangesets):
         """
         Update a rangeset with the union of itself and several others.
         """
         for rng in rangesets:
-            if isinstance(rng, set):
+            if isinstance(rng, RangeSet):
+                self.update(rng)
+            elif isinstance(rng, (set, frozenset)):
                 self.update(str(i) for i in rng)  # 1.9+: force cast to str
             else:
                 self.update(RangeSet(rng))
 
     def clear(self):
         """Remove all elements from this RangeSet."""
-        set.clear(self)
+        self._bounds = []
+        self._invalidate()
 
     # Single-element mutations: add, remove, discard
 
+    def _elemkey(self, element, pad):
+        """Get internal key of a string element or of an integer element
+        with padding info."""
+        if isinstance(element, str):
+            return _tokey(int(element), len(element))
+        value = int(element)
+        return _tokey(value, max(pad, len(str(value))))
+
     def add(self, element, pad=0):
         """Add an element to a RangeSet.
         This has no effect if the element is already present.
@@ -784,10 +1239,8 @@ class RangeSet(set):
         :param element: the element to add (integer or string)
         :param pad: zero padding length (integer); ignored if element is string
         """
-        if isinstance(element, str):
-            set.add(self, element)
-        else:
-            set.add(self, "%0*d" % (pad, int(element)))
+        key = self._elemkey(element, pad)
+        self._add_keys(key, key + 1)
 
     def remove(self, element, pad=0):
         """Remove an element from a RangeSet.
@@ -801,10 +1254,15 @@ class RangeSet(set):
         :raises KeyError: element is not contained in RangeSet
         :raises ValueError: element is not castable to integer
         """
-        if isinstance(element, str):
-            set.remove(self, element)
-        else:
-            set.remove(self, "%0*d" % (pad, int(element)))
+        try:
+            key = self._elemkey(element, pad)
+        except ValueError:
+            if isinstance(element, str):
+                raise KeyError(element)
+            raise
+        if not self._contains_keys(key, key + 1):
+            raise KeyError(element)
+        self._remove_keys(key, key + 1)
 
     def discard(self, element, pad=0):
         """Discard an element from a RangeSet if it is a member.
@@ -819,14 +1277,101 @@ class RangeSet(set):
         :param pad: zero padding length (integer); ignored if element is string
         """
         try:
-            if isinstance(element, str):
-                set.discard(self, element)
-            else:
-                set.discard(self, "%0*d" % (pad, int(element)))
-        except ValueError:
+            key = self._elemkey(element, pad)
+            self._remove_keys(key, key + 1)
+        except (TypeError, ValueError):
             pass # ignore other object types
 
 
+class FrozenRangeSet(RangeSet):
+    """
+    Immutable and hashable version of :class:`RangeSet`.
+
+    FrozenRangeSet objects can be used as dictionary keys or set members.
+    As they cannot be modified, their folded string, length and hash value
+    are only computed once. Set operations return new FrozenRangeSet
+    objects, including in-place operators that rebind the left operand
+    like they do for the builtin frozenset type.
+
+       >>> rset = FrozenRangeSet("1-5,7")
+       >>> {rset: "ok"}[FrozenRangeSet("1-5,7")]
+       'ok'
+
+    Use :meth:`FrozenRangeSet.copy` to get a mutable :class:`RangeSet`.
+    """
+
+    def __init__(self, pattern=None, autostep=None):
+        """Initialize FrozenRangeSet object.
+
+        :param pattern: optional string pattern or RangeSet object
+        :param autostep: optional autostep threshold
+        """
+        RangeSet.__init__(self, autostep=autostep)
+        if pattern is not None:
+            self._bounds = RangeSet(pattern)._bounds
+        self._hash = None
+
+    @classmethod
+    def fromlist(cls, rnglist, autostep=None):
+        """Class method that returns a new FrozenRangeSet with ranges from
+        provided list."""
+        return cls(RangeSet.fromlist(rnglist), autostep)
+
+    @classmethod
+    def fromiter(cls, iterable, autostep=None):
+        """Class method that returns a new FrozenRangeSet from an iterable of
+        indexes (see :meth:`RangeSet.fromiter`)."""
+        return cls(RangeSet.fromiter(iterable), autostep)
+
+    @classmethod
+    def fromone(cls, index, pad=0, autostep=None):
+        """Class method that returns a new FrozenRangeSet of one single item
+        or a single range (see :meth:`RangeSet.fromone`)."""
+        return cls(RangeSet.fromone(index, pad), autostep)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(tuple(self._bounds))
+        return self._hash
+
+    def copy(self):
+        """Return a mutable copy of this set, as a :class:`RangeSet`."""
+        cpy = RangeSet(self, autostep=self.autostep)
+        cpy._folded = self._folded
+        cpy._length = self._length
+        cpy._offsets = self._offsets
+        return cpy
+
+    __copy__ = copy
+
+    def _immutable(self, *args, **kwargs):
+        """Refuse to modify a FrozenRangeSet."""
+        raise TypeError("'%s' object is immutable" % self.__class__.__name__)
+
+    add = add_range = remove = discard = clear = _immutable
+    update = updaten = union_update = _immutable
+    intersection_update = difference_update = _immutable
+    symmetric_difference_update = _immutable
+    # padding cannot be forced on a frozen set
+    padding = property(RangeSet.padding.fget, _immutable)
+
+    def __ior__(self, other):
+        self._binary_sanity_check(other)
+        return self.union(other)
+
+    def __iand__(self, other):
+        self._binary_sanity_check(other)
+        return self.intersection(other)
+
+    def __ixor__(self, other):
+        self._binary_sanity_check(other)
+        return self.symmetric_difference(other)
+
+    def __isub__(self, other):
+        self._binary_sanity_check(other)
+        return self.difference(other)
+
+
 class RangeSetND(object):
     """
     Build a N-dimensional RangeSet object.
@@ -1032,37 +1577,47 @@ class RangeSetND(object):
     autostep = property(get_autostep, set_autostep)
 
     @precond_fold()
+    def _vectors_at(self, positions):
+        """Iterate over vectors of indexes (as tuples of strings) found at
+        sorted positions, without expanding whole vectors."""
+        positions = iter(positions)
+        pos = next(positions, None)
+        base = 0  # position of first element of current vector
+        for rgvec in self._veclist:
+            lengths = [len(rg) for rg in rgvec]
+            cnt = reduce(mul, lengths)
+            while pos is not None and pos < base + cnt:
+                # mixed radix decomposition, last dimension varies fastest
+                rem = pos - base
+                ivec = []
+                for rg, rglen in zip(reversed(rgvec), reversed(lengths)):
+                    rem, idx = divmod(rem, rglen)
+                    ivec.append(rg[idx])
+                yield tuple(reversed(ivec))
+                pos = next(positions, None)
+            base += cnt
+
     def __getitem__(self, index):
         """
         Return the element at index or a subrange when a slice is specified.
         """
         if isinstance(index, slice):
-            iveclist = []
-            for rgvec in self._veclist:
-                iveclist += product(*rgvec)
-            assert(len(iveclist) == len(self))
-            rnd = RangeSetND(iveclist[index], autostep=self.autostep)
-            return rnd
+            start, count, step = _slice_positions(index, len(self))
+            positions = (start + i * step for i in range(count))
+            return RangeSetND(list(self._vectors_at(positions)),
+                              autostep=self.autostep)
 
         elif isinstance(index, int):
             # find a tuple of integer (multi-dimensional) at position index
+            length = len(self)
             if index < 0:
-                length = len(self)
                 if index >= -length:
                     index = length + index
                 else:
                     raise IndexError("%d out of range" % index)
-            length = 0
-            for rgvec in self._veclist:
-                cnt = reduce(mul, [len(rg) for rg in rgvec])
-                if length + cnt < index:
-                    length += cnt
-                else:
-                    for ivec in product(*rgvec):
-                        if index == length:
-                            return ivec
-                        length += 1
-            raise IndexError("%d out of range" % index)
+            if index >= length:
+                raise IndexError("%d out of range" % index)
+            return next(self._vectors_at((index,)))
         else:
             raise TypeError("%s indices must be integers" %
                             self.__class__.__name__)
@@ -1198,12 +1753,134 @@ class RangeSetND(object):
 
     def _fold_multivariate(self):
         """Multivariate nD folding"""
-        # PHASE 1: expand with respect to uniqueness
-        self._fold_multivariate_expand()
-        # PHASE 2: merge
-        self._fold_multivariate_merge()
+        if ND_FOLD_ENGINE == 'rangesets':
+            # PHASE 1: expand with respect to uniqueness
+            self._fold_multivariate_expand()
+            # PHASE 2: merge
+            self._fold_multivariate_merge()
+        else:
+            self._fold_multivariate_intervals()
         self._dirty = False
 
+    def _fold_multivariate_intervals(self):
+        """Multivariate nD folding on vectors of range boundaries.
+
+        Same algorithm as _fold_multivariate_expand() followed by
+        _fold_multivariate_merge(), but vectors are tuples of range
+        boundaries of internal keys instead of lists of RangeSet objects,
+        which avoids creating and comparing many temporary RangeSets.
+        Vectors are still expanded into unique items (one per node) and
+        merged pairwise, as merging intervals of the original vectors
+        would not give the same folded result."""
+        keystrs = {}
+
+        def keystr(key):
+            # string of a key, as used by _sort() to compare RangeSets
+            try:
+                return keystrs[key]
+            except KeyError:
+                width, shift, _ = _keybucket(key)
+                result = keystrs[key] = "%0*d" % (width, key - shift)
+                return result
+
+        def veckeyfunc(vec):
+            # same sort key as in _sort()
+            lens = [sum(bounds[i + 1] - bounds[i]
+                        for i in range(0, len(bounds), 2)) for bounds in vec]
+            return (-reduce(mul, lens),
+                    tuple((-length, keystr(bounds[0]), keystr(bounds[-1] - 1))
+                          for length, bounds in zip(lens, vec)))
+
+        # PHASE 1: expand with respect to uniqueness (already sorted)
+        veclist = [tuple((key, key + 1) for key in point)
+                   for point in self._expanded_keys(keystr)]
+
+        # PHASE 2: merge (see _fold_multivariate_merge)
+        full = False
+        chg = True
+        sort = False
+        while chg:
+            chg = False
+            if sort:
+                veclist.sort(key=veckeyfunc)
+            sort = True
+            index1 = 0
+            while (index1 + 1) < len(veclist):
+                item1 = veclist[index1]
+                index2 = index1 + 1
+                index1 += 1
+                while index2 < len(veclist):
+                    new_item = _merged_vector(item1, veclist[index2])
+                    if new_item is not None:
+                        chg = True
+                        item1 = veclist[index1 - 1] = new_item
+                        veclist.pop(index2)
+                    elif not full:
+                        break
+                    else:
+                        index2 += 1
+            if not chg and not full:
+                chg = full = True
+
+        autostep = self._autostep
+        self._veclist = []
+        for vec in veclist:
+            rgvec = []
+            for bounds in vec:
+                rg = RangeSet()
+                rg._bounds = list(bounds)
+                rg._autostep = autostep
+                rgvec.append(rg)
+            self._veclist.append(rgvec)
+
+    def _expanded_keys(self, keystr):
+        """Get all unique items as tuples of internal keys, sorted like
+        the strings of these keys (using `keystr`)."""
+        numpy = _import_numpy() if ND_FOLD_NUMPY else None
+        if numpy is not None:
+            # NumPy only handles 64-bit integers
+            limit = 2 ** 62
+            if all(-limit < rg._bounds[0] and rg._bounds[-1] < limit
+                   for vec in self._veclist for rg in vec):
+                return self._expanded_keys_numpy(numpy, keystr)
+        points = set()
+        for vec in self._veclist:
+            points.update(product(*[_boundkeys(rg._bounds) for rg in vec]))
+        return sorted(points, key=lambda point: tuple(keystr(key)
+                                                      for key in point))
+
+    def _expanded_keys_numpy(self, numpy, keystr):
+        """NumPy version of _expanded_keys()."""
+        arrays = []
+        # vectors of single items are common: group them in one array
+        singles = []
+        for vec in self._veclist:
+            if all(rg._bounds[1] - rg._bounds[0] == 1 and len(rg._bounds) == 2
+                   for rg in vec):
+                singles.append([rg._bounds[0] for rg in vec])
+                continue
+            axes = [numpy.concatenate([numpy.arange(rg._bounds[i],
+                                                    rg._bounds[i + 1],
+                                                    dtype=numpy.int64)
+                                       for i in range(0, len(rg._bounds), 2)])
+                    for rg in vec]
+            grid = numpy.meshgrid(*axes, indexing='ij')
+            arrays.append(numpy.stack([axis.ravel() for axis in grid], axis=1))
+        if singles:
+            arrays.append(numpy.array(singles, dtype=numpy.int64))
+        points = numpy.unique(numpy.concatenate(arrays), axis=0)
+        # sort keys of each dimension by their string, then sort items
+        ranks = []
+        for dim in range(points.shape[1]):
+            keys, inverse = numpy.unique(points[:, dim], return_inverse=True)
+            keys = keys.tolist()
+            order = sorted(range(len(keys)), key=lambda i: keystr(keys[i]))
+            rank = numpy.empty(len(keys), dtype=numpy.int64)
+            rank[order] = numpy.arange(len(keys))
+            ranks.append(rank[inverse.ravel()])
+        points = points[numpy.lexsort(ranks[::-1])]
+        return [tuple(point) for point in points.tolist()]
+
     def _fold_multivariate_expand(self):
         """Multivariate nD folding: expand [phase 1]"""
         self._veclist = [[RangeSet.fromone(i, autostep=self.autostep)
@@ -43,6 +43,7 @@ Simple example of use:
 """
 
 from __future__ import print_function
+from importlib import import_module
 import logging
 from operator import itemgetter
 import os
@@ -66,15 +67,14 @@ from ClusterShell.Engine.Engine import EngineTimer
 from ClusterShell.Engine.Factory import PreferredEngine
 from ClusterShell.Worker.EngineClient import EnginePort, EngineClientError
 from ClusterShell.Worker.Popen import WorkerPopen
-from ClusterShell.Worker.Tree import TreeWorker
 from ClusterShell.Worker.Worker import FANOUT_UNLIMITED
+from ClusterShell.Worker.Worker import _eh_sigspec_invoke_compat
 
 from ClusterShell.Event import EventHandler
 from ClusterShell.MsgTree import MsgTree
 from ClusterShell.NodeSet import NodeSet
 
 from ClusterShell.Topology import TopologyParser, TopologyError
-from ClusterShell.Propagation import PropagationTreeRouter, PropagationChannel
 
 
 class TaskException(Exception):
@@ -93,6 +93,11 @@ class TaskMsgTreeError(TaskError):
     """Raised when trying to access disabled MsgTree."""
 
 
+def _tree_module(modname):
+    """Return ClusterShell module `modname' used in tree mode (Worker.Tree,
+    Propagation), that is only imported when needed."""
+    return import_module('ClusterShell.%s' % modname)
+
 def _getshorthostname():
     """Get short hostname (host name cut at the first dot)"""
     return socket.gethostname().split('.')[0]
@@ -198,6 +203,33 @@ class Task(object):
             # call task method
             func(self.task, *args, **kwargs)
 
+    class _AsyncCloseHandler(object):
+        """Event handler proxy used by shell_async(): forward all events
+        to the user handler and set the worker future result on close."""
+        def __init__(self, handler, future, loop):
+            if handler is None:
+                handler = EventHandler()
+            self.handler = handler
+            self.future = future
+            self.loop = loop
+
+        def _set_result(self, worker):
+            if not self.future.done():
+                self.future.set_result(worker)
+
+        def __getattr__(self, name):
+            return getattr(self.handler, name)
+
+        def ev_close(self, worker, timedout):
+            """Worker has finished: forward event and set future result."""
+            try:
+                _eh_sigspec_invoke_compat(self.handler.ev_close, 2, worker,
+                                          timedout)
+            finally:
+                # deferred: if the task run is aborted by an exception,
+                # workers are closed first and the future gets the exception
+                self.loop.call_soon(self._set_result, worker)
+
     class tasksyncmethod(object):
         """Class encapsulating a function that checks if the calling
         task is running or is the current task, and allowing it to be
@@ -305,6 +337,10 @@ class Task(object):
             self._suspended = False
             self._quit = False
             self._terminated = False
+            # future of current run in asyncio event loop (see resume_async)
+            self._run_future = None
+            # pending futures returned by shell_async()
+            self._async_futures = set()
 
             # Default router
             self.topology = None
@@ -434,9 +470,9 @@ class Task(object):
         if router is None:
             if self.router is None:
                 # Init router with the task's topology (e.g. root node)
-                self.router = \
-                    PropagationTreeRouter(str(self.topology.root.nodeset),
-                                          self.topology)
+                router_cls = _tree_module('Propagation').PropagationTreeRouter
+                self.router = router_cls(str(self.topology.root.nodeset),
+                                         self.topology)
         else:
             if self.router is not None:
                 # Update default router if a different one is used by a worker.
@@ -612,7 +648,7 @@ class Task(object):
                     raise TaskError("tree mode required for distant shell "
                                     "command with unknown topology!")
                 # create tree worker
-                wrkcls = TreeWorker
+                wrkcls = _tree_module('Worker.Tree').TreeWorker
             elif not remote:
                 # create local worker
                 wrkcls = self.default('local_worker')
@@ -662,7 +698,7 @@ class Task(object):
                                 "command with unknown topology!")
 
             # create tree worker
-            wrkcls = TreeWorker
+            wrkcls = _tree_module('Worker.Tree').TreeWorker
         else:
             # create a new copy worker
             wrkcls = self.default('distant_worker')
@@ -799,11 +835,14 @@ class Task(object):
             except EngineAlreadyRunningError:
                 raise AlreadyRunningError("task engine is already running")
         finally:
-            # task becomes joinable
-            self._join_cond.acquire()
-            self._suspend_cond.atomic_inc()
-            self._join_cond.notify_all()
-            self._join_cond.release()
+            self._resume_end()
+
+    def _resume_end(self):
+        """Task run completion: task becomes joinable."""
+        self._join_cond.acquire()
+        self._suspend_cond.atomic_inc()
+        self._join_cond.notify_all()
+        self._join_cond.release()
 
     def resume(self, timeout=None):
         """
@@ -878,6 +917,129 @@ class Task(object):
 
         return worker
 
+    def _async_loop(self):
+        """
+        Check that task can run in the asyncio event loop of the calling
+        thread and return this event loop.
+        """
+        if not self._is_task_self():
+            raise TaskError("task must run in the calling thread to be "
+                            "driven by its event loop")
+        if not hasattr(self._engine, 'run_async'):
+            raise TaskError("engine %s does not support asyncio (set engine "
+                            "to asyncio)" % self._engine.identifier)
+        import asyncio
+        return asyncio.get_event_loop()
+
+    def resume_async(self, timeout=None):
+        """
+        Resume task in the asyncio event loop of the calling thread.
+
+        Unlike resume(), this method does not block: workers are executed
+        by the event loop and an awaitable future is returned, done when
+        all (non-autoclosing) workers have finished. This allows a task to
+        be driven from coroutines, without any extra thread. If the task is
+        already running in the event loop, the future of the current run is
+        returned.
+
+        This method requires the asyncio engine (see the engine default)
+        and a task bound to the calling thread (eg. task_self()). The
+        timeout parameter sets an hard limit of task execution time like
+        resume(); in that case, the future raises TimeoutError.
+
+        Example:
+
+        >>> task = task_self()
+        >>> task.shell("/bin/date", nodes="node[1-2345]")
+        >>> await task.resume_async()
+        """
+        if self._run_future is not None:
+            return self._run_future
+
+        loop = self._async_loop()
+        if not self._run_lock.acquire(False):
+            raise AlreadyRunningError("task is already running")
+
+        self.timeout = timeout
+        self._suspend_cond.atomic_dec()
+        self._run_future = loop.create_future()
+        try:
+            self._reset()
+            # completion is notified synchronously, so that the task can be
+            # resumed again as soon as any worker future result is set
+            self._engine.run_async(timeout, self._resume_async_done)
+        except:
+            self._run_future = None
+            self._run_lock.release()
+            self._resume_end()
+            raise
+        return self._run_future
+
+    def _resume_async_done(self, engine_future):
+        """
+        Task run in event loop is complete: set run future result. Called
+        by the engine as soon as the run is complete.
+        """
+        future, self._run_future = self._run_future, None
+        self._run_lock.release()
+        try:
+            try:
+                engine_future.result()
+            except EngineTimeoutException:
+                raise TimeoutError()
+            except EngineAbortException as exc:
+                self._terminate(exc.kill)
+        except Exception as exc:
+            if not future.cancelled():
+                future.set_exception(exc)
+            # also raise run exception from pending shell_async() futures
+            worker_futures = [wfut for wfut in self._async_futures
+                              if not wfut.done()]
+            for wfut in worker_futures:
+                wfut.set_exception(exc)
+            if worker_futures and not future.cancelled():
+                future.exception()  # retrieved, at least by these futures
+        else:
+            if not future.cancelled():
+                future.set_result(None)
+        finally:
+            self._resume_end()
+
+    def shell_async(self, command, **kwargs):
+        """
+        Schedule a shell command like shell() and return an awaitable
+        future. The future result is the command Worker, set once
+        the worker has finished (after its ev_close event). Cancelling this
+        future aborts the worker. If the task run is aborted by an exception
+        (eg. raised by an event handler), the future raises it.
+
+        The task is resumed in the asyncio event loop of the calling thread
+        if needed, see resume_async() for requirements.
+
+        Example:
+
+        >>> task = task_self()
+        >>> worker = await task.shell_async("/bin/date", nodes="node[1-5]")
+        >>> for buf, nodes in worker.iter_buffers():
+        ...     print(nodes, buf)
+        """
+        loop = self._async_loop()
+        future = loop.create_future()
+        kwargs['handler'] = Task._AsyncCloseHandler(kwargs.get('handler'),
+                                                    future, loop)
+        worker = self.shell(command, **kwargs)
+
+        def worker_done(future):
+            self._async_futures.discard(future)
+            if future.cancelled():
+                worker.abort()
+        self._async_futures.add(future)
+        future.add_done_callback(worker_done)
+
+        if self._run_future is None:
+            self.resume_async()
+        return future
+
     @tasksyncmethod()
     def _suspend_wait(self):
         """Suspend request received."""
@@ -940,6 +1102,9 @@ class Task(object):
         if not self._run_lock.acquire(0):
             # self._run_lock is locked, try to call synchronized method
             self._abort(kill)
+            if self._run_future is not None and self._is_task_self():
+                # running in event loop: abort completes asynchronously
+                return
             # but there is no guarantee that it has really been called, as the
             # task could have aborted during the same time, so we use polling
             while not self._run_lock.acquire(0):
@@ -1335,7 +1500,8 @@ class Task(object):
 
         # create gateway channel if needed
         if gwstr not in self.gateways:
-            chan = PropagationChannel(self, gateway)
+            chan = _tree_module('Propagation').PropagationChannel(self,
+                                                                  gateway)
             logger = logging.getLogger(__name__)
             logger.debug("pchannel: creating new channel %s", chan)
             # invoke gateway
@@ -28,7 +28,9 @@ it and write data to it. Multiple data channels are supported (eg. stdin, stdout
 and stderr, or even more...)
 """
 
+from collections import deque
 import errno
+from itertools import islice
 import logging
 import os
 
@@ -48,6 +50,17 @@ from ClusterShell.Engine.Engine import EngineBaseTimer, E_READ, E_WRITE
 
 LOGGER = logging.getLogger(__name__)
 
+# os.writev() is only available with Python 3.3+
+_writev = getattr(os, 'writev', None)
+
+# Maximum number of buffers per writev() call
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = -1
+if IOV_MAX <= 0:
+    IOV_MAX = 1024
+
 
 class EngineClientException(Exception):
     """Generic EngineClient exception."""
@@ -62,6 +75,120 @@ class EngineClientNotSupportedError(EngineClientError):
     """Operation not supported by EngineClient."""
 
 
+class LineSplitter(object):
+    """Line splitter for data read from EngineClient streams.
+
+    Incoming data is kept in a bytearray until a LF is found, which is
+    looked for with find() from the end of the previous scan, so that a
+    long line received in many reads is neither copied nor scanned more
+    than once. Lines are returned as bytes without their trailing LF or
+    CRLF.
+
+    If maxlen is greater than 0, lines longer than maxlen bytes are either
+    split into maxlen-byte lines, or truncated to maxlen bytes when truncate
+    is True. This bounds the amount of memory used per stream.
+    """
+
+    def __init__(self, maxlen=0, truncate=False):
+        """Initialize a LineSplitter object.
+
+        @param maxlen: Maximum line length in bytes (0 means no limit).
+        @param truncate: Truncate long lines instead of splitting them.
+        """
+        self.maxlen = maxlen
+        self.truncate = truncate
+        # partial line (no LF) and position from which to look for LF
+        self._buf = bytearray()
+        self._scanpos = 0
+        # set when dropping the end of a truncated line
+        self._discard = False
+
+    def __len__(self):
+        """Return the length of the buffered partial line."""
+        return len(self._buf)
+
+    def _cap(self, data, start, end):
+        """Get maxlen-byte lines from data[start:end] (too long line)."""
+        maxlen = self.maxlen
+        if self.truncate:
+            yield bytes(data[start:start + maxlen])
+            return
+        while end - start > maxlen:
+            yield bytes(data[start:start + maxlen])
+            start += maxlen
+        yield bytes(data[start:end])
+
+    def feed(self, data):
+        """
+        Add read data and iterate over complete lines as bytes. Any trailing
+        partial line is kept until next call.
+        """
+        # Note: empty internal buffer while yielding (like flush())
+        if self._buf:
+            source = self._buf
+            source += data
+            scanpos = self._scanpos
+            self._buf = bytearray()
+        else:
+            source = data
+            scanpos = 0
+        maxlen = self.maxlen
+
+        start = 0
+        while True:
+            eol = source.find(b'\n', scanpos)
+            if eol < 0:
+                break
+            scanpos = eol + 1
+            if self._discard:
+                # end of truncated line
+                self._discard = False
+                start = scanpos
+                continue
+            end = eol
+            if end > start and source[end - 1] in (13, b'\r'):
+                end -= 1 # trim CRLF
+            if maxlen and end - start > maxlen:
+                for line in self._cap(source, start, end):
+                    yield line
+            else:
+                yield bytes(source[start:end])
+            start = scanpos
+
+        # keep partial line in buffer
+        end = len(source)
+        # a trailing CR may be part of CRLF: not counted in line length
+        linend = end
+        if linend > start and source[linend - 1] in (13, b'\r'):
+            linend -= 1
+        if self._discard:
+            start = end
+        elif maxlen and linend - start > maxlen:
+            if self.truncate:
+                yield bytes(source[start:start + maxlen])
+                self._discard = True
+                start = end
+            else:
+                while linend - start > maxlen:
+                    yield bytes(source[start:start + maxlen])
+                    start += maxlen
+        if start < end:
+            if source is data:
+                self._buf = bytearray(data[start:])
+            else:
+                del source[:start]
+                self._buf = source
+        self._scanpos = len(self._buf)
+
+    def flush(self):
+        """Return the buffered partial line as bytes and reset buffer."""
+        line = bytes(self._buf)
+        self._buf = bytearray()
+        self._scanpos = 0
+        self._discard = False
+        return line
+
+
 class EngineClientStream(object):
     """EngineClient I/O stream object.
 
@@ -79,8 +206,11 @@ class EngineClientStream(object):
         """
         self.name = name
         self.fd = None
-        self.rbuf = bytes()
-        self.wbuf = bytes()
+        self.rbuf = LineSplitter(DEFAULTS.line_maxlen,
+                                 DEFAULTS.line_truncate)
+        # write queue of memoryview chunks and its total size in bytes
+        self.wbufs = deque()
+        self.wlen = 0
         self.eof = False
         self.evmask = evmask
         self.events = 0
@@ -111,13 +241,48 @@ class EngineClientStream(object):
     def __repr__(self):
         return "<%s at 0x%s (name=%s fd=%s rbuflen=%d wbuflen=%d eof=%d " \
             "evmask=0x%x)>" % (self.__class__.__name__, id(self), self.name,
-            self.fd, len(self.rbuf), len(self.wbuf), self.eof, self.evmask)
+            self.fd, len(self.rbuf), self.wlen, self.eof, self.evmask)
 
     def close(self):
         """Close stream."""
         if self.closefd and self.fd is not None:
             os.close(self.fd)
 
+    def queue_write(self, buf):
+        """Add data to the stream write queue."""
+        if not buf:
+            return
+        if not isinstance(buf, bytes):
+            # copy mutable buffers (eg. bytearray) that could be modified
+            # by the caller before being written
+            buf = bytes(buf)
+        self.wbufs.append(memoryview(buf))
+        self.wlen += len(buf)
+
+    def flush_write(self):
+        """
+        Write as much queued data as possible to the stream file descriptor
+        (non-blocking) and return the number of bytes written. Written data
+        is consumed from the write queue without copying the remaining data.
+        May raise OSError (eg. EAGAIN).
+        """
+        wbufs = self.wbufs
+        if _writev is not None and len(wbufs) > 1:
+            wcnt = _writev(self.fd, list(islice(wbufs, IOV_MAX)))
+        else:
+            wcnt = os.write(self.fd, wbufs[0])
+        self.wlen -= wcnt
+        left = wcnt
+        while left > 0:
+            chunk = wbufs[0]
+            if left < len(chunk):
+                # partially written chunk: zero-copy slice
+                wbufs[0] = chunk[left:]
+                break
+            left -= len(chunk)
+            wbufs.popleft()
+        return wcnt
+
     def readable(self):
         """Return whether the stream is setup as readable."""
         return self.evmask & E_READ
@@ -323,13 +488,13 @@ class EngineClient(EngineBaseTimer):
         event indicating that a write can be performed now.
         """
         wfile = self.streams[sname]
-        if not wfile.wbuf and wfile.eof:
+        if not wfile.wlen and wfile.eof:
             # remove stream from engine (not directly)
             if self._engine:
                 self._engine.remove_stream(self, wfile)
-        elif len(wfile.wbuf) > 0:
+        elif wfile.wlen > 0:
             try:
-                wcnt = os.write(wfile.fd, wfile.wbuf)
+                wcnt = wfile.flush_write()
             except OSError as exc:
                 if exc.errno == errno.EAGAIN:
                     # _handle_write() is not only called by the engine but also
@@ -342,10 +507,8 @@ class EngineClient(EngineBaseTimer):
                     return
                 raise
             if wcnt > 0:
-                # dequeue written buffer
-                wfile.wbuf = wfile.wbuf[wcnt:]
                 # check for possible ending
-                if wfile.eof and not wfile.wbuf:
+                if wfile.eof and not wfile.wlen:
                     self.worker._on_written(self.key, wcnt, sname)
                     # remove stream from engine (not directly)
                     if self._engine:
@@ -390,34 +553,32 @@ class EngineClient(EngineBaseTimer):
 
         # Current version implements line-buffered reads. If needed, we could
         # easily provide direct, non-buffered, data reads in the future.
-
-        rfile = self.streams[sname]
-
-        buf = rfile.rbuf + readbuf
-        lines = buf.splitlines(True)
-        rfile.rbuf = bytes()
-        for line in lines:
-            if line.endswith(b'\n'):
-                if line.endswith(b'\r\n'):
-                    yield line[:-2] # trim CRLF
-                else:
-                    # trim LF
-                    yield line[:-1] # trim LF
-            else:
-                # keep partial line in buffer
-                rfile.rbuf = line
-                # breaking here
+        return self.streams[sname].rbuf.feed(readbuf)
 
     def _write(self, sname, buf):
-        """Add some data to be written to the client."""
+        """
+        Add some data to be written to the client.
+
+        Return False when the amount of data waiting to be written to this
+        stream is above the write high-water mark (DEFAULTS.write_hwm), True
+        otherwise. Data is always queued: the return value is only a hint to
+        stop writing until the stream is drained (see ev_written).
+        """
         wfile = self.streams[sname]
+        # bufferize until pipe is ready
+        wfile.queue_write(buf)
         if self._engine and wfile.fd:
-            wfile.wbuf += buf
             # give it a try now (will set writing flag anyhow)
             self._handle_write(sname)
-        else:
-            # bufferize until pipe is ready
-            wfile.wbuf += buf
+        write_hwm = DEFAULTS.write_hwm
+        return write_hwm <= 0 or wfile.wlen < write_hwm
+
+    def _write_pending(self, sname):
+        """Return the number of bytes waiting to be written to stream."""
+        try:
+            return self.streams[sname].wlen
+        except KeyError:
+            return 0
 
     def _set_write_eof(self, sname):
         """Set EOF on specific writable stream."""
@@ -428,7 +589,7 @@ class EngineClient(EngineBaseTimer):
 
         wfile = self.streams[sname]
         wfile.eof = True
-        if self._engine and wfile.fd and not wfile.wbuf:
+        if self._engine and wfile.fd and not wfile.wlen:
             # sendq empty, remove stream now
             self._engine.remove_stream(self, wfile)
 
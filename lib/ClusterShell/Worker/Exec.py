@@ -171,7 +171,7 @@ class ExecClient(EngineClient):
         if stream.readable() and stream.rbuf:
             # We still have some read data available in buffer, but no
             # EOL. Generate a final message before closing.
-            self._on_nodeset_msgline(self.key, stream.rbuf, sname)
+            self._on_nodeset_msgline(self.key, stream.rbuf.flush(), sname)
 
     def _handle_read(self, sname):
         """
@@ -340,11 +340,26 @@ class ExecWorker(DistantWorker):
         return self._clients
 
     def write(self, buf, sname=None):
-        """Write to worker clients."""
+        """
+        Write to worker clients. Return False if the write queue of any
+        client is above the write high-water mark, True otherwise (see
+        StreamWorker.write()).
+        """
         sname = sname or self.SNAME_STDIN
+        below_hwm = True
         for client in self._clients:
             if sname in client.streams:
-                client._write(sname, buf)
+                below_hwm = client._write(sname, buf) and below_hwm
+        return below_hwm
+
+    def write_pending(self, sname=None):
+        """
+        Return the largest number of bytes waiting to be written to a
+        worker client.
+        """
+        sname = sname or self.SNAME_STDIN
+        return max([client._write_pending(sname) for client in self._clients]
+                   or [0])
 
     def set_write_eof(self, sname=None):
         """
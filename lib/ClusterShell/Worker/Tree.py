@@ -28,9 +28,8 @@ import logging
 import os
 from os.path import basename, dirname, isfile, normpath
 import sys
-import tarfile
-import tempfile
 
+from ClusterShell.Defaults import DEFAULTS
 from ClusterShell.Event import EventHandler
 from ClusterShell.NodeSet import NodeSet
 from ClusterShell.Worker.EngineClient import EnginePort
@@ -163,6 +162,7 @@ class TreeWorker(DistantWorker):
         self._target_count = 0
         self._has_timeout = False
         self._started = False
+        self._tar_file = None   # copy mode: tar data being sent
 
         if self.command is None and self.source is None:
             raise ValueError("missing command or source parameter in "
@@ -317,6 +317,9 @@ class TreeWorker(DistantWorker):
 
         # Copy mode: send tar data after above workers have been initialized
         if self.source and not self.reverse:
+            # tarfile and tempfile are only imported in copy mode
+            import tarfile
+            import tempfile
             try:
                 # create temporary tar file with all source files
                 tmptar = tempfile.TemporaryFile()
@@ -326,13 +329,26 @@ class TreeWorker(DistantWorker):
                 tmptar.flush()
                 # read generated tar file
                 tmptar.seek(0)
-                rbuf = tmptar.read(32768)
-                # send tar data to remote targets only
-                while len(rbuf) > 0:
-                    self._write_remote(rbuf)
-                    rbuf = tmptar.read(32768)
             except OSError as exc:
                 raise WorkerError(exc)
+            self._tar_file = tmptar
+            self._send_tar()
+
+    def _send_tar(self):
+        """
+        Send tar data to remote targets only, until the write high-water
+        mark is reached (sending is resumed on written events).
+        """
+        try:
+            while self._tar_file is not None:
+                rbuf = self._tar_file.read(32768)
+                if not rbuf:
+                    self._tar_file.close()
+                    self._tar_file = None
+                elif not self._write_remote(rbuf):
+                    break
+        except OSError as exc:
+            raise WorkerError(exc)
 
     def _distribute(self, fanout, dst_nodeset):
         """distribute target nodes between next hop gateways"""
@@ -420,6 +436,7 @@ class TreeWorker(DistantWorker):
         # rcopy only: we expect base64 encoded tar content on stdout
         encoded = self._rcopy_bufs.setdefault(node, b'') + msg
         if node not in self._rcopy_tars:
+            import tempfile  # only imported in copy mode
             self._rcopy_tars[node] = tempfile.TemporaryFile()
 
         # partial base64 decoding requires a multiple of 4 characters
@@ -450,6 +467,7 @@ class TreeWorker(DistantWorker):
                     tarfileobj.write(buf)
                 tarfileobj.flush()
                 tarfileobj.seek(0)
+                import tarfile  # only imported in copy mode
                 tmptar = tarfile.open(fileobj=tarfileobj)
                 try:
                     self.logger.debug("%s extracting %d members in dest %s",
@@ -526,12 +544,32 @@ class TreeWorker(DistantWorker):
                 self.task._pchannel_release(gateway, self)
                 del self.gwtargets[str(gateway)]
 
+    def _on_written(self, key, bytes_count, sname):
+        """Notification of bytes written."""
+        DistantWorker._on_written(self, key, bytes_count, sname)
+        if self._tar_file is not None:
+            self._send_tar()
+
     def _write_remote(self, buf):
-        """Write buf to remote clients only."""
+        """Write buf to remote clients only. Return False if the data not
+        acknowledged by any gateway is above the write high-water mark."""
         for gateway, targets in self.gwtargets.items():
             assert len(targets) > 0
             self.task._pchannel(gateway, self).write(nodes=targets, buf=buf,
                                                      worker=self)
+        write_hwm = DEFAULTS.write_hwm
+        return write_hwm <= 0 or self._write_pending_remote() < write_hwm
+
+    def _write_pending_remote(self):
+        """Return the largest number of bytes written to a gateway and not
+        acknowledged yet."""
+        pending = [0]
+        for gateway in self.gwtargets:
+            # do not use _pchannel() here, that would open a closed channel
+            if gateway in self.task.gateways:
+                chanworker = self.task.gateways[gateway][0]
+                pending.append(chanworker.eh.write_pending(self))
+        return max(pending)
 
     def _set_write_eof_remote(self):
         for gateway, targets in self.gwtargets.items():
@@ -540,23 +578,40 @@ class TreeWorker(DistantWorker):
                                                              worker=self)
 
     def write(self, buf):
-        """Write to worker clients."""
+        """
+        Write to worker clients. Return False if the write queue of any
+        direct client or the data not acknowledged by any gateway is above
+        the write high-water mark, True otherwise (see StreamWorker.write()).
+
+        Gateways only acknowledge written data once their own write queues
+        are below their write high-water mark.
+        """
         if not self._started:
             self._port.msg_send((TreeWorker.write, buf))
-            return
+            return True
 
         osexc = None
+        below_hwm = True
         # Differentiate directly handled writes from remote ones
         for worker in self.workers:
             try:
-                worker.write(buf)
+                below_hwm = worker.write(buf) and below_hwm
             except OSError as exc:
                 osexc = exc
 
-        self._write_remote(buf)
+        below_hwm = self._write_remote(buf) and below_hwm
 
         if osexc:
             raise osexc
+        return below_hwm
+
+    def write_pending(self):
+        """
+        Return the largest number of bytes waiting to be written to a direct
+        client or not acknowledged yet by a gateway.
+        """
+        return max([worker.write_pending() for worker in self.workers] +
+                   [self._write_pending_remote()])
 
     def set_write_eof(self):
         """
@@ -30,12 +30,30 @@ except ImportError:
     from inspect import getargspec as getfullargspec  # py2
 
 import warnings
+import weakref
 
 from ClusterShell.Worker.EngineClient import EngineClient
-from ClusterShell.NodeSet import NodeSet
+from ClusterShell.NodeSet import NodeSet, FrozenNodeSet
 from ClusterShell.Engine.Engine import FANOUT_UNLIMITED, FANOUT_DEFAULT
 
 
+# Number of arguments of event handler methods by function, as inspecting
+# their signature is too costly to be done at each event
+_EH_ARGC_CACHE = weakref.WeakKeyDictionary()
+
+def _eh_argc(method):
+    """Helper function to get the number of arguments of an event handler
+    method (including self)."""
+    func = getattr(method, '__func__', method)
+    try:
+        return _EH_ARGC_CACHE[func]
+    except KeyError:
+        argc = _EH_ARGC_CACHE[func] = len(getfullargspec(method)[0])
+    except TypeError:
+        # not weakly referenceable
+        argc = len(getfullargspec(method)[0])
+    return argc
+
 def _eh_sigspec_invoke_compat(method, argc_legacy, *args):
     """
     Helper function to invoke an event handler method, with legacy
@@ -43,7 +61,7 @@ def _eh_sigspec_invoke_compat(method, argc_legacy, *args):
     This should be removed when old signatures (< 1.8) aren't supported
     anymore (in 2.x).
     """
-    argc_actual = len(getfullargspec(method)[0])
+    argc_actual = _eh_argc(method)
     if argc_actual == argc_legacy:
         # Use legacy signature (1.x) deprecated as of 1.9
         warnings.warn("%s should use new %s() signature" % (method.__self__,
@@ -56,7 +74,7 @@ def _eh_sigspec_invoke_compat(method, argc_legacy, *args):
 
 def _eh_sigspec_ev_read_17(ev_read):
     """Helper function to check whether ev_read has the old 1.7 signature."""
-    if len(getfullargspec(ev_read)[0]) == 2:
+    if _eh_argc(ev_read) == 2:
         warnings.warn("%s should use new ev_read() signature" % \
                       ev_read.__self__, DeprecationWarning)
         return True
@@ -316,24 +334,24 @@ class DistantWorker(Worker):
     def iter_buffers(self, match_keys=None):
         """
         Returns an iterator over available buffers and associated
-        NodeSet. If the optional parameter match_keys is defined, only
+        FrozenNodeSet. If the optional parameter match_keys is defined, only
         keys found in match_keys are returned.
         """
         self._task_bound_check()
         for msg, keys in self.task._call_tree_matcher(
                 self.task._msgtree(self.SNAME_STDOUT).walk, match_keys, self):
-            yield msg, NodeSet.fromlist(keys)
+            yield msg, FrozenNodeSet._fromlist1(keys)
 
     def iter_errors(self, match_keys=None):
         """
         Returns an iterator over available error buffers and associated
-        NodeSet. If the optional parameter match_keys is defined, only
+        FrozenNodeSet. If the optional parameter match_keys is defined, only
         keys found in match_keys are returned.
         """
         self._task_bound_check()
         for msg, keys in self.task._call_tree_matcher(
                 self.task._msgtree(self.SNAME_STDERR).walk, match_keys, self):
-            yield msg, NodeSet.fromlist(keys)
+            yield msg, FrozenNodeSet._fromlist1(keys)
 
     def iter_node_buffers(self, match_keys=None):
         """
@@ -353,13 +371,13 @@ class DistantWorker(Worker):
 
     def iter_retcodes(self, match_keys=None):
         """
-        Returns an iterator over return codes and associated NodeSet.
+        Returns an iterator over return codes and associated FrozenNodeSet.
         If the optional parameter match_keys is defined, only keys
         found in match_keys are returned.
         """
         self._task_bound_check()
         for rc, keys in self.task._rc_iter_by_worker(self, match_keys):
-            yield rc, NodeSet.fromlist(keys)
+            yield rc, FrozenNodeSet._fromlist1(keys)
 
     def iter_node_retcodes(self):
         """
@@ -435,16 +453,26 @@ class StreamClient(EngineClient):
         if stream.readable() and stream.rbuf:
             # We still have some read data available in buffer, but no
             # EOL. Generate a final message before closing.
-            self.worker._on_msgline(self.key, stream.rbuf, sname)
+            self.worker._on_msgline(self.key, stream.rbuf.flush(), sname)
 
     def write(self, buf, sname=None):
-        """Write to writable stream(s)."""
+        """
+        Write to writable stream(s). Return False if any write queue is
+        above the write high-water mark, True otherwise.
+        """
         if sname is not None:
-            self._write(sname, buf)
-            return
+            return self._write(sname, buf)
         # sname not specified: "broadcast" to all writable streams...
+        below_hwm = True
         for writer in self.streams.writers():
-            self._write(writer.name, buf)
+            below_hwm = self._write(writer.name, buf) and below_hwm
+        return below_hwm
+
+    def write_pending(self, sname=None):
+        """Return the number of bytes waiting to be written to stream(s)."""
+        if sname is not None:
+            return self._write_pending(sname)
+        return sum(writer.wlen for writer in self.streams.writers())
 
     def set_write_eof(self, sname=None):
         """Set EOF flag to writable stream(s)."""
@@ -597,8 +625,21 @@ class StreamWorker(Worker):
 
         If sname is specified, write to the associated stream,
         otherwise write to all writable streams.
+
+        Data is always queued, but False is returned when the amount of
+        data waiting to be written is above the write high-water mark
+        (see Defaults write_hwm): the caller should then stop writing
+        until enough data has been written, which can be checked with
+        write_pending() on ev_written events. Return True otherwise.
+        """
+        return self.clients[0].write(buf, sname)
+
+    def write_pending(self, sname=None):
+        """
+        Return the number of bytes waiting to be written to the associated
+        stream if sname is specified, otherwise to all writable streams.
         """
-        self.clients[0].write(buf, sname)
+        return self.clients[0].write_pending(sname)
 
     def set_write_eof(self, sname=None):
         """
@@ -63,9 +63,9 @@ setup(name='ClusterShell',
                     ],
       entry_points={'console_scripts':
                     ['clubak=ClusterShell.CLI.Clubak:main',
-                     'cluset=ClusterShell.CLI.Nodeset:main',
+                     'cluset=ClusterShell.CLI.NodesetServer:main',
                      'clush=ClusterShell.CLI.Clush:main',
-                     'nodeset=ClusterShell.CLI.Nodeset:main'],
+                     'nodeset=ClusterShell.CLI.NodesetServer:main'],
                    },
       author='Stephane Thiell',
       author_email='sthiell@stanford.edu',
@@ -5,11 +5,18 @@
 
 import os
 import random
+import socket
+import subprocess
+import sys
 from textwrap import dedent
+import time
 import unittest
 
 from .TLib import *
+import ClusterShell
 from ClusterShell.CLI.Nodeset import main
+from ClusterShell.CLI.NodesetServer import CLIENT_TIMEOUT, SOCKET_ENV, client
+from ClusterShell.CLI.NodesetServer import main as server_main
 
 from ClusterShell.NodeUtils import GroupResolverConfig
 from ClusterShell.NodeSet import set_std_group_resolver, \
@@ -903,3 +910,114 @@ class CLINodesetGroupsConfOption(CLINodesetTestBase):
         self._nodeset_t(["-f", "@foo"], None, b"example[1-100]\n")
         self._nodeset_t(["--groupsconf", self.custf.name, "--list-all"], None, b"@artemis\n@selene\n")
         self._nodeset_t(["--groupsconf", self.custf.name, "-f", "@artemis"], None, b"custom[7-42]\n")
+
+
+class CLINodesetServerTest(CLINodesetTestBase):
+    """Unit test class for testing nodeset --server and its client"""
+
+    def setUp(self):
+        self.gconff = make_temp_file(dedent("""
+            [Main]
+            default: local
+
+            [local]
+            map: echo example[1-100]
+            list: echo foo
+            """).encode())
+        self.sockdir = make_temp_dir()
+        self.sockpath = os.path.join(self.sockdir.name, 'nodeset.sock')
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(os.path.dirname(
+                                ClusterShell.__file__))
+        self.server = subprocess.Popen([sys.executable, '-m',
+                                        'ClusterShell.CLI.Nodeset',
+                                        '--groupsconf', self.gconff.name,
+                                        '--server', self.sockpath], env=env)
+        for _ in range(100):
+            if os.path.exists(self.sockpath):
+                break
+            time.sleep(0.05)
+        os.environ[SOCKET_ENV] = self.sockpath
+
+    def tearDown(self):
+        del os.environ[SOCKET_ENV]
+        self.server.terminate()
+        self.server.wait()
+        self.sockdir.cleanup()
+        self.gconff = None
+
+    def _nodeset_client_t(self, args, stdin, expected_stdout, expected_rc=0,
+                          expected_stderr=None):
+        CLI_main(self, server_main, ['nodeset'] + args, stdin,
+                 expected_stdout, expected_rc, expected_stderr)
+
+    def test_client(self):
+        """test nodeset client"""
+        self.assertTrue(os.path.exists(self.sockpath))
+        # group configuration of the server is used
+        self._nodeset_client_t(["-f", "@foo", "bar"], None,
+                               b"bar,example[1-100]\n")
+        self._nodeset_client_t(["-c", "foo[1-10]", "-x", "foo5"], None,
+                               b"9\n")
+        self._nodeset_client_t(["-e", "-"], "foo[1-3]\n", b"foo1 foo2 foo3\n")
+        self._nodeset_client_t(["-f", "foo[1-"], None, b"", 1,
+                               b'nodeset: Parse error: missing bracket: '
+                               b'"foo[1-"\n')
+        self._nodeset_client_t([], None, b"", 2, None)
+        # server keeps running after errors
+        self._nodeset_client_t(["-f", "foo1", "foo2"], None, b"foo[1-2]\n")
+
+    def test_client_stuck(self):
+        """test nodeset server with stuck client"""
+        # client connected but not sending any request
+        stuck = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stuck.connect(self.sockpath)
+        try:
+            start = time.time()
+            self._nodeset_client_t(["-e", "-"], "foo[1-3]\n",
+                                   b"foo1 foo2 foo3\n")
+            self.assertTrue(time.time() - start < CLIENT_TIMEOUT + 5)
+        finally:
+            stuck.close()
+
+    def test_client_cwd(self):
+        """test nodeset server runs commands in client working directory"""
+        cwd = os.getcwd()
+        tdir = make_temp_dir()
+        try:
+            with open(os.path.join(tdir.name, 'groups.conf'), 'w') as gconf:
+                gconf.write(dedent("""
+                    [Main]
+                    default: custom
+
+                    [custom]
+                    map: echo custom[7-42]
+                    list: echo artemis
+                    """))
+            os.chdir(tdir.name)
+            self._nodeset_client_t(["--groupsconf", "./groups.conf", "-f",
+                                    "@artemis"], None, b"custom[7-42]\n")
+        finally:
+            os.chdir(cwd)
+            tdir.cleanup()
+
+    def test_client_other_config_env(self):
+        """test nodeset client with other group configuration environment"""
+        saved_cfgdir = os.environ.get('CLUSTERSHELL_CFGDIR')
+        os.environ['CLUSTERSHELL_CFGDIR'] = self.sockdir.name
+        try:
+            # server does not run the command: run in-process
+            self.assertEqual(client(self.sockpath, ['-c', 'foo']), None)
+        finally:
+            if saved_cfgdir is None:
+                del os.environ['CLUSTERSHELL_CFGDIR']
+            else:
+                os.environ['CLUSTERSHELL_CFGDIR'] = saved_cfgdir
+        # server still runs commands of other clients
+        self._nodeset_client_t(["-f", "@foo"], None, b"example[1-100]\n")
+
+    def test_client_fallback(self):
+        """test nodeset client fallback without server"""
+        os.environ[SOCKET_ENV] = self.sockpath + '.missing'
+        self.assertEqual(client(os.environ[SOCKET_ENV], ['-c', 'foo']), None)
+        self._nodeset_client_t(["-f", "foo1", "foo2"], None, b"foo[1-2]\n")
@@ -0,0 +1,89 @@
+# ClusterShell CLI startup test suite
+
+"""Unit test for CLI entry points import time and deferred imports"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+import ClusterShell
+
+
+# Modules that should not be imported by each CLI module, as they are only
+# needed by optional subsystems (tree mode, copy, diff, upcalls, YAML...)
+DEFERRED_MODULES = ['difflib', 'readline', 'subprocess', 'tarfile',
+                    'tempfile', 'xml.sax.saxutils', 'yaml',
+                    'ClusterShell.Propagation', 'ClusterShell.Worker.Tree']
+
+NODESET_DEFERRED_MODULES = DEFERRED_MODULES + ['ClusterShell.Task',
+                                               'ClusterShell.Engine.Engine',
+                                               'ClusterShell.Worker.Worker']
+
+# nodeset client (entry point) should only import a few standard modules
+NODESET_CLIENT_DEFERRED_MODULES = NODESET_DEFERRED_MODULES + [
+    'ClusterShell.CLI.Nodeset', 'ClusterShell.NodeSet',
+    'ClusterShell.NodeUtils', 'ClusterShell.RangeSet']
+
+# Maximum cumulative import time of CLI modules (seconds), as reported by
+# python -X importtime; this is a coarse limit to avoid false positives on
+# slow machines, deferred modules checks above are stricter.
+IMPORT_TIME_BUDGET = {'ClusterShell.CLI.Clubak': 0.5,
+                      'ClusterShell.CLI.Clush': 0.8,
+                      'ClusterShell.CLI.Nodeset': 0.5}
+
+
+def _run_python(args):
+    """Run python interpreter with args, return stdout and stderr."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(ClusterShell.__file__))
+    proc = subprocess.Popen([sys.executable] + args, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    return proc.communicate()
+
+
+class CLIStartupTest(unittest.TestCase):
+    """CLI entry points startup test case"""
+
+    def _check_deferred(self, module, deferred_modules):
+        """check that module does not import deferred_modules"""
+        out, err = _run_python(['-c', 'import sys, %s; print(" ".join('
+                                'sorted(sys.modules)))' % module])
+        self.assertEqual(err, "")
+        imported = set(out.split()).intersection(deferred_modules)
+        self.assertEqual(imported, set(), "%s imports %s" % (module,
+                                                             sorted(imported)))
+
+    def test_nodeset_deferred_imports(self):
+        """test nodeset deferred imports"""
+        self._check_deferred('ClusterShell.CLI.Nodeset',
+                             NODESET_DEFERRED_MODULES)
+
+    def test_nodeset_client_deferred_imports(self):
+        """test nodeset client deferred imports"""
+        self._check_deferred('ClusterShell.CLI.NodesetServer',
+                             NODESET_CLIENT_DEFERRED_MODULES)
+
+    def test_clubak_deferred_imports(self):
+        """test clubak deferred imports"""
+        self._check_deferred('ClusterShell.CLI.Clubak', DEFERRED_MODULES)
+
+    def test_clush_deferred_imports(self):
+        """test clush deferred imports"""
+        self._check_deferred('ClusterShell.CLI.Clush', DEFERRED_MODULES)
+
+    @unittest.skipIf(sys.version_info < (3, 7), "-X importtime unavailable")
+    def test_import_time_budget(self):
+        """test CLI modules import time budget"""
+        for module, budget in IMPORT_TIME_BUDGET.items():
+            _, err = _run_python(['-X', 'importtime', '-c',
+                                  'import %s' % module])
+            cumulative = None
+            for line in err.splitlines():
+                fields = line.split('|')
+                if len(fields) == 3 and fields[2].strip() == module:
+                    cumulative = int(fields[1]) / 1e6
+            self.assertTrue(cumulative is not None)
+            self.assertTrue(cumulative < budget, "%s import time %.3fs "
+                            "exceeds %.3fs" % (module, cumulative, budget))
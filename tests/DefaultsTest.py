@@ -35,6 +35,9 @@ class Defaults000NoConfigTest(unittest.TestCase):
         self.assertTrue(self.defaults.stderr_msgtree)
         self.assertEqual(self.defaults.engine, 'auto')
         self.assertEqual(self.defaults.port_qlimit, 100)
+        self.assertEqual(self.defaults.write_hwm, 1048576)
+        self.assertEqual(self.defaults.line_maxlen, 0)
+        self.assertFalse(self.defaults.line_truncate)
         self.assertTrue(self.defaults.auto_tree)
         self.assertEqual(self.defaults.local_workername, 'exec')
         self.assertEqual(self.defaults.distant_workername, 'ssh')
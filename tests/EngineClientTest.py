@@ -0,0 +1,144 @@
+"""
+Unit test for EngineClient line splitter
+"""
+
+import os
+import unittest
+
+from ClusterShell.Defaults import DEFAULTS
+from ClusterShell.Event import EventHandler
+from ClusterShell.Task import task_self
+from ClusterShell.Worker.EngineClient import LineSplitter
+from ClusterShell.Worker.Worker import StreamWorker
+
+
+class LineSplitterTest(unittest.TestCase):
+
+    def feed(self, splitter, *chunks):
+        """helper method to feed chunks and return lines"""
+        lines = []
+        for chunk in chunks:
+            lines.extend(splitter.feed(chunk))
+        return lines
+
+    def test_001_lines(self):
+        """test LineSplitter simple lines"""
+        splitter = LineSplitter()
+        self.assertEqual(self.feed(splitter, b"foo\nbar\r\n\nbaz\r"),
+                         [b"foo", b"bar", b""])
+        self.assertEqual(len(splitter), 4)
+        self.assertEqual(self.feed(splitter, b"\nqux\rquux\n"),
+                         [b"baz", b"qux\rquux"])
+        self.assertEqual(len(splitter), 0)
+        self.assertEqual(splitter.flush(), b"")
+
+    def test_002_partial_lines(self):
+        """test LineSplitter long line in many chunks"""
+        splitter = LineSplitter()
+        chunks = [b"x" * 1000] * 100 + [b"y\nz"]
+        self.assertEqual(self.feed(splitter, *chunks),
+                         [b"x" * 100000 + b"y"])
+        self.assertEqual(splitter.flush(), b"z")
+        self.assertEqual(len(splitter), 0)
+        # bytearray input
+        self.assertEqual(self.feed(splitter, bytearray(b"a\nb"), b"c\n"),
+                         [b"a", b"bc"])
+        self.assertTrue(all(type(line) is bytes
+                            for line in self.feed(splitter, b"d", b"e\n")))
+
+    def test_003_maxlen_split(self):
+        """test LineSplitter maxlen (split)"""
+        splitter = LineSplitter(maxlen=4)
+        self.assertEqual(self.feed(splitter, b"abcdefghij\n12\r\n"),
+                         [b"abcd", b"efgh", b"ij", b"12"])
+        self.assertEqual(self.feed(splitter, b"abc", b"def", b"ghi"),
+                         [b"abcd", b"efgh"])
+        self.assertEqual(len(splitter), 1)
+        self.assertEqual(self.feed(splitter, b"jkl\n"), [b"ijkl"])
+        self.assertEqual(self.feed(splitter, b"x" * 10), [b"xxxx"] * 2)
+        self.assertEqual(splitter.flush(), b"xx")
+
+    def test_004_maxlen_crlf(self):
+        """test LineSplitter maxlen with CRLF across reads"""
+        for truncate in (False, True):
+            for chunks in ([b"abc\r\n"], [b"abc\r", b"\n"],
+                           [b"ab", b"c\r", b"\n"]):
+                splitter = LineSplitter(maxlen=3, truncate=truncate)
+                self.assertEqual(self.feed(splitter, *chunks), [b"abc"])
+                self.assertEqual(splitter.flush(), b"")
+        splitter = LineSplitter(maxlen=3)
+        self.assertEqual(self.feed(splitter, b"abcd\r", b"\n"),
+                         [b"abc", b"d"])
+        splitter = LineSplitter(maxlen=3, truncate=True)
+        self.assertEqual(self.feed(splitter, b"abcd\r", b"\nef\n"),
+                         [b"abc", b"ef"])
+
+    def test_005_maxlen_truncate(self):
+        """test LineSplitter maxlen (truncate)"""
+        splitter = LineSplitter(maxlen=4, truncate=True)
+        self.assertEqual(self.feed(splitter, b"abcdefghij\n12\n"),
+                         [b"abcd", b"12"])
+        self.assertEqual(self.feed(splitter, b"abc", b"def", b"ghi"),
+                         [b"abcd"])
+        self.assertEqual(len(splitter), 0)
+        self.assertEqual(self.feed(splitter, b"jkl\nmn"), [])
+        self.assertEqual(self.feed(splitter, b"op\nqrstuvw"),
+                         [b"mnop", b"qrst"])
+        self.assertEqual(splitter.flush(), b"")
+        self.assertEqual(self.feed(splitter, b"foo\n"), [b"foo"])
+
+
+class StreamWorkerLineTest(unittest.TestCase):
+
+    class TestH(EventHandler):
+        def __init__(self):
+            self.lines = []
+
+        def ev_read(self, worker, node, sname, msg):
+            self.lines.append(msg)
+
+    def run_reader(self, data):
+        """helper method to read data with a StreamWorker"""
+        hdlr = self.TestH()
+        worker = StreamWorker(handler=hdlr)
+        rfd, wfd = os.pipe()
+        worker.set_reader("pipe", rfd)
+        task = task_self()
+        task.schedule(worker)
+        task.timer(0, handler=self.WriteH(wfd, data))
+        task.resume()
+        return hdlr.lines
+
+    class WriteH(EventHandler):
+        def __init__(self, wfd, data):
+            self.wfd = wfd
+            self.data = data
+
+        def ev_timer(self, timer):
+            # write data in several reads
+            for idx in range(0, len(self.data), 4096):
+                os.write(self.wfd, self.data[idx:idx + 4096])
+            os.close(self.wfd)
+
+    def test_001_long_line(self):
+        """test StreamWorker long line"""
+        data = b"x" * 50000 + b"\nfoo\nbar"
+        self.assertEqual(self.run_reader(data),
+                         [b"x" * 50000, b"foo", b"bar"])
+
+    def test_002_line_maxlen(self):
+        """test StreamWorker line_maxlen"""
+        data = b"x" * 50000 + b"\nfoo\nbar"
+        maxlen_save = DEFAULTS.line_maxlen
+        truncate_save = DEFAULTS.line_truncate
+        DEFAULTS.line_maxlen = 20000
+        try:
+            self.assertEqual(self.run_reader(data),
+                             [b"x" * 20000, b"x" * 20000, b"x" * 10000,
+                              b"foo", b"bar"])
+            DEFAULTS.line_truncate = True
+            self.assertEqual(self.run_reader(data),
+                             [b"x" * 20000, b"foo", b"bar"])
+        finally:
+            DEFAULTS.line_maxlen = maxlen_save
+            DEFAULTS.line_truncate = truncate_save
@@ -0,0 +1,98 @@
+"""
+Unit test for EngineEPoll event dispatch
+"""
+
+import os
+import select
+import unittest
+
+from ClusterShell.Defaults import DEFAULTS
+from ClusterShell.Engine.EPoll import EngineEPoll
+from ClusterShell.Event import EventHandler
+from ClusterShell.Task import task_self, task_terminate
+from ClusterShell.Worker.Worker import StreamWorker
+
+
+class CountingEPoll(object):
+    """select.epoll proxy counting calls by method name"""
+
+    def __init__(self, epolling):
+        self.epolling = epolling
+        self.counts = dict.fromkeys(['poll', 'register', 'modify',
+                                     'unregister'], 0)
+
+    def __getattr__(self, name):
+        method = getattr(self.epolling, name)
+        def counted(*args):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return method(*args)
+        return counted
+
+
+class PipeWriter(EventHandler):
+    """Write a line to all pipes at each timer tick"""
+
+    def __init__(self, wfds, ticks):
+        EventHandler.__init__(self)
+        self.wfds = wfds
+        self.ticks = ticks
+
+    def ev_timer(self, timer):
+        self.ticks -= 1
+        for wfd in self.wfds:
+            os.write(wfd, b"line\n")
+            if not self.ticks:
+                os.close(wfd)
+        if not self.ticks:
+            timer.invalidate()
+
+
+class LineCounter(EventHandler):
+    """Count read lines"""
+
+    def __init__(self):
+        EventHandler.__init__(self)
+        self.lines = 0
+
+    def ev_read(self, worker, node, sname, msg):
+        self.lines += 1
+
+
+@unittest.skipIf(not hasattr(select, 'epoll'), "epoll not available")
+class EngineEPollTest(unittest.TestCase):
+
+    def setUp(self):
+        task_terminate()
+        self.engine_id_save = DEFAULTS.engine
+        DEFAULTS.engine = EngineEPoll.identifier
+        self.task = task_self()
+        self.assertEqual(self.task.info('engine'), EngineEPoll.identifier)
+
+    def tearDown(self):
+        DEFAULTS.engine = self.engine_id_save
+        task_terminate()
+
+    def test_syscalls_per_event(self):
+        """test epoll calls per read event"""
+        npipes, ticks = 50, 20
+        counting = CountingEPoll(self.task._engine.epolling)
+        self.task._engine.epolling = counting
+        counter = LineCounter()
+        wfds = []
+        for idx in range(npipes):
+            rfd, wfd = os.pipe()
+            worker = StreamWorker(handler=counter, key=idx)
+            worker.set_reader('out', rfd)
+            self.task.schedule(worker)
+            wfds.append(wfd)
+        self.task.timer(0.01, handler=PipeWriter(wfds, ticks), interval=0.01)
+        self.task.resume()
+        self.assertEqual(counter.lines, npipes * ticks)
+        # reading again does not modify the epoll interest list: fds are only
+        # registered once and unregistered on close (+2 for task dispatch
+        # port pipe)
+        self.assertEqual(counting.counts['modify'], 0)
+        self.assertTrue(counting.counts['register'] <= npipes + 2)
+        self.assertTrue(counting.counts['unregister'] <= npipes + 2)
+        # events of all ready fds are processed after a single wait
+        self.assertTrue(counting.counts['poll'] < 3 * ticks)
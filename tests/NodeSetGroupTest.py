@@ -2,9 +2,11 @@
 Unit test for NodeSet with Group support
 """
 
+import json
 import os
 import posixpath
 import sys
+import time
 from textwrap import dedent
 import unittest
 
@@ -184,6 +186,84 @@ class NodeSetGroupTest(unittest.TestCase):
                           resolver=res)
         self.assertEqual(str(nodeset), "montana[3,40-41,77]")
 
+    def testGroupResolverSourceChange(self):
+        """test NodeSet parsing after group source content change"""
+        source = GroupSource("simple", {"rack": "node[1-4]"})
+        res = GroupResolver(source)
+        self.assertEqual(str(NodeSet("@rack,node9", resolver=res)),
+                         "node[1-4,9]")
+        source.groups["rack"] = "node[5-8]"
+        self.assertEqual(str(NodeSet("@rack,node9", resolver=res)),
+                         "node[5-9]")
+
+    def testLazyNodeSet(self):
+        """test LazyNodeSet deferred group resolution"""
+        source = GroupSource("simple", {"rack": "node[1-4]",
+                                        "down": "node[2-3]"})
+        res = GroupResolver(source)
+        nodeset = LazyNodeSet("node[8-9],@rack!@down", resolver=res)
+        source.groups["rack"] = "node[1-6]"
+        self.assertFalse(nodeset.is_evaluated())
+        cpy = nodeset.copy()
+        self.assertFalse(cpy.is_evaluated())
+        # only needed terms are evaluated
+        self.assertTrue("node9" in nodeset)
+        self.assertFalse("node3" in nodeset)
+        self.assertTrue(NodeSet("node5") in nodeset)
+        self.assertFalse("node7" in nodeset)
+        self.assertFalse(nodeset.is_evaluated())
+        source.groups["down"] = "node[1-2]"
+        self.assertFalse("node3" in nodeset)  # @down was already resolved
+        self.assertEqual(len(nodeset), 6)
+        self.assertTrue(nodeset.is_evaluated())
+        self.assertEqual(str(nodeset), "node[1,4-6,8-9]")
+        self.assertEqual(nodeset, NodeSet("node[1,4-6,8-9]"))
+        self.assertTrue(NodeSet("node[4-5]") in nodeset)
+        # evaluation of a copy is independent
+        source.groups["rack"] = "node[1-4]"
+        self.assertEqual(str(cpy), "node[3-4,8-9]")
+        nodeset.add("node10")
+        self.assertEqual(str(nodeset), "node[1,4-6,8-10]")
+        self.assertEqual(str(LazyNodeSet("a[1-3]^a[3-4]&a[1-4]")), "a[1-2,4]")
+        self.assertRaises(NodeSetParseError, LazyNodeSet, "a[1-3")
+        # only membership tests are lazy
+        nodeset = LazyNodeSet("@rack", resolver=res)
+        self.assertEqual([str(ns) for ns in nodeset.split(2)],
+                         ["node[1-2]", "node[3-4]"])
+        self.assertTrue(nodeset.is_evaluated())
+        nodeset = LazyNodeSet("@rack", resolver=res)
+        self.assertEqual(list(nodeset), ["node1", "node2", "node3", "node4"])
+        self.assertTrue(nodeset.is_evaluated())
+
+    def testGroupIndex(self):
+        """test cached reverse group index used by regroup()"""
+        test_groups1 = makeTestG1()
+        source = UpcallGroupSource("simple",
+                                   r"sed -n 's/^$GROUP:\(.*\)/\1/p' %s" % test_groups1.name,
+                                   None,
+                                   r"sed -n 's/^\([0-9A-Za-z_-]*\):.*/\1/p' %s" % test_groups1.name,
+                                   None)
+        res = GroupResolver(source)
+        self.assertEqual(res.group_index(), None)
+        nodeset = NodeSet("montana[4-6,32-35]", resolver=res)
+        self.assertEqual(nodeset.regroup(), "@chassis[1-2],@io")
+        index = res.group_index()
+        self.assertNotEqual(index, None)
+        # cached index is used even if upcalls are no longer available
+        source.upcalls['map'] = "false"
+        source.upcalls['list'] = "false"
+        self.assertEqual(nodeset.regroup(), "@chassis[1-2],@io")
+        groups = NodeSet("montana[5,33]", resolver=res).groups()
+        self.assertEqual(groups["@chassis1"],
+                         (NodeSet("montana[32-33]"), NodeSet("montana33")))
+        self.assertEqual(groups["@oss"],
+                         (NodeSet("montana[4-5]"), NodeSet("montana5")))
+        self.assertTrue(res.group_index() is index)
+        # index is dropped with other cached upcall results
+        source.clear_cache()
+        self.assertEqual(res.group_index(), None)
+        self.assertEqual(nodeset.regroup(), "montana[4-6,32-35]")
+
     def testAllNoResolver(self):
         """test NodeSet.fromall() with no resolver"""
         self.assertRaises(NodeSetExternalError, NodeSet.fromall,
@@ -756,6 +836,245 @@ class NodeSetGroupTest(unittest.TestCase):
             f.close()
             tdir.cleanup()
 
+    def testConfigMapBatch(self):
+        """test groups with map_batch upcall"""
+        fgroups = make_temp_file(dedent("""
+            foo: example[1-10]
+            bar: example[11-15]
+            bar: example[16-20]
+            baz: @foo,example21
+            """).encode('ascii'))
+        f = make_temp_file(dedent("""
+            [Main]
+            default: local
+
+            [local]
+            map: false
+            map_batch: cat %s
+            list: echo foo bar baz qux
+            """ % fgroups.name).encode('ascii'))
+        try:
+            res = GroupResolverConfig(f.name)
+            self.assertEqual(res.group_nodes_batch(["bar", "qux"]),
+                             {"bar": ["example[11-15]", "example[16-20]"],
+                              "qux": []})
+            # map is not called for groups resolved by map_batch
+            self.assertEqual(res.group_nodes("bar"),
+                             ["example[11-15]", "example[16-20]"])
+            # bulk paths use map_batch
+            nodeset = NodeSet("example[1-21]", resolver=res)
+            self.assertEqual(nodeset.regroup(), "@bar,@baz")
+            self.assertEqual(str(NodeSet.fromall(resolver=res)),
+                             "example[1-21]")
+            # map is still used for other groups
+            res._source(None).clear_cache()
+            self.assertRaises(NodeSetParseError, NodeSet, "@foo", resolver=res)
+        finally:
+            f.close()
+            fgroups.close()
+
+    def testConfigPluginSource(self):
+        """test groups with plugin group source module"""
+        tdir = make_temp_dir()
+        with open(os.path.join(tdir.name, 'cs_test_gsplugin.py'), 'w') as f:
+            f.write(dedent("""
+                from ClusterShell.NodeSet import NodeSet
+                from ClusterShell.NodeUtils import PluginGroupSource
+                from ClusterShell.NodeUtils import GroupSourceQueryFailed
+
+                class RackSource(PluginGroupSource):
+                    def resolv_map(self, group):
+                        if not group.startswith('rack'):
+                            raise GroupSourceQueryFailed(group, self)
+                        return NodeSet('%s-n[1-%s]' % (group,
+                                                       self.options['size']))
+                    def resolv_list(self):
+                        return ['rack1', 'rack2']
+                    def resolv_reverse(self, node):
+                        return node.split('-')[0]
+
+                class ListSource(PluginGroupSource):
+                    def resolv_map(self, group):
+                        return ['node1', 'node2']
+
+                GROUP_SOURCE_CLASS = ListSource
+                """))
+        f = make_temp_file(dedent("""
+            [Main]
+            default: racks
+
+            [racks]
+            module: cs_test_gsplugin:RackSource
+            size: 4
+
+            [lists]
+            module: cs_test_gsplugin
+            """).encode('ascii'))
+        sys.path.insert(0, tdir.name)
+        try:
+            res = GroupResolverConfig(f.name)
+            source = res._source('racks')
+            self.assertTrue(isinstance(source, PluginGroupSource))
+            self.assertEqual(source.options, {'size': '4'})
+            self.assertTrue(source.has_reverse)
+            self.assertFalse(res._source('lists').has_reverse)
+            self.assertEqual(res.group_nodes("rack1"), ["rack1-n[1-4]"])
+            self.assertEqual(str(NodeSet("@rack2,@lists:foo", resolver=res)),
+                             "node[1-2],rack2-n[1-4]")
+            self.assertEqual(str(NodeSet("@*", resolver=res)),
+                             "rack[1-2]-n[1-4]")
+            self.assertEqual(NodeSet("rack1-n[1-4]", resolver=res).regroup(),
+                             "@rack1")
+            groups = NodeSet("rack1-n1", resolver=res).groups()
+            self.assertEqual(list(groups), ["@rack1"])
+            self.assertEqual(str(groups["@rack1"][0]), "rack1-n[1-4]")
+            self.assertRaises(NodeSetParseError, NodeSet, "@foo", resolver=res)
+        finally:
+            sys.path.remove(tdir.name)
+            sys.modules.pop('cs_test_gsplugin', None)
+            f.close()
+            tdir.cleanup()
+
+    def testConfigPluginSourceError(self):
+        """test groups with missing plugin group source module"""
+        f = make_temp_file(dedent("""
+            [local]
+            module: cs_test_gsplugin_missing:Source
+            """).encode('ascii'))
+        try:
+            res = GroupResolverConfig(f.name)
+            self.assertRaises(GroupResolverConfigError, res.grouplist)
+        finally:
+            f.close()
+
+    def testConfigMapParallel(self):
+        """test groups with parallel map upcalls"""
+        f = make_temp_file(dedent("""
+            [Main]
+            default: local
+
+            [local]
+            map: sleep 1; [ $GROUP != bad ] && echo $GROUP-node[1-2]
+            list: echo foo bar baz qux quux corge
+            """).encode('ascii'))
+        try:
+            res = GroupResolverConfig(f.name)
+            start = time.time()
+            nodeset = NodeSet("@foo,@bar,@baz,@qux,@quux,@corge", resolver=res)
+            self.assertTrue(time.time() - start < 4)
+            self.assertEqual(len(nodeset), 12)
+            start = time.time()
+            self.assertEqual(nodeset.regroup(), "@bar,@baz,@corge,@foo,@quux,@qux")
+            self.assertTrue(time.time() - start < 1)  # cached results
+            # failed upcalls are reported, other results are cached
+            self.assertRaises(GroupSourceQueryFailed, res.group_nodes_batch,
+                              ["grault", "bad"])
+            self.assertEqual(res._source(None)._cache['map']['grault'][0],
+                             "grault-node[1-2]")
+            self.assertRaises(NodeSetParseError, NodeSet, "@bad,@grault",
+                              resolver=res)
+        finally:
+            f.close()
+
+    def testConfigCacheDir(self):
+        """test groups with persistent cache directory"""
+        tdir = make_temp_dir()
+        fmap = make_temp_file(b"example[1-10]")
+        cfgtpl = dedent("""
+            [Main]
+            default: local
+            cachedir: %s
+
+            [local]
+            map: cat %s
+            list: echo foo
+            # cache file also depends on the cache_time value
+            cache_time: %d
+            """)
+        f = make_temp_file((cfgtpl % (tdir.name, fmap.name, 60)).encode('ascii'))
+        try:
+            res = GroupResolverConfig(f.name)
+            nodeset = NodeSet("@foo", resolver=res)
+            self.assertEqual(str(nodeset), "example[1-10]")
+            self.assertEqual(res.cachedir, tdir.name)
+            source = res._source(None)
+            source.flush_cache()
+            self.assertTrue(os.path.isfile(source.cache_path()))
+            # change upcall result: cached result is still used
+            with open(fmap.name, "w") as fmapw:
+                fmapw.write("example[1-20]")
+            res = GroupResolverConfig(f.name)
+            self.assertEqual(str(NodeSet("@foo", resolver=res)),
+                             "example[1-10]")
+            self.assertEqual(NodeSet("example[1-10]", resolver=res).regroup(),
+                             "@foo")
+            res._source(None).flush_cache()
+            # changing the source config invalidates the cache file
+            f2 = make_temp_file((cfgtpl % (tdir.name, fmap.name, 30))
+                                .encode('ascii'))
+            res = GroupResolverConfig(f2.name)
+            self.assertEqual(str(NodeSet("@foo", resolver=res)),
+                             "example[1-20]")
+            res._source(None).clear_cache()
+            f2.close()
+            # clear_cache() also removes the cache file
+            source.clear_cache()
+            self.assertFalse(os.path.exists(source.cache_path()))
+            res = GroupResolverConfig(f.name)
+            self.assertEqual(str(NodeSet("@foo", resolver=res)),
+                             "example[1-20]")
+            res._source(None).clear_cache()
+        finally:
+            f.close()
+            fmap.close()
+            tdir.cleanup()
+
+    def testConfigCacheDirInvalid(self):
+        """test groups with malformed or untrusted persistent cache file"""
+        tdir = make_temp_dir()
+        f = make_temp_file(dedent("""
+            [Main]
+            default: local
+            cachedir: %s
+
+            [local]
+            map: echo example[1-10]
+            list: echo foo
+            """ % tdir.name).encode('ascii'))
+        try:
+            res = GroupResolverConfig(f.name)
+            source = res._source(None)
+            future = time.time() + 3600
+            for content in ([1, 2], {'map': []}, {'map': {'foo': ['a']}},
+                            {'map': {'foo': 'a'}}, {'list': 42},
+                            {'map': {'foo': [42, future]}},
+                            {'all': ['a', None]}):
+                with open(source.cache_path(), 'w') as cachefile:
+                    json.dump(content, cachefile)
+                self.assertEqual(source._read_cache_file(time.time()),
+                                 {'map': {}, 'reverse': {}})
+            # valid content is ignored when the file is not private
+            with open(source.cache_path(), 'w') as cachefile:
+                json.dump({'map': {'foo': ['bar', future]}}, cachefile)
+            self.assertEqual(source._read_cache_file(time.time())['map'],
+                             {'foo': ('bar', future)})
+            os.chmod(source.cache_path(), 0o666)
+            self.assertEqual(source._read_cache_file(time.time()),
+                             {'map': {}, 'reverse': {}})
+            os.chmod(source.cache_path(), 0o600)
+            os.chmod(tdir.name, 0o777)
+            self.assertEqual(source._read_cache_file(time.time()),
+                             {'map': {}, 'reverse': {}})
+            os.chmod(tdir.name, 0o700)
+            # malformed content is treated as an empty cache
+            with open(source.cache_path(), 'w') as cachefile:
+                json.dump({'map': {'foo': ['bar']}}, cachefile)
+            self.assertEqual(str(NodeSet("@foo", resolver=res)),
+                             "example[1-10]")
+        finally:
+            f.close()
+            tdir.cleanup()
+
     def testConfigGroupsMultipleDirs(self):
         """test groups with multiple confdir defined"""
         tdir1 = make_temp_dir()
@@ -1449,6 +1768,56 @@ class GroupSourceCacheTest(unittest.TestCase):
         self.assertEqual('@c', NodeSet("foo1", resolver=res).regroup())
         self.assertEqual(len(source._cache['reverse']), 2)
 
+    def test_negative_cache(self):
+        """test UpcallGroupSource negative cache"""
+        source = StaticGroupSource('cache', {'map': {'a': 'foo1'}})
+        upcalls = []
+        def upcall_read(cmdtpl, args=dict()):
+            upcalls.append(args['GROUP'])
+            if args['GROUP'] not in source._data['map']:
+                raise GroupSourceQueryFailed(args['GROUP'], source)
+            return StaticGroupSource._upcall_read(source, cmdtpl, args)
+        source._upcall_read = upcall_read
+        source.negative_cache_time = 0.2
+        res = GroupResolver(source)
+
+        self.assertRaises(GroupSourceQueryFailed, res.group_nodes, 'b')
+        self.assertRaises(GroupSourceQueryFailed, res.group_nodes, 'b')
+        self.assertRaises(GroupSourceQueryFailed, res.group_nodes_batch,
+                          ['a', 'b'])
+        self.assertEqual(upcalls, ['b', 'a'])
+        source._data['map']['b'] = 'foo2'
+        time.sleep(0.25)
+        self.assertEqual(res.group_nodes('b'), ['foo2'])
+        self.assertEqual(upcalls, ['b', 'a', 'b'])
+
+        # disabled negative cache
+        source.negative_cache_time = 0
+        self.assertRaises(GroupSourceQueryFailed, res.group_nodes, 'c')
+        self.assertRaises(GroupSourceQueryFailed, res.group_nodes, 'c')
+        self.assertEqual(upcalls, ['b', 'a', 'b', 'c', 'c'])
+
+    def test_stale_cache(self):
+        """test UpcallGroupSource stale cache entries"""
+        source = StaticGroupSource('cache', {'map': {'a': 'foo1'}})
+        source.cache_time = 0.2
+        source.stale_time = 0.5
+        res = GroupResolver(source)
+        self.assertEqual("foo1", str(NodeSet("@a", resolver=res)))
+        time.sleep(0.25)
+        source._data['map']['a'] = 'foo2'
+        # expired but not stale: return previous result while refreshing
+        self.assertEqual("foo1", str(NodeSet("@a", resolver=res)))
+        for _ in range(50):
+            if not source._refreshing:
+                break
+            time.sleep(0.01)
+        self.assertEqual("foo2", str(NodeSet("@a", resolver=res)))
+        # stale result is not returned anymore after stale_time
+        time.sleep(0.75)
+        source._data['map']['a'] = 'foo3'
+        self.assertEqual("foo3", str(NodeSet("@a", resolver=res)))
+
     def test_config_cache_time(self):
         """test group config cache_time options"""
         f = make_temp_file(dedent("""
@@ -1461,6 +1830,19 @@ class GroupSourceCacheTest(unittest.TestCase):
         self.assertEqual(res._sources['local'].cache_time, 0.2)
         self.assertEqual("foo1", str(NodeSet("@local:foo", resolver=res)))
 
+    def test_config_negative_stale_time(self):
+        """test group config negative_cache_time and stale_time options"""
+        f = make_temp_file(dedent("""
+            [local]
+            negative_cache_time: 5
+            stale_time: 600
+            map: echo foo1
+            """).encode('ascii'))
+        res = GroupResolverConfig(f.name)
+        self.assertEqual("foo1", str(NodeSet("@local:foo", resolver=res)))
+        self.assertEqual(res._sources['local'].negative_cache_time, 5)
+        self.assertEqual(res._sources['local'].stale_time, 600)
+
 
 class GroupSourceTest(unittest.TestCase):
     """Test class for 1.7 dict-based GroupSource"""
@@ -1571,6 +1953,43 @@ class YAMLGroupLoaderTest(unittest.TestCase):
                          { 'cherry': 'client-4-2',
                            'nut': 'node42' })
 
+    def test_reload_modified(self):
+        """test YAMLGroupLoader reload of modified file"""
+        f = make_temp_file(dedent("""
+            vendors:
+                apricot: node[1-10]
+            customers:
+                cherry: client-4-2""").encode('ascii'))
+        loader = YAMLGroupLoader(f.name)
+        sources = dict((source.name, source) for source in loader)
+        res = GroupResolver(sources["vendors"])
+        res.add_source(sources["customers"])
+        self.assertEqual(NodeSet("node[1-10]", resolver=res).regroup(),
+                         "@apricot")
+        self.assertEqual(NodeSet("client-4-2", resolver=res)
+                         .regroup("customers"), "@customers:cherry")
+        vendors_index = res.group_index()
+        customers_index = res.group_index("customers")
+        self.assertNotEqual(vendors_index, None)
+        # unchanged file: no reload
+        loader._load_yaml = None
+        self.assertEqual(loader.groups("vendors"), {'apricot': 'node[1-10]'})
+        self.assertTrue(res.group_index() is vendors_index)
+        del loader._load_yaml
+        # modified file is reloaded on next access
+        f.write(b"\n    date: client-4-3\n")
+        f.flush()
+        self.assertEqual(loader.groups("vendors"), {'apricot': 'node[1-10]'})
+        self.assertEqual(loader.groups("customers"),
+                         {'cherry': 'client-4-2', 'date': 'client-4-3'})
+        # only the index of the modified source is invalidated
+        self.assertTrue(res.group_index() is vendors_index)
+        self.assertEqual(res.group_index("customers"), None)
+        self.assertEqual(NodeSet("client-4-[2-3]", resolver=res)
+                         .regroup("customers"),
+                         "@customers:cherry,@customers:date")
+        self.assertFalse(res.group_index("customers") is customers_index)
+
     def test_iter(self):
         """test YAMLGroupLoader iterator"""
         f = make_temp_file(dedent("""
@@ -1631,6 +2050,68 @@ class YAMLGroupLoaderTest(unittest.TestCase):
         self.assertEqual(resolver.group_nodes('bubba'),
                 [ 'pickup-1,pickup-2,tractor-[1-2]' ])
 
+    def test_snapshot(self):
+        """test YAMLGroupLoader compiled snapshot"""
+        tdir = make_temp_dir()
+        f = make_temp_file(dedent("""
+            vendors:
+                apricot: node1,node2,node3 node4
+                avocado: '@apricot,node5'
+                banana:
+                    - node10
+                    - node11
+                cherry:""").encode('ascii'))
+        try:
+            loader = YAMLGroupLoader(f.name, cache_dir=tdir.name)
+            snapshot_path = loader.snapshot_path()
+            self.assertTrue(os.path.isfile(snapshot_path))
+            # node sets are folded, except if they contain node groups
+            groups = {'apricot': 'node[1-4]', 'avocado': '@apricot,node5',
+                      'banana': 'node[10-11]', 'cherry': ''}
+            self.assertEqual(loader.groups("vendors"), groups)
+            # snapshot is used when YAML file is unchanged
+            loader = YAMLGroupLoader(f.name, cache_dir=tdir.name)
+            loader._load_yaml = None
+            loader._load()
+            self.assertEqual(loader.groups("vendors"), groups)
+            # stale snapshot
+            f.write(b"\n    date: node20\n")
+            f.flush()
+            loader = YAMLGroupLoader(f.name, cache_dir=tdir.name)
+            groups['date'] = 'node20'
+            self.assertEqual(loader.groups("vendors"), groups)
+            # same size rewrite with restored mtime
+            fstat = os.stat(f.name)
+            with open(f.name, 'r+b') as yamlfile:
+                content = yamlfile.read()
+                yamlfile.seek(0)
+                yamlfile.write(content.replace(b"node20", b"node21"))
+            os.utime(f.name, (fstat.st_atime, fstat.st_mtime))
+            loader = YAMLGroupLoader(f.name, cache_dir=tdir.name)
+            groups['date'] = 'node21'
+            self.assertEqual(loader.groups("vendors"), groups)
+            # snapshot writable by others is not trusted
+            snapkey = loader._snapshot_key(os.stat(f.name))
+            self.assertEqual(loader._load_snapshot(snapkey)['vendors'],
+                             groups)
+            os.chmod(snapshot_path, 0o666)
+            self.assertEqual(loader._load_snapshot(snapkey), None)
+            os.chmod(snapshot_path, 0o600)
+            os.chmod(tdir.name, 0o777)
+            self.assertEqual(loader._load_snapshot(snapkey), None)
+            os.chmod(tdir.name, 0o700)
+            # invalid snapshot is ignored
+            with open(snapshot_path, 'wb') as snapfile:
+                snapfile.write(b"garbage")
+            loader = YAMLGroupLoader(f.name, cache_dir=tdir.name)
+            self.assertEqual(loader.groups("vendors"), groups)
+            resolver = GroupResolver(list(loader)[0])
+            self.assertEqual(str(NodeSet("@avocado", resolver=resolver)),
+                             "node[1-5]")
+        finally:
+            f.close()
+            tdir.cleanup()
+
 class GroupResolverYAMLTest(unittest.TestCase):
 
     def setUp(self):
@@ -1814,6 +2295,53 @@ class GroupResolverYAMLTest(unittest.TestCase):
             yamlfile.close()
             tdir.cleanup()
 
+    def test_yaml_name_collision(self):
+        """test groups with YAML sources name collision"""
+        tdir = make_temp_dir()
+        f = make_temp_file(dedent("""
+            [Main]
+            default: other
+            autodir: %s
+
+            [dup]
+            map: echo example[1-10]
+            """ % tdir.name).encode('ascii'))
+        yamlfile = make_temp_file(dedent("""
+            dup:
+                foo: example[1-4]
+            other:
+                bar: example[5-8]
+            """).encode('ascii'), suffix=".yaml", dir=tdir.name)
+        try:
+            resolver = GroupResolverConfig(f.name)
+            self.assertRaises(GroupResolverConfigError, resolver.grouplist)
+            # collision between YAML files
+            f.close()
+            f = make_temp_file(dedent("""
+                [Main]
+                default: other
+                autodir: %s
+                """ % tdir.name).encode('ascii'))
+            yamlfile2 = make_temp_file(dedent("""
+                other:
+                    foo: example[1-4]
+                """).encode('ascii'), suffix=".yaml", dir=tdir.name)
+            try:
+                resolver = GroupResolverConfig(f.name)
+                self.assertRaises(GroupResolverConfigError, resolver.grouplist)
+            finally:
+                yamlfile2.close()
+            # collision with a source added by hand when loading the file
+            resolver = GroupResolverConfig(f.name)
+            self.assertRaises(ValueError, resolver.add_source,
+                              GroupSource("other"))
+            self.assertEqual(resolver.group_nodes("bar", "other"),
+                             ["example[5-8]"])
+        finally:
+            f.close()
+            yamlfile.close()
+            tdir.cleanup()
+
     def test_wrong_autodir(self):
         """test wrong autodir (doesn't exist)"""
         f = make_temp_file(dedent("""
@@ -1905,3 +2433,49 @@ class GroupResolverYAMLTest(unittest.TestCase):
             yamlfile.close()
             tdir.cleanup()
 
+
+    def test_yaml_lazy_load(self):
+        """test YAML group files loaded on first use"""
+        tdir = make_temp_dir()
+        f = make_temp_file(dedent("""
+            [Main]
+            default: yaml1
+            autodir: %s
+            """ % tdir.name).encode('ascii'))
+        yamlfile1 = make_temp_file(dedent("""
+            # comment
+            ---
+            yaml1:
+                foo: example[1-4]
+            "yaml 2":
+                bar: example[5-8]
+            """).encode('ascii'), suffix=".yaml", dir=tdir.name)
+        yamlfile2 = make_temp_file(dedent("""
+            yaml3:
+                baz: [example9
+            """).encode('ascii'), suffix=".yaml", dir=tdir.name)
+        yamlfile3 = make_temp_file(b'{yaml4: {qux: "example10"}}',
+                                   suffix=".yaml", dir=tdir.name)
+        try:
+            self.assertEqual(YAMLGroupLoader.scan_sources(yamlfile1.name),
+                             ['yaml1', 'yaml 2'])
+            self.assertEqual(YAMLGroupLoader.scan_sources(yamlfile3.name),
+                             None)
+            res = GroupResolverConfig(f.name)
+            # invalid yaml3 source is not loaded when unused
+            self.assertEqual(str(NodeSet("@foo", resolver=res)),
+                             "example[1-4]")
+            self.assertEqual(sorted(res._lazy_sources), ['yaml3'])
+            # file not supported by scan is loaded
+            self.assertEqual(str(NodeSet("@yaml4:qux", resolver=res)),
+                             "example10")
+            self.assertRaises(GroupResolverConfigError, NodeSet, "@yaml3:baz",
+                              resolver=res)
+            # all sources are loaded when listed
+            res = GroupResolverConfig(f.name)
+            self.assertRaises(GroupResolverConfigError, res.sources)
+        finally:
+            yamlfile1.close()
+            yamlfile2.close()
+            yamlfile3.close()
+            tdir.cleanup()
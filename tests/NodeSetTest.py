@@ -11,6 +11,7 @@ import sys
 import unittest
 
 from ClusterShell.NodeSet import RangeSet, RangeSetND, NodeSet, fold, expand
+from ClusterShell.NodeSet import FrozenNodeSet
 from ClusterShell.NodeSet import NodeSetBase, AUTOSTEP_DISABLED, \
                                  NodeSetError, NodeSetParseError, \
                                  NodeSetParseRangeError
@@ -93,6 +94,41 @@ class NodeSetTest(unittest.TestCase):
         self.assertEqual(str(nodeset), "cluster,cluster[0-1,3],wool")
         self.assertEqual(len(nodeset), 5)
 
+    def testFromIterConstructor(self):
+        """test NodeSet.fromiter() constructor"""
+        nodeset = NodeSet.fromiter(iter(["cluster0", "cluster1", "cluster2",
+                                         "cluster5", "cluster8", "cluster4",
+                                         "cluster3", "cluster1"]))
+        self.assertEqual(str(nodeset), "cluster[0-5,8]")
+        self.assertEqual(len(nodeset), 7)
+        # single nodes, padding, suffix and whitespaces
+        nodes = ["cluster0", " cluster1\n", "cluster", "wool", "cluster03",
+                 "", "ib-c1-ipmi", "ib-c2-ipmi", "n00", "n0", "4", "2"]
+        nodeset = NodeSet.fromiter(nodes)
+        self.assertEqual(nodeset, NodeSet.fromlist(node.strip() for node in
+                                                   nodes if node.strip()))
+        self.assertEqual(str(nodeset), "[2,4],cluster,cluster[0-1,03],"
+                                       "ib-c[1-2]-ipmi,n[0,00],wool")
+        # nD node names
+        nodes = ["c%dn%02d" % (chas, node) for node in range(1, 13)
+                 for chas in range(1, 5) if (chas, node) != (3, 7)]
+        nodes += ["c5-n1", "c5n1-ib1"]
+        nodeset = NodeSet.fromiter(nodes)
+        self.assertEqual(nodeset, NodeSet.fromlist(nodes))
+        self.assertEqual(str(nodeset), "c5-n1,c[1-2,4]n[01-12],"
+                                       "c3n[01-06,08-12],c5n1-ib1")
+        self.assertEqual(len(nodeset), 49)
+        # node sets and extended patterns are parsed
+        nodeset = NodeSet.fromiter(["node1", "node[2-4]", "node5,foo",
+                                    "node9!node5", "node6"], autostep=3)
+        self.assertEqual(str(nodeset), "foo,node[1-6,9]")
+        self.assertEqual(nodeset.autostep, 3)
+        self.assertRaises(NodeSetParseError, NodeSet.fromiter,
+                          ["node1", "node1]"])
+        fnodeset = FrozenNodeSet.fromiter(["node2", "node1"])
+        self.assertEqual(str(fnodeset), "node[1-2]")
+        self.assertTrue(isinstance(fnodeset, FrozenNodeSet))
+
     def testDigitInPrefix(self):
         """test NodeSet digit in prefix"""
         nodeset = NodeSet("clu-0-3")
@@ -1170,6 +1206,18 @@ class NodeSetTest(unittest.TestCase):
         self.assertEqual(str(nodeset[9:11]), "water,wood1")
         self.assertEqual(str(nodeset[9:12]), "water,wood[1-2]")
 
+    def test_getslice_step(self):
+        """test NodeSet.__getitem__() with slice step and several patterns"""
+        nodeset = NodeSet("a[1-5],b[1-5],c,d[1-2]n[1-3],e[01-03]")
+        nodes = list(nodeset)
+        for sli in (slice(None, None, 3), slice(2, 9, 2), slice(1, 15, 4),
+                    slice(4, None, 5), slice(9, 12, 2), slice(None, -3, 7)):
+            self.assertEqual(nodeset[sli], NodeSet.fromlist(nodes[sli]))
+        self.assertEqual(str(nodeset[::3]), "a[1,4],b[2,5],d[1-2]n2,e02")
+        self.assertEqual(str(nodeset[::-3]), "a[2,5],b3,c,d[1-2]n3,e03")
+        for idx in range(-len(nodes), len(nodes)):
+            self.assertEqual(nodeset[idx], nodes[idx])
+
     def test_bad_slices(self):
         nodeset = NodeSet("cluster[1-30]c[1-2]")
         self.assertRaises(TypeError, nodeset.__getitem__, "zz")
@@ -2466,6 +2514,20 @@ class NodeSetTest(unittest.TestCase):
         self.assertEqual(str(n5), "")
         self.assertEqual(str(n5b), "n[1,3,5],p[2,5,8]")
 
+    def test_autostep_intersection(self):
+        """test NodeSet intersection with mismatched autostep"""
+        # other nodeset has more patterns
+        n1 = NodeSet("n[1-9/2],m1", autostep=3)
+        n1 &= NodeSet("n[1-20],m[1-3],x1")
+        self.assertEqual(str(n1), "m1,n[1-9/2]")
+        # other nodeset has fewer patterns
+        n1 = NodeSet("n[1-9/2],m1,x1", autostep=3)
+        n1 &= NodeSet("n[1-20],m[1-3]")
+        self.assertEqual(str(n1), "m1,n[1-9/2]")
+        n2 = NodeSet("n[1-20],m[1-3],x1") & NodeSet("n[1-9/2],m1",
+                                                     autostep=3)
+        self.assertEqual(str(n2), "m1,n[1,3,5,7,9]")
+
     def test_autostep_property(self):
         """test NodeSet autostep property (1D)"""
         n1 = NodeSet("n1,n3,n5,p04,p07,p10,p13")
@@ -2879,3 +2941,95 @@ class NodeSetTest(unittest.TestCase):
         self.assertEqual(len(n1), 13)
         # padding in negative range is not supported
         self._assertNS("n[-001]", NodeSetParseRangeError)
+
+    def test_frozen(self):
+        """test FrozenNodeSet"""
+        ns0 = FrozenNodeSet("node[1-5],foo,da[1-2]c[3-4]")
+        self.assertEqual(str(ns0), "da[1-2]c[3-4],foo,node[1-5]")
+        self.assertEqual(len(ns0), 10)
+        self.assertEqual(ns0, NodeSet("foo,node[1-5],da[1-2]c[3-4]"))
+        ns1 = FrozenNodeSet("node[1-2],node[3-5],foo,da[1-2]c[3-4]")
+        self.assertEqual(hash(ns0), hash(ns1))
+        self.assertEqual({ns0: 1}[ns1], 1)
+        self.assertEqual(len(set([ns0, ns1, FrozenNodeSet("foo")])), 2)
+        self.assertRaises(TypeError, hash, NodeSet("foo"))
+        self.assertRaises(TypeError, ns0.add, "bar")
+        self.assertRaises(TypeError, ns0.update, "bar")
+        self.assertRaises(TypeError, ns0.remove, "foo")
+        self.assertRaises(TypeError, ns0.difference_update, "foo")
+        self.assertRaises(TypeError, ns0.clear)
+        # operations return new frozen objects
+        ns2 = ns0 | NodeSet("bar")
+        self.assertTrue(isinstance(ns2, FrozenNodeSet))
+        self.assertEqual(str(ns2), "bar,da[1-2]c[3-4],foo,node[1-5]")
+        self.assertEqual(str(ns0.difference("node[2-5]")),
+                         "da[1-2]c[3-4],foo,node1")
+        ns3 = ns0
+        ns3 &= NodeSet("node[4-9]")
+        self.assertTrue(isinstance(ns3, FrozenNodeSet))
+        self.assertEqual(str(ns3), "node[4-5]")
+        self.assertEqual(str(ns0), "da[1-2]c[3-4],foo,node[1-5]")
+        # accepted where NodeSet is
+        ns4 = NodeSet("node[5-6]")
+        ns4.update(ns0)
+        self.assertEqual(str(ns4), "da[1-2]c[3-4],foo,node[1-6]")
+        self.assertEqual(str(ns0), "da[1-2]c[3-4],foo,node[1-5]")
+        self.assertTrue(ns3 < ns0)
+        # copy is mutable
+        ns5 = ns0.copy()
+        self.assertEqual(type(ns5), NodeSet)
+        ns5.add("node6")
+        self.assertEqual(str(ns5), "da[1-2]c[3-4],foo,node[1-6]")
+        self.assertEqual(str(ns0), "da[1-2]c[3-4],foo,node[1-5]")
+        self.assertEqual(type(copy.copy(ns0)), NodeSet)
+        self.assertTrue(isinstance(FrozenNodeSet.fromlist(["a", "b"]),
+                                   FrozenNodeSet))
+        # cached folded string follows autostep changes
+        ns6 = FrozenNodeSet("n[1,3,5]")
+        self.assertEqual(str(ns6), "n[1,3,5]")
+        ns6.autostep = 3
+        self.assertEqual(str(ns6), "n[1-5/2]")
+        ns7 = pickle.loads(pickle.dumps(ns0))
+        self.assertTrue(isinstance(ns7, FrozenNodeSet))
+        self.assertEqual(ns7, ns0)
+        self.assertEqual(hash(ns7), hash(ns0))
+
+    def test_frozen_equality(self):
+        """test FrozenNodeSet equality and hash"""
+        ns0 = FrozenNodeSet("node[1-5],foo")
+        self.assertEqual(ns0, FrozenNodeSet("foo,node[1-3,4-5]"))
+        self.assertNotEqual(ns0, FrozenNodeSet("node[1-5]"))
+        self.assertNotEqual(ns0, FrozenNodeSet("node[1-5],bar"))
+        self.assertNotEqual(ns0, FrozenNodeSet("node[01-05],foo"))
+        self.assertEqual(ns0, NodeSet("node[1-5],foo"))
+        self.assertEqual(NodeSet("node[1-5],foo"), ns0)
+        self.assertNotEqual(ns0, "node[1-5],foo")
+        # group nodesets by value
+        groups = {}
+        for nodes in ("n[1-2]", "n1,n2", "n[2-3]", "n2,n1", "n3,n2"):
+            groups.setdefault(FrozenNodeSet(nodes), []).append(nodes)
+        self.assertEqual(groups, {FrozenNodeSet("n[1-2]"): ["n[1-2]", "n1,n2",
+                                                            "n2,n1"],
+                                  FrozenNodeSet("n[2-3]"): ["n[2-3]", "n3,n2"]})
+
+    def test_parse_cache(self):
+        """test NodeSet parsing of the same patterns"""
+        patterns = "n[1-5],n[7-9]!n8,da[1-2]c[3-4]"
+        ns0 = NodeSet(patterns)
+        ns0.add("n6")
+        ns0.remove("da1c3")
+        ns0.autostep = 3
+        ns1 = NodeSet(patterns)
+        self.assertEqual(str(ns1), "da[1-2]c[3-4],n[1-5,7,9]")
+        self.assertEqual(ns1.autostep, None)
+        ns1.update("n[6-10]")
+        ns1.difference_update("da[1-2]c3")
+        self.assertEqual(str(NodeSet(patterns)),
+                         "da[1-2]c[3-4],n[1-5,7,9]")
+        self.assertEqual(str(NodeSet(patterns, autostep=2)),
+                         "da[1-2]c[3-4],n[1-5,7-9/2]")
+        self.assertEqual(str(NodeSet(patterns)),
+                         "da[1-2]c[3-4],n[1-5,7,9]")
+        # parsing errors are not cached
+        self.assertRaises(NodeSetParseError, NodeSet, "n[1-5")
+        self.assertRaises(NodeSetParseError, NodeSet, "n[1-5")
@@ -3,10 +3,12 @@
 
 """Unit test for RangeSetND"""
 
+import random
 import sys
 import unittest
 import warnings
 
+import ClusterShell.RangeSet
 from ClusterShell.RangeSet import RangeSet, RangeSetND
 
 
@@ -417,6 +419,15 @@ class RangeSetNDTest(unittest.TestCase):
         self.assertRaises(IndexError, rn1.__getitem__, -13)
         self.assertRaises(TypeError, rn1.__getitem__, "foo")
 
+    def test_getitem_large(self):
+        rn1 = RangeSetND([["0-999", "0-999", "0-99"]])
+        self.assertEqual(len(rn1), 100000000)
+        self.assertEqual(rn1[0], ('0', '0', '0'))
+        self.assertEqual(rn1[123456], ('1', '234', '56'))
+        self.assertEqual(rn1[-1], ('999', '999', '99'))
+        self.assertEqual(str(rn1[100:300]), "0; 1-2; 0-99\n")
+        self.assertRaises(IndexError, rn1.__getitem__, 100000000)
+
     def test_getitem_slices(self):
         rn1 = RangeSetND([["10", "10-13"], ["0-3", "1-2"]])
         # slices
@@ -523,3 +534,41 @@ class RangeSetNDTest(unittest.TestCase):
         rs3.add(4)
         self.assertEqual(str(rs3), "2-4")
         self.assertEqual(str(rn0), "2-5; 0-1\n6-7; 2-3\n")
+
+    def _fold_engines(self, vectors, autostep=None):
+        """fold vectors with all engines and check results are identical"""
+        results = set()
+        saved = (ClusterShell.RangeSet.ND_FOLD_ENGINE,
+                 ClusterShell.RangeSet.ND_FOLD_NUMPY)
+        try:
+            for engine, use_numpy in [('rangesets', False),
+                                      ('intervals', False),
+                                      ('intervals', True)]:
+                ClusterShell.RangeSet.ND_FOLD_ENGINE = engine
+                ClusterShell.RangeSet.ND_FOLD_NUMPY = use_numpy
+                rn = RangeSetND(vectors, autostep=autostep)
+                results.add((str(rn), len(rn), rn.pads()))
+        finally:
+            (ClusterShell.RangeSet.ND_FOLD_ENGINE,
+             ClusterShell.RangeSet.ND_FOLD_NUMPY) = saved
+        self.assertEqual(len(results), 1, results)
+        return results.pop()
+
+    def test_fold_engines(self):
+        self.assertEqual(self._fold_engines([["0-2", "1-2"], ["10", "3-5"],
+                                             ["1", "2-4"], ["3", "1"]]),
+                         ("0,2; 1-2\n1; 1-4\n10; 3-5\n3; 1\n", 12, (0, 0)))
+        # mixed padding and negative indexes
+        self.assertEqual(self._fold_engines([["01-03", "5"], ["1-3", "5"],
+                                             ["-2--1", "6"], ["9", "5-6"]]),
+                         ("1-3,9,01-03; 5\n-2--1,9; 6\n", 10, (2, 0)))
+        # autostep
+        self.assertEqual(self._fold_engines([["1,3,5", "1"], ["7-11", "2"],
+                                             ["1,3", "2"]], autostep=3),
+                         ("7-11; 2\n1,3; 1-2\n5; 1\n", 10, (0, 0)))
+        # 3D with random holes
+        rnd = random.Random(1)
+        vectors = [[r, c, n] for r in range(1, 5) for c in range(1, 9)
+                   for n in range(1, 33) if rnd.random() > 0.05]
+        _, length, _ = self._fold_engines(vectors)
+        self.assertEqual(length, len(vectors))
@@ -8,7 +8,8 @@ import pickle
 import unittest
 import warnings
 
-from ClusterShell.RangeSet import RangeSet, RangeSetParseError
+import ClusterShell.RangeSet
+from ClusterShell.RangeSet import RangeSet, FrozenRangeSet, RangeSetParseError
 
 class RangeSetTest(unittest.TestCase):
 
@@ -455,6 +456,28 @@ class RangeSetTest(unittest.TestCase):
         self.assertEqual(r2[33], '106')
         self.assertRaises(TypeError, r2.__getitem__, "foo")
 
+    def testGetItemLarge(self):
+        """test RangeSet.__getitem__() with many ranges"""
+        rset = RangeSet.fromiter(range(0, 200000, 2))  # 100000 ranges
+        self.assertEqual(rset[0], "0")
+        self.assertEqual(rset[12345], "24690")
+        self.assertEqual(rset[-1], "199998")
+        self.assertEqual(rset[1000:2000], RangeSet("2000-3998/2"))
+        self.assertEqual(rset[1000:2000:10], RangeSet("2000-3980/20"))
+        self.assertEqual(list(rset[99998:]), ["199996", "199998"])
+        # mixed lengths and padding
+        rset = RangeSet("0-9,00-99,000-999")
+        self.assertEqual(rset[10], "00")
+        self.assertEqual(rset[109], "99")
+        self.assertEqual(rset[110], "000")
+        self.assertEqual(str(rset[105:115]), "95-99,000-004")
+        # cached positions are reset on change
+        rset.add("1000")
+        self.assertEqual(rset[-1], "1000")
+        rset.remove("5")
+        self.assertEqual(rset[5], "6")
+        self.assertEqual(rset.copy()[5], "6")
+
     def testGetSlice(self):
         """test RangeSet.__getitem__() with slice"""
         r0 = RangeSet("1-12")
@@ -712,6 +735,37 @@ class RangeSetTest(unittest.TestCase):
         self.assertEqual(str(rgs), "1,3,5-8")
         self.assertEqual(len(rgs), 6)
 
+    def testFromIterConstructor(self):
+        """test RangeSet.fromiter() constructor"""
+        rgs = RangeSet.fromiter(["3", "5", "1", "8", "6", "7", "3"])
+        self.assertEqual(str(rgs), "1,3,5-8")
+        self.assertEqual(len(rgs), 6)
+        rgs = RangeSet.fromiter(iter([3, 5, 6, "1", "7-8", RangeSet("10")]))
+        self.assertEqual(str(rgs), "1,3,5-8,10")
+        self.assertEqual(len(rgs), 7)
+        # padding
+        rgs = RangeSet.fromiter(["01", "2", "003", "002", "00", "-2"])
+        self.assertEqual(rgs, RangeSet("-2,2,00-01,002-003"))
+        # large input merged in several passes
+        saved_size = ClusterShell.RangeSet._KeyCollector.BUFFER_SIZE
+        ClusterShell.RangeSet._KeyCollector.BUFFER_SIZE = 7
+        try:
+            indexes = [str(i) for i in range(1000) if i % 100 != 42]
+            rgs = RangeSet.fromiter(reversed(indexes), autostep=3)
+            self.assertEqual(rgs, RangeSet.fromlist(indexes))
+            self.assertEqual(rgs.autostep, 3)
+        finally:
+            ClusterShell.RangeSet._KeyCollector.BUFFER_SIZE = saved_size
+        self.assertEqual(str(RangeSet.fromiter([])), "")
+        self.assertRaises(RangeSetParseError, RangeSet.fromiter, ["1", "a"])
+        # non-decimal digit and bool are not indexes
+        self.assertRaises(RangeSetParseError, RangeSet.fromiter, [u"\u00b2"])
+        self.assertRaises(TypeError, RangeSet.fromiter, [True])
+        self.assertEqual(RangeSet.fromiter([-5, 7]), RangeSet("-5,7"))
+        frgs = FrozenRangeSet.fromiter(["2", "1"])
+        self.assertEqual(str(frgs), "1-2")
+        self.assertTrue(isinstance(frgs, FrozenRangeSet))
+
     def testFromOneConstructor(self):
         """test RangeSet.fromone() constructor"""
         rgs = RangeSet.fromone(42)
@@ -1333,3 +1387,130 @@ class RangeSetTest(unittest.TestCase):
         self.assertRaises(RangeSetParseError, RangeSet, "-009")
         self.assertRaises(RangeSetParseError, RangeSet, "-01-00")
         self.assertRaises(RangeSetParseError, RangeSet, "-003--001")
+
+    def test_large_ranges(self):
+        """test RangeSet with very large ranges"""
+        r0 = RangeSet("000000-199999")
+        self.assertEqual(len(r0), 200000)
+        self.assertEqual(str(r0), "000000-199999")
+        self.assertTrue("123456" in r0)
+        self.assertFalse("1234567" in r0)
+        self.assertTrue(123456 in r0)
+        self.assertFalse(12345 in r0)  # unpadded
+        self.assertEqual(r0[-1], "199999")
+        self.assertEqual(str(r0[100000:100005]), "100000-100004")
+        r1 = RangeSet("0-999999999999")
+        self.assertEqual(len(r1), 1000000000000)
+        self.assertEqual(str(r1), "0-999999999999")
+        r1.remove(500000000000)
+        self.assertEqual(str(r1), "0-499999999999,500000000001-999999999999")
+        self.assertEqual(str(r1 & RangeSet("499999999998-500000000002")),
+                         "499999999998-499999999999,500000000001-500000000002")
+        r2 = RangeSet("1-1000000,2000000-3000000")
+        self.assertEqual(str(r2 - RangeSet("10-2999990")), "1-9,2999991-3000000")
+        self.assertEqual(str(r2 ^ RangeSet("5-2000005")),
+                         "1-4,1000001-1999999,2000006-3000000")
+
+    def test_mixed_padding_contiguous_lengths(self):
+        """test RangeSet with unpadded indexes of different lengths"""
+        r0 = RangeSet("8-9,100-102,0008-0012,08-10")
+        self.assertEqual(str(r0), "8-9,08-10,100-102,0008-0012")
+        self.assertEqual(len(r0), 13)
+        self.assertEqual(list(r0)[1:4], ["9", "08", "09"])
+        r0.update(RangeSet("11-99"))
+        self.assertEqual(str(r0), "8-9,08-99,100-102,0008-0012")
+        r0.difference_update(RangeSet("9-10,99-100"))
+        self.assertEqual(str(r0), "8,08-09,11-98,101-102,0008-0012")
+        self.assertEqual(r0.padding, 4)
+        r0.padding = 2
+        self.assertEqual(str(r0), "08-98,101-102")
+
+    def test_negative_contiguous(self):
+        """test RangeSet.contiguous() with negative ranges"""
+        r0 = RangeSet("-12--1,3")
+        self.assertEqual([str(rg) for rg in r0.contiguous()], ["-12--1", "3"])
+        self.assertEqual(str(r0[10:]), "-2--1,3")
+
+    def test_binary_ops_many_ranges(self):
+        """test RangeSet binary operations on many ranges"""
+        r1 = RangeSet.fromlist(["%d-%d" % (i, i + 2) for i in range(0, 3000, 5)])
+        r2 = RangeSet.fromlist(["%d-%d" % (i, i + 4) for i in range(1, 3000, 7)])
+        r3 = RangeSet("0000-0999")
+        s1, s2 = set(r1.intiter()), set(r2.intiter())
+        self.assertEqual(list((r1 | r2).intiter()), sorted(s1 | s2))
+        self.assertEqual(list((r1 & r2).intiter()), sorted(s1 & s2))
+        self.assertEqual(list((r1 - r2).intiter()), sorted(s1 - s2))
+        self.assertEqual(list((r1 ^ r2).intiter()), sorted(s1 ^ s2))
+        # indexes of different padding lengths never match
+        self.assertEqual(len(r1 & r3), 0)
+        self.assertEqual(r1 - r3, r1)
+        self.assertEqual(len(r1 ^ r3), len(r1) + len(r3))
+        self.assertEqual(str((r1 | r3) - r1), "0000-0999")
+        # contiguous ranges are merged
+        r4 = RangeSet("1-5,11-15")
+        r4 ^= RangeSet("6-10")
+        self.assertEqual(str(r4), "1-15")
+        self.assertEqual(r4._bounds, RangeSet("1-15")._bounds)
+
+    def test_cached_str_and_len(self):
+        """test RangeSet cached folded string and length invalidation"""
+        r0 = RangeSet("1-5,7")
+        self.assertEqual(str(r0), "1-5,7")
+        self.assertEqual(len(r0), 6)
+        r0.add(6)
+        self.assertEqual(str(r0), "1-7")
+        self.assertEqual(len(r0), 7)
+        r0.difference_update(RangeSet("2-4"))
+        self.assertEqual(str(r0), "1,5-7")
+        r0.update(RangeSet("9,11,13"))
+        self.assertEqual(str(r0), "1,5-7,9,11,13")
+        # autostep change is taken into account
+        r0.autostep = 3
+        self.assertEqual(str(r0), "1,5-7,9-13/2")
+        r0.intersection_update(RangeSet("5-9"))
+        self.assertEqual(str(r0), "5-7,9")
+        self.assertEqual(len(r0), 4)
+        r0.symmetric_difference_update(RangeSet("9-10"))
+        self.assertEqual(str(r0), "5-7,10")
+        r0.padding = 2
+        self.assertEqual(str(r0), "05-07,10")
+        r0.clear()
+        self.assertEqual(str(r0), "")
+        self.assertEqual(len(r0), 0)
+
+    def test_frozen(self):
+        """test FrozenRangeSet"""
+        r0 = FrozenRangeSet("1-5,7")
+        self.assertEqual(str(r0), "1-5,7")
+        self.assertEqual(len(r0), 6)
+        self.assertEqual(r0, RangeSet("1-5,7"))
+        self.assertEqual(hash(r0), hash(FrozenRangeSet(RangeSet("1-5,7"))))
+        self.assertEqual({r0: 1}[FrozenRangeSet("1-3,4-5,7")], 1)
+        self.assertRaises(TypeError, hash, RangeSet("1-5,7"))
+        self.assertRaises(TypeError, r0.add, 8)
+        self.assertRaises(TypeError, r0.remove, 1)
+        self.assertRaises(TypeError, r0.update, RangeSet("8"))
+        self.assertRaises(TypeError, r0.clear)
+        self.assertRaises(TypeError, setattr, r0, "padding", 2)
+        # operations return new frozen objects
+        r1 = r0 | RangeSet("8")
+        self.assertTrue(isinstance(r1, FrozenRangeSet))
+        self.assertEqual(str(r1), "1-5,7-8")
+        r2 = r0
+        r2 -= RangeSet("1")
+        self.assertTrue(isinstance(r2, FrozenRangeSet))
+        self.assertEqual(str(r2), "2-5,7")
+        self.assertEqual(str(r0), "1-5,7")
+        # copy is mutable
+        r3 = r0.copy()
+        self.assertEqual(type(r3), RangeSet)
+        r3.add(6)
+        self.assertEqual(str(r3), "1-7")
+        self.assertEqual(str(r0), "1-5,7")
+        self.assertTrue(isinstance(FrozenRangeSet.fromlist(["1", "3"]),
+                                   FrozenRangeSet))
+        self.assertTrue(isinstance(FrozenRangeSet.fromone(3), FrozenRangeSet))
+        r4 = pickle.loads(pickle.dumps(r0))
+        self.assertTrue(isinstance(r4, FrozenRangeSet))
+        self.assertEqual(r4, r0)
+        self.assertEqual(hash(r4), hash(r0))
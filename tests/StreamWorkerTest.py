@@ -5,7 +5,10 @@ Unit test for StreamWorker
 import os
 import unittest
 
+from ClusterShell.Defaults import DEFAULTS
+import ClusterShell.Worker.Worker
 from ClusterShell.Worker.Worker import StreamWorker, WorkerError
+from ClusterShell.Worker.fastsubprocess import set_nonblock_flag
 from ClusterShell.Task import task_self
 from ClusterShell.Event import EventHandler
 
@@ -369,3 +372,91 @@ class StreamTest(unittest.TestCase):
         self.assertEqual(hdlr.read_count, 1) # single line only
         os.close(rfd1)
         os.close(wfd1)
+
+    def test_011_event_handler_signature_cache(self):
+        """test StreamWorker event handler signature inspection is cached"""
+        class TestH(EventHandler):
+            def __init__(self):
+                self.read_count = 0
+
+            def ev_read(self, worker, node, sname, msg):
+                self.read_count += 1
+
+        calls = []
+        getfullargspec_orig = ClusterShell.Worker.Worker.getfullargspec
+        def getfullargspec(func):
+            calls.append(func)
+            return getfullargspec_orig(func)
+
+        hdlr = TestH()
+        worker = StreamWorker(handler=hdlr)
+        rfd1, wfd1 = os.pipe()
+        worker.set_reader("pipe1", rfd1)
+        os.write(wfd1, b"line\n" * 100)
+        os.close(wfd1)
+        ClusterShell.Worker.Worker.getfullargspec = getfullargspec
+        try:
+            self.run_worker(worker)
+        finally:
+            ClusterShell.Worker.Worker.getfullargspec = getfullargspec_orig
+        self.assertEqual(hdlr.read_count, 100)
+        # at most once per event handler method
+        self.assertEqual(len(calls), len(set(calls)))
+
+    def test_012_write_queue_backpressure(self):
+        """test StreamWorker write queue with high-water mark"""
+        class WriterH(EventHandler):
+            def __init__(self, chunks):
+                self.chunks = chunks
+                self.full_count = 0
+                self.max_pending = 0
+
+            def feed(self, worker):
+                for chunk in self.chunks:
+                    self.max_pending = max(self.max_pending,
+                                           worker.write_pending())
+                    if not worker.write(chunk, "test"):
+                        self.full_count += 1
+                        return
+                worker.set_write_eof()
+
+            def ev_written(self, worker, node, sname, size):
+                if worker.write_pending() < DEFAULTS.write_hwm:
+                    self.feed(worker)
+
+        class ReaderH(EventHandler):
+            def __init__(self):
+                self.lines = []
+
+            def ev_read(self, worker, node, sname, msg):
+                self.lines.append(msg)
+
+        lines = [b"%07d" % i for i in range(100000)]
+        # mix of bytes and (copied) bytearray chunks of various sizes
+        chunks = [b"\n".join(lines[i:i + 37]) + b"\n"
+                  for i in range(0, len(lines), 37)]
+        chunks = [bytearray(chunk) if i % 3 else chunk
+                  for i, chunk in enumerate(chunks)]
+
+        hwm_save = DEFAULTS.write_hwm
+        DEFAULTS.write_hwm = 65536
+        try:
+            rfd, wfd = os.pipe()
+            set_nonblock_flag(wfd)
+            writer_hdlr = WriterH(iter(chunks))
+            writer = StreamWorker(handler=writer_hdlr)
+            writer.set_writer("test", wfd)
+            reader_hdlr = ReaderH()
+            reader = StreamWorker(handler=reader_hdlr)
+            reader.set_reader("test", rfd)
+            writer_hdlr.feed(writer)
+            self.assertEqual(writer_hdlr.full_count, 1)
+            self.assertTrue(writer.write_pending("test") >= 65536)
+            task_self().schedule(reader)
+            self.run_worker(writer)
+        finally:
+            DEFAULTS.write_hwm = hwm_save
+        self.assertEqual(reader_hdlr.lines, lines)
+        self.assertTrue(writer_hdlr.full_count > 1)
+        self.assertTrue(writer_hdlr.max_pending < 65536 + len(chunks[0]))
+        self.assertEqual(writer.write_pending(), 0)
@@ -0,0 +1,219 @@
+# ClusterShell asyncio engine test suite
+
+"""Unit test for ClusterShell Task driven by an asyncio event loop"""
+
+import time
+import unittest
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+from ClusterShell.Defaults import DEFAULTS
+from ClusterShell.Engine.Asyncio import EngineAsyncio
+from ClusterShell.Event import EventHandler
+from ClusterShell.Task import *
+
+
+@unittest.skipIf(asyncio is None, "asyncio not available")
+class TaskAsyncioTest(unittest.TestCase):
+
+    def setUp(self):
+        # switch Engine
+        task_terminate()
+        self.engine_id_save = DEFAULTS.engine
+        DEFAULTS.engine = EngineAsyncio.identifier
+        self.assertEqual(task_self().info('engine'), EngineAsyncio.identifier)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        # restore Engine
+        DEFAULTS.engine = self.engine_id_save
+        task_terminate()
+
+    def _run(self, future, timeout=30):
+        """run event loop until future is done, return its result"""
+        return self.loop.run_until_complete(asyncio.wait_for(future, timeout))
+
+    def test_shell_async(self):
+        """test awaitable Task.shell_async()"""
+        task = task_self()
+        futures = [task.shell_async("echo %d" % i) for i in range(20)]
+        self.assertTrue(task.running())
+        workers = self._run(asyncio.gather(*futures))
+        self.assertEqual([worker.read() for worker in workers],
+                         [str(i).encode() for i in range(20)])
+        self.assertEqual(task.max_retcode(), 0)
+        # task stops when all workers have finished
+        self.assertFalse(task.running())
+
+    def test_shell_async_sequential(self):
+        """test sequential Task.shell_async() calls"""
+        task = task_self()
+        futures = []
+        # like two awaits in a row: the second shell_async() is called as
+        # soon as the first future is done
+        def first_done(future):
+            # buffers are reset when the task is resumed again
+            futures.append(future.result().read())
+            futures.append(task.shell_async("echo second"))
+        first = task.shell_async("echo first")
+        first.add_done_callback(first_done)
+        self._run(first)
+        self.assertEqual(futures.pop(0), b"first")
+        self.assertEqual(self._run(futures[0], timeout=5).read(), b"second")
+        self.assertFalse(task.running())
+
+    def test_resume_async_after_shell_async(self):
+        """test Task.resume_async() right after Task.shell_async()"""
+        task = task_self()
+        futures = []
+        def first_done(future):
+            task.shell("sleep 10")
+            futures.append(task.resume_async(0.5))
+        first = task.shell_async("echo first")
+        first.add_done_callback(first_done)
+        self._run(first)
+        start = time.time()
+        self.assertRaises(TimeoutError, self._run, futures[0])
+        self.assertTrue(time.time() - start < 5)
+        self.assertFalse(task.running())
+
+    def test_shell_async_handler(self):
+        """test Task.shell_async() with event handler"""
+        class TestHandler(EventHandler):
+            def __init__(self):
+                self.lines = []
+                self.closed = 0
+            def ev_read(self, worker, node, sname, msg):
+                self.lines.append(msg)
+            def ev_close(self, worker, timedout):
+                self.closed += 1
+        handler = TestHandler()
+        worker = self._run(task_self().shell_async("echo foo; echo bar",
+                                                   handler=handler))
+        self.assertEqual(handler.lines, [b"foo", b"bar"])
+        self.assertEqual(handler.closed, 1)
+        self.assertEqual(worker.read(), b"foo\nbar")
+
+    def test_shell_async_handler_error(self):
+        """test Task.shell_async() with event handler raising exception"""
+        class TestError(Exception):
+            pass
+        class TestHandler(EventHandler):
+            def ev_read(self, worker, node, sname, msg):
+                raise TestError(msg)
+        task = task_self()
+        future = task.shell_async("echo foo; sleep 10", handler=TestHandler())
+        other = task.shell_async("sleep 10")
+        start = time.time()
+        self.assertRaises(TestError, self._run, future)
+        self.assertRaises(TestError, self._run, other)
+        self.assertTrue(time.time() - start < 5)
+        self.assertFalse(task.running())
+
+    def test_shell_async_from_handler(self):
+        """test Task.shell_async() scheduled from event handler"""
+        task = task_self()
+        class TestHandler(EventHandler):
+            def ev_close(self, worker, timedout):
+                self.future = task.shell_async("echo second")
+        handler = TestHandler()
+        self._run(task.shell_async("echo first", handler=handler))
+        worker = self._run(handler.future)
+        self.assertEqual(worker.read(), b"second")
+
+    def test_shell_async_timeout(self):
+        """test Task.shell_async() with command timeout"""
+        start = time.time()
+        worker = self._run(task_self().shell_async("sleep 10", timeout=0.2))
+        self.assertTrue(worker.did_timeout())
+        self.assertTrue(time.time() - start < 5)
+
+    def test_shell_async_cancel(self):
+        """test Task.shell_async() future cancel aborts worker"""
+        task = task_self()
+        future = task.shell_async("sleep 10")
+        run_future = task.resume_async()
+        self.loop.call_later(0.2, future.cancel)
+        start = time.time()
+        self._run(run_future)
+        self.assertTrue(future.cancelled())
+        self.assertTrue(time.time() - start < 5)
+        self.assertFalse(task.running())
+
+    def test_resume_async_timer(self):
+        """test Task.resume_async() does not block event loop"""
+        task = task_self()
+        events = []
+        class TestTimerHandler(EventHandler):
+            def ev_timer(self, timer):
+                events.append('timer')
+        task.timer(0.3, handler=TestTimerHandler())
+        task.shell("sleep 0.1")
+        self.loop.call_later(0.1, events.append, 'loop')
+        self._run(task.resume_async())
+        self.assertEqual(events, ['loop', 'timer'])
+
+    def test_resume_async_repeating_timer(self):
+        """test Task.resume_async() with repeating timer"""
+        task = task_self()
+        class TestTimerHandler(EventHandler):
+            count = 0
+            def ev_timer(self, timer):
+                self.count += 1
+                if self.count == 3:
+                    timer.invalidate()
+        handler = TestTimerHandler()
+        task.timer(0.05, handler=handler, interval=0.05)
+        self._run(task.resume_async())
+        self.assertEqual(handler.count, 3)
+
+    def test_resume_async_current_run(self):
+        """test Task.resume_async() returns future of current run"""
+        task = task_self()
+        task.shell("sleep 0.1")
+        future = task.resume_async()
+        self.assertTrue(task.resume_async() is future)
+        self.assertRaises(AlreadyRunningError, task.resume)
+        self._run(future)
+
+    def test_resume_async_timeout(self):
+        """test Task.resume_async() with task timeout"""
+        task = task_self()
+        task.shell("sleep 10")
+        start = time.time()
+        self.assertRaises(TimeoutError, self._run, task.resume_async(0.2))
+        self.assertTrue(time.time() - start < 5)
+        self.assertFalse(task.running())
+
+    def test_resume_async_abort(self):
+        """test Task.abort() of task running in event loop"""
+        task = task_self()
+        task.shell("sleep 10")
+        future = task.resume_async()
+        self.loop.call_later(0.2, task.abort)
+        start = time.time()
+        self._run(future)
+        self.assertTrue(time.time() - start < 5)
+        self.assertFalse(task.running())
+
+    def test_resume_after_async(self):
+        """test Task.resume() after Task.resume_async()"""
+        task = task_self()
+        self._run(task.shell_async("echo async"))
+        worker = task.shell("echo sync")
+        task.resume()
+        self.assertEqual(worker.read(), b"sync")
+
+    def test_engine_not_asyncio(self):
+        """test Task.resume_async() requires asyncio engine"""
+        task_terminate()
+        DEFAULTS.engine = 'select'
+        task = task_self()
+        self.assertRaises(TaskError, task.resume_async)
+        self.assertRaises(TaskError, task.shell_async, "echo foo")
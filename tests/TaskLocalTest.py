@@ -6,6 +6,7 @@ import sys
 import unittest
 
 from ClusterShell.Defaults import DEFAULTS
+from ClusterShell.Engine.Asyncio import EngineAsyncio
 from ClusterShell.Engine.Select import EngineSelect
 from ClusterShell.Engine.Poll import EnginePoll
 from ClusterShell.Engine.EPoll import EngineEPoll
@@ -13,6 +14,7 @@ from ClusterShell.Task import *
 
 from .TaskLocalMixin import TaskLocalMixin
 
+ENGINE_ASYNCIO_ID = EngineAsyncio.identifier
 ENGINE_SELECT_ID = EngineSelect.identifier
 ENGINE_POLL_ID = EnginePoll.identifier
 ENGINE_EPOLL_ID = EngineEPoll.identifier
@@ -79,3 +81,23 @@ if sys.version_info >= (2, 6, 0):
             # restore Engine
             DEFAULTS.engine = self.engine_id_save
             task_terminate()
+
+class TaskLocalEngineAsyncioTest(TaskLocalMixin, unittest.TestCase):
+
+    def setUp(self):
+        # switch Engine
+        task_terminate()
+        self.engine_id_save = DEFAULTS.engine
+        DEFAULTS.engine = ENGINE_ASYNCIO_ID
+        if task_self().info('engine') != ENGINE_ASYNCIO_ID:
+            self.skipTest("engine %s not supported on this host"
+                          % ENGINE_ASYNCIO_ID)
+        # call base class setUp()
+        TaskLocalMixin.setUp(self)
+
+    def tearDown(self):
+        # call base class tearDown()
+        TaskLocalMixin.tearDown(self)
+        # restore Engine
+        DEFAULTS.engine = self.engine_id_save
+        task_terminate()
@@ -461,6 +461,29 @@ class TaskTimerTest(unittest.TestCase):
         task._engine.remove_timer(timer)
         task_terminate()
 
+    def testTimerQueueRescheduleInPlace(self):
+        """test timer queue reschedule and invalidate in place [private]"""
+        task = task_self()
+        timerq = task._engine.timerq
+        test_handler = self.__class__.TSimpleTimerChecker()
+        timers = [task.timer(10.0 + i, handler=test_handler)
+                  for i in range(100)]
+        for i, timer in enumerate(timers):
+            timer.set_nextfire(0.2 + 0.01 * (i % 7))
+            timer.set_nextfire(0.1 + 0.01 * (i % 5))
+        # no stale entries are left in the queue
+        self.assertEqual(len(timerq.timers), 100)
+        self.assertEqual(len(timerq), 100)
+        for timer in timers[::2]:
+            timer.invalidate()
+        self.assertEqual(len(timerq.timers), 50)
+        self.assertEqual(len(timerq), 50)
+        self.assertTrue(timerq.nextfire_delay() <= 0.1)
+        task.resume()
+        self.assertEqual(test_handler.count, 50)
+        self.assertEqual(len(timerq.timers), 0)
+        self.assertEqual(len(timerq), 0)
+
     def _thread_timer_create_func(self, task):
         """thread used to create a timer for another task; hey why not?"""
         timer = task.timer(0.5, self.__class__.TSimpleTimerChecker())
@@ -12,6 +12,7 @@ from ClusterShell import __version__
 from ClusterShell.Communication import ConfigurationMessage, ControlMessage, \
     StdOutMessage, StdErrMessage, RetcodeMessage, ACKMessage, ErrorMessage, \
     TimeoutMessage, StartMessage, EndMessage, XMLReader
+from ClusterShell.Defaults import DEFAULTS
 from ClusterShell.Gateway import GatewayChannel
 from ClusterShell.NodeSet import NodeSet
 from ClusterShell.Task import Task, task_self
@@ -478,6 +479,20 @@ class TreeGatewayTest(TreeGatewayBaseTest):
         self._check_channel_ctl_shell("cat", "n10", True, False,
                                       StdOutMessage, b"ok", write_buf=b"ok\n")
 
+    def test_channel_ctl_shell_wrloc_hwm(self):
+        """test gateway channel write above write high-water mark"""
+        write_hwm = DEFAULTS.write_hwm
+        DEFAULTS.write_hwm = 4096
+        try:
+            # write ack is delayed until enough data has been written
+            self._check_channel_ctl_shell("sleep 0.5; wc -c", "n10", False,
+                                          False, StdOutMessage,
+                                          re.compile(b"262144"),
+                                          write_buf=b"x" * 262144)
+            self.assertEqual(len(self.chan._write_acks), 0)
+        finally:
+            DEFAULTS.write_hwm = write_hwm
+
     def test_channel_ctl_shell_mwrloc1(self):
         """test gateway channel write multi (remote=False)"""
         self._check_channel_ctl_shell("cat", "n[10-49]", True, False,
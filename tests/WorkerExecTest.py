@@ -9,6 +9,7 @@ import unittest
 from .TLib import HOSTNAME, make_temp_file, make_temp_filename, make_temp_dir
 
 from ClusterShell.Event import EventHandler
+from ClusterShell.NodeSet import FrozenNodeSet
 from ClusterShell.Worker.Exec import ExecWorker, WorkerError
 from ClusterShell.Task import task_self
 
@@ -53,6 +54,16 @@ class ExecTest(unittest.TestCase):
         self.assertEqual(task_self().max_retcode(), None)
         self.assertEqual(task_self().num_timeout(), 2)
 
+    def test_iter_frozen_nodesets(self):
+        """test ExecWorker iter_buffers() and iter_retcodes() nodesets"""
+        nodes = "localhost,%s" % HOSTNAME
+        worker = self.execw(nodes=nodes, handler=None, command="echo ok")
+        buffers = dict((nodeset, bytes(buf))
+                       for buf, nodeset in worker.iter_buffers())
+        retcodes = dict((nodeset, rc) for rc, nodeset in worker.iter_retcodes())
+        self.assertEqual(buffers, {FrozenNodeSet(nodes): b'ok'})
+        self.assertEqual(retcodes, {FrozenNodeSet(nodes): 0})
+
     def test_node_placeholder(self):
         """test ExecWorker with several nodes and %h (host)"""
         nodes = "localhost,%s" % HOSTNAME
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# cli_startup.py: command line tools startup time benchmark.
+#
+# Measure the wall-clock time to run short commands with each entry point
+# (best and mean of several runs), and the cumulative import time of each
+# CLI module as reported by `python -X importtime` (Python 3.7+).
+#
+# Usage example: PYTHONPATH=lib ./tests/bench/cli_startup.py -n 20
+
+import optparse
+import os
+import subprocess
+import sys
+import time
+
+
+COMMANDS = [('nodeset', 'ClusterShell.CLI.Nodeset', ['-e', 'node[1-10]']),
+            ('nodeset', 'ClusterShell.CLI.Nodeset', ['-f', 'node1', 'node2']),
+            ('clubak', 'ClusterShell.CLI.Clubak', ['-b']),
+            ('clush', 'ClusterShell.CLI.Clush', ['--version'])]
+
+def command_runtimes(module, args, count):
+    """Run CLI module `count` times with args, return list of runtimes."""
+    cmd = [sys.executable, '-c',
+           'import sys; from %s import main; main()' % module,
+           module.rsplit('.', 1)[-1].lower()] + args
+    runtimes = []
+    with open(os.devnull, 'r+') as devnull:
+        for _ in range(count):
+            start = time.time()
+            subprocess.call(cmd, stdin=devnull, stdout=devnull,
+                            stderr=devnull)
+            runtimes.append(time.time() - start)
+    return runtimes
+
+def import_time(module):
+    """Return cumulative import time of module in seconds."""
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                             'import %s' % module], stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    _, err = proc.communicate()
+    for line in err.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1e6
+    return None
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--count", type="int", default=10,
+                      help="number of runs of each command (default: 10)")
+    options, _ = parser.parse_args()
+
+    for name, module, args in COMMANDS:
+        runtimes = command_runtimes(module, args, options.count)
+        print("%-32s best %6.1fms  mean %6.1fms" %
+              (' '.join([name] + args), min(runtimes) * 1e3,
+               sum(runtimes) / len(runtimes) * 1e3))
+    if sys.version_info >= (3, 7):
+        for module in sorted(set(command[1] for command in COMMANDS)):
+            print("import %-27s %6.1fms" % (module, import_time(module) * 1e3))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# engine_events.py: engine event dispatch benchmark.
+#
+# Read lines from many pipes with a StreamWorker: at each tick of a
+# repeating timer, one line is written to every pipe, so that all pipes are
+# ready at once, like output of many ssh commands. Report the engine time
+# and the number of epoll calls per read event (epoll engine only).
+#
+# Usage example: PYTHONPATH=lib ./tests/bench/engine_events.py -n 2000 -t 50
+
+import optparse
+import os
+import time
+
+from ClusterShell.Defaults import DEFAULTS
+from ClusterShell.Event import EventHandler
+from ClusterShell.Task import task_self, task_terminate
+from ClusterShell.Worker.Worker import StreamWorker
+
+
+class CountingEPoll(object):
+    """select.epoll proxy counting calls by method name"""
+
+    def __init__(self, epolling):
+        self.epolling = epolling
+        self.counts = {}
+
+    def __getattr__(self, name):
+        method = getattr(self.epolling, name)
+        def counted(*args):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return method(*args)
+        return counted
+
+
+class Writer(EventHandler):
+    """Timer handler writing one line to each pipe at each tick"""
+
+    def __init__(self, wfds, ticks):
+        EventHandler.__init__(self)
+        self.wfds = wfds
+        self.ticks = ticks
+
+    def ev_timer(self, timer):
+        self.ticks -= 1
+        for wfd in self.wfds:
+            os.write(wfd, b"line\n")
+            if not self.ticks:
+                os.close(wfd)
+        if not self.ticks:
+            timer.invalidate()
+
+
+class Reader(EventHandler):
+    """Count read lines"""
+
+    def __init__(self):
+        EventHandler.__init__(self)
+        self.lines = 0
+
+    def ev_read(self, worker, node, sname, msg):
+        self.lines += 1
+
+
+def run(engine, count, ticks):
+    """Run benchmark with engine, return (lines, elapsed, epoll counts)."""
+    task_terminate()
+    DEFAULTS.engine = engine
+    task = task_self()
+    counting = None
+    if engine == 'epoll':
+        counting = CountingEPoll(task._engine.epolling)
+        task._engine.epolling = counting
+    reader = Reader()
+    wfds = []
+    for idx in range(count):
+        rfd, wfd = os.pipe()
+        worker = StreamWorker(handler=reader, key=idx)
+        worker.set_reader('out', rfd)
+        task.schedule(worker)
+        wfds.append(wfd)
+    task.set_info('fanout', count + 1)
+    task.timer(0.01, handler=Writer(wfds, ticks), interval=0.01)
+    start = time.time()
+    task.resume()
+    elapsed = time.time() - start
+    task_terminate()
+    return reader.lines, elapsed, counting and counting.counts
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--count", type="int", default=1000,
+                      help="number of pipes (default: 1000)")
+    parser.add_option("-t", "--ticks", type="int", default=50,
+                      help="number of lines written per pipe (default: 50)")
+    parser.add_option("-e", "--engine", action="append",
+                      help="engine to use (default: epoll and poll)")
+    options, _ = parser.parse_args()
+
+    for engine in options.engine or ['epoll', 'poll']:
+        lines, elapsed, counts = run(engine, options.count, options.ticks)
+        print("%-8s %8d lines %8.3fs %6.2fus/line" %
+              (engine, lines, elapsed, elapsed / lines * 1e6))
+        if counts:
+            print("         epoll calls per line: %s" %
+                  ', '.join('%s %.4f' % (name, float(cnt) / lines)
+                            for name, cnt in sorted(counts.items())))
+
+if __name__ == '__main__':
+    main()
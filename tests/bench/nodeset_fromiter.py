@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# nodeset_fromiter.py: streaming NodeSet construction benchmark.
+#
+# Compare NodeSet.fromiter() with the union of one NodeSet per node name
+# (former nodeset stdin and clush --hostfile processing) on a shuffled list
+# of host names with random holes, and check that results are identical.
+# Folding time (str) is reported separately as it does not depend on the
+# construction method.
+#
+# Usage example: PYTHONPATH=lib ./tests/bench/nodeset_fromiter.py -n 1000000
+
+import optparse
+import random
+import time
+
+from ClusterShell.NodeSet import NodeSet, RESOLVER_NOGROUP
+
+
+def build_names(count, holes, seed):
+    """Build a shuffled list of about `count` host names."""
+    rnd = random.Random(seed)
+    names = []
+    for idx in range(count):
+        if rnd.random() * 100 >= holes:
+            names.append("node%d" % idx)
+            names.append("login%02d" % (idx % 100))
+    rnd.shuffle(names)
+    return names[:count]
+
+def build_union(names):
+    """Build NodeSet by adding each name one by one."""
+    nodeset = NodeSet(resolver=RESOLVER_NOGROUP)
+    for name in names:
+        nodeset.update(NodeSet(name, resolver=RESOLVER_NOGROUP))
+    return nodeset
+
+def build_fromiter(names):
+    """Build NodeSet with NodeSet.fromiter()."""
+    return NodeSet.fromiter(names, resolver=RESOLVER_NOGROUP)
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--count", type="int", default=100000,
+                      help="number of host names (default: 100000)")
+    parser.add_option("-H", "--holes", type="float", default=5,
+                      help="percentage of missing indexes (default: 5)")
+    parser.add_option("-s", "--seed", type="int", default=0,
+                      help="random seed (default: 0)")
+    parser.add_option("--skip-union", action="store_true",
+                      help="do not run the (slow) one by one union")
+    options, _ = parser.parse_args()
+
+    names = build_names(options.count, options.holes, options.seed)
+    results = []
+    builders = [('fromiter', build_fromiter)]
+    if not options.skip_union:
+        builders.append(('union', build_union))
+    for name, builder in builders:
+        start = time.time()
+        nodeset = builder(names)
+        elapsed = time.time() - start
+        start = time.time()
+        folded = str(nodeset)
+        print("%-10s %8.3fs  %d nodes (str %.3fs, %d chars)" %
+              (name, elapsed, len(nodeset), time.time() - start,
+               len(folded)))
+        results.append(folded)
+    assert len(set(results)) == 1, "results differ"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# rangesetnd_fold.py: RangeSetND multivariate folding benchmark.
+#
+# Compare folding engines of RangeSetND (see ND_FOLD_ENGINE in
+# ClusterShell.RangeSet) on 3D sets with random holes, like nodes from
+# a r[1-32]c[1-16]n[1-64] cluster, and check that results are identical.
+#
+# Usage example: PYTHONPATH=lib ./tests/bench/rangesetnd_fold.py -H 2
+
+import optparse
+import random
+import time
+
+import ClusterShell.RangeSet
+from ClusterShell.RangeSet import RangeSet, RangeSetND
+
+
+ENGINES = [('rangesets', False), ('intervals', False), ('intervals', True)]
+
+def build_vectors(shape, holes, seed):
+    """Build a list of vectors of single items with `holes` % missing."""
+    rnd = random.Random(seed)
+    vectors = []
+    for rack in range(1, shape[0] + 1):
+        for chassis in range(1, shape[1] + 1):
+            for node in range(1, shape[2] + 1):
+                if rnd.random() * 100 >= holes:
+                    vectors.append([RangeSet.fromone(rack),
+                                    RangeSet.fromone(chassis),
+                                    RangeSet.fromone(node)])
+    return vectors
+
+def bench(vectors, engine, use_numpy):
+    """Fold vectors with given engine, return (result, elapsed time)."""
+    ClusterShell.RangeSet.ND_FOLD_ENGINE = engine
+    ClusterShell.RangeSet.ND_FOLD_NUMPY = use_numpy
+    rnd = RangeSetND([[rg.copy() for rg in vec] for vec in vectors])
+    start = time.time()
+    rnd.fold()
+    return str(rnd), time.time() - start
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-s", "--shape", default="32,16,64",
+                      help="dimensions of the cluster (default: 32,16,64)")
+    parser.add_option("-H", "--holes", type="float", default=2.0,
+                      help="percentage of missing nodes (default: 2)")
+    parser.add_option("--seed", type="int", default=1)
+    options, _ = parser.parse_args()
+
+    shape = [int(dim) for dim in options.shape.split(',')]
+    vectors = build_vectors(shape, options.holes, options.seed)
+    print("%d items, shape %s, %.1f%% holes" % (len(vectors), shape,
+                                                options.holes))
+    results = set()
+    for engine, use_numpy in ENGINES:
+        result, elapsed = bench(vectors, engine, use_numpy)
+        results.add(result)
+        print("%-10s numpy=%-5s %8.3fs  %d vectors" % (engine, use_numpy,
+                                                      elapsed,
+                                                      result.count('\n') + 1))
+    assert len(results) == 1, "folding engines disagree!"
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# readlines.py: engine client line splitting benchmark.
+#
+# Read data from a pipe with a StreamWorker, either a single long line (eg.
+# a base64 blob printed by a node) or many short lines. A forked process
+# writes the data, which is then received in many reads of at most 64 KiB.
+#
+# Usage example: PYTHONPATH=lib ./tests/bench/readlines.py -s 64
+
+import optparse
+import os
+import time
+
+from ClusterShell.Event import EventHandler
+from ClusterShell.Task import task_self
+from ClusterShell.Worker.Worker import StreamWorker
+
+
+class Reader(EventHandler):
+    """Count read lines and bytes"""
+
+    def __init__(self):
+        EventHandler.__init__(self)
+        self.lines = 0
+        self.size = 0
+
+    def ev_read(self, worker, node, sname, msg):
+        self.lines += 1
+        self.size += len(msg)
+
+
+def run(data):
+    """Read data from a pipe, return (lines, elapsed)."""
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(rfd)
+        os.write(wfd, data)
+        os._exit(0)
+    os.close(wfd)
+    task = task_self()
+    reader = Reader()
+    worker = StreamWorker(handler=reader)
+    worker.set_reader('in', rfd)
+    task.schedule(worker)
+    start = time.time()
+    task.resume()
+    elapsed = time.time() - start
+    os.waitpid(pid, 0)
+    assert reader.size + data.count(b"\n") == len(data), reader.size
+    return reader.lines, elapsed
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-s", "--size", type="int", default=16,
+                      help="data size in MiB (default: 16)")
+    options, _ = parser.parse_args()
+
+    size = options.size * 1024 * 1024
+    for name, data in (('long line', b"x" * size),
+                       ('short lines', (b"x" * 63 + b"\n") * (size // 64))):
+        lines, elapsed = run(data)
+        print("%-12s %8d lines %8.3fs %8.1f MiB/s" %
+              (name, lines, elapsed, options.size / elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# timerq.py: engine timer queue microbenchmark.
+#
+# Measure schedule, reschedule (set_nextfire), cancel (invalidate) and fire
+# rates of the engine timer queue, with as many timers as engine clients
+# with a command timeout. Reschedule and cancel are done before firing, so
+# that cancelled or rescheduled timers may slow down the next operations.
+#
+# Usage example: PYTHONPATH=lib ./tests/bench/timerq.py -n 50000
+
+import optparse
+import random
+import time
+
+from ClusterShell.Engine.Engine import EngineTimer, _EngineTimerQ
+from ClusterShell.Event import EventHandler
+
+
+class BenchEngine(object):
+    """Minimal engine owning a timer queue"""
+
+    def __init__(self):
+        self.evlooprefcnt = 0
+        self.timerq = _EngineTimerQ(self)
+
+
+class CountHandler(EventHandler):
+    """Count timer events"""
+
+    def __init__(self):
+        EventHandler.__init__(self)
+        self.count = 0
+
+    def ev_timer(self, timer):
+        self.count += 1
+
+
+def rate(count, elapsed):
+    """Format operation rate."""
+    return "%10.0f ops/s" % (count / max(elapsed, 1e-9))
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-n", "--count", type="int", default=50000,
+                      help="number of timers (default: 50000)")
+    parser.add_option("-r", "--rounds", type="int", default=4,
+                      help="number of reschedule rounds (default: 4)")
+    parser.add_option("-s", "--seed", type="int", default=0,
+                      help="random seed (default: 0)")
+    options, _ = parser.parse_args()
+
+    rnd = random.Random(options.seed)
+    engine = BenchEngine()
+    timerq = engine.timerq
+    handler = CountHandler()
+    timers = [EngineTimer(rnd.random() * 0.5, -1.0, False, handler)
+              for _ in range(options.count)]
+
+    start = time.time()
+    for timer in timers:
+        timer._set_engine(engine)
+        timerq.schedule(timer)
+    print("schedule   %s" % rate(len(timers), time.time() - start))
+
+    # reschedule all timers several times (eg. grooming or per-node timeout
+    # extended), always in the future
+    start = time.time()
+    for _ in range(options.rounds):
+        for timer in timers:
+            timer.set_nextfire(0.5 + rnd.random() * 0.5)
+    print("reschedule %s" % rate(len(timers) * options.rounds,
+                                 time.time() - start))
+
+    # cancel half of the timers (eg. commands completed before timeout)
+    start = time.time()
+    for timer in timers[::2]:
+        timer.invalidate()
+    print("cancel     %s" % rate(len(timers[::2]), time.time() - start))
+
+    # next fire delay is checked at each engine loop
+    start = time.time()
+    for _ in range(len(timers)):
+        timerq.nextfire_delay()
+    print("nextfire   %s" % rate(len(timers), time.time() - start))
+
+    # wait for all timers to expire
+    time.sleep(1.05)
+
+    start = time.time()
+    timerq.fire_expired()
+    elapsed = time.time() - start
+    assert handler.count == len(timers[1::2]), handler.count
+    assert len(timerq) == 0 and engine.evlooprefcnt == 0
+    print("fire       %s" % rate(handler.count, elapsed))
+
+if __name__ == '__main__':
+    main()
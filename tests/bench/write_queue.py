@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# write_queue.py: engine client write queue benchmark.
+#
+# Queue a large payload in chunks to a non-blocking pipe StreamWorker before
+# running the task (like a large stdin payload or a tar stream), while
+# another StreamWorker drains the pipe. Report the write throughput.
+#
+# Usage example: PYTHONPATH=lib ./tests/bench/write_queue.py -s 256 -c 32
+
+import optparse
+import os
+import time
+
+from ClusterShell.Event import EventHandler
+from ClusterShell.Task import task_self
+from ClusterShell.Worker.Worker import StreamWorker
+from ClusterShell.Worker.fastsubprocess import set_nonblock_flag
+
+
+class Reader(EventHandler):
+    """Count read bytes"""
+
+    def __init__(self):
+        EventHandler.__init__(self)
+        self.size = 0
+
+    def ev_read(self, worker, node, sname, msg):
+        self.size += len(msg) + 1
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("-s", "--size", type="int", default=64,
+                      help="payload size in MiB (default: 64)")
+    parser.add_option("-c", "--chunk", type="int", default=32,
+                      help="chunk size in KiB (default: 32)")
+    options, _ = parser.parse_args()
+
+    chunk = (b"x" * 1023 + b"\n") * options.chunk
+    count = options.size * 1024 // options.chunk
+
+    task = task_self()
+    rfd, wfd = os.pipe()
+    set_nonblock_flag(wfd)
+    reader = Reader()
+    rworker = StreamWorker(handler=reader)
+    rworker.set_reader('in', rfd)
+    wworker = StreamWorker(handler=None)
+    wworker.set_writer('out', wfd)
+
+    start = time.time()
+    for _ in range(count):
+        wworker.write(chunk, 'out')
+    wworker.set_write_eof()
+    task.schedule(rworker)
+    task.schedule(wworker)
+    task.resume()
+    elapsed = time.time() - start
+    assert reader.size == len(chunk) * count, reader.size
+    print("%d MiB in %.3fs: %.1f MiB/s" % (options.size, elapsed,
+                                          options.size / elapsed))
+
+if __name__ == '__main__':
+    main()